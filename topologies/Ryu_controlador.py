@@ -1,19 +1,218 @@
 import eventlet
 eventlet.monkey_patch()
 
+import json
+import time
+
+from ryu.app.wsgi import ControllerBase, Response, WSGIApplication, route
 from ryu.base import app_manager
 from ryu.controller import ofp_event
-from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER
+from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER, DEAD_DISPATCHER
 from ryu.controller.handler import set_ev_cls
 from ryu.ofproto import ofproto_v1_3
-from ryu.lib.packet import packet, ethernet
+from ryu.lib import hub
+from ryu.lib.packet import packet, ethernet, arp
+
+from parser_l2 import parse_ethernet, mac_texto, mac_binario, ETH_TYPE_ARP
+from tabela_mac import TabelaMAC
+from envio_lote import EnviadorLote
+from limitador import LimitadorPacketIn
+from metricas import RegistroMetricas
+from proxy_arp import ProxyARP
+from inventario_hosts import CacheInventario, INVENTARIO_PADRAO
+from monitor_trafego import MonitorTrafego
 
 class MeuSwitch13(app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
+    _CONTEXTS = {'wsgi': WSGIApplication}
+
+    # Timeouts (em segundos) dos fluxos unicast aprendidos; 0 desativa o timeout
+    IDLE_TIMEOUT = 30
+    HARD_TIMEOUT = 300
+
+    # Cookie que marca os fluxos aprendidos por este app, para removê-los sem
+    # afetar fluxos instalados por outras ferramentas
+    COOKIE_APRENDIDO = 0x1
+
+    # Tabela MAC: entradas por datapath, tempo de vida (s) e período do envelhecimento (s)
+    MAC_CAPACIDADE = 4096
+    MAC_TEMPO_VIDA = 300
+    MAC_INTERVALO_ENVELHECIMENTO = 10
+
+    # Envio em lote de FlowMod/PacketOut: liga/desliga, janela (s), tamanho
+    # máximo do lote e se cada lote termina com um OFPBarrierRequest
+    LOTE_ATIVO = True
+    LOTE_JANELA = 0.001
+    LOTE_TAMANHO_MAX = 64
+    LOTE_BARREIRA = False
+
+    # Controle de tempestade de PacketIn: taxas (pacotes/s) e rajadas dos baldes
+    # por datapath e por porta; LIMITE_AMOSTRAGEM=N processa 1 a cada N excedentes
+    # (0 descarta todo o excesso)
+    LIMITE_ATIVO = True
+    LIMITE_TAXA_DATAPATH = 1000
+    LIMITE_RAJADA_DATAPATH = 2000
+    LIMITE_TAXA_PORTA = 200
+    LIMITE_RAJADA_PORTA = 400
+    LIMITE_AMOSTRAGEM = 0
+    LIMITE_INTERVALO_RELATORIO = 30
+
+    # Meter OpenFlow 1.3 no fluxo table-miss: o próprio switch limita o tráfego
+    # enviado ao controlador (requer suporte a meters no switch)
+    METER_ATIVO = False
+    METER_ID = 1
+    METER_TAXA_PPS = 1000
+    METER_RAJADA = 200
+
+    # Métricas: sempre publicadas em GET /metrics no servidor WSGI do Ryu
+    # (--wsapi-port, padrão 8080); se METRICAS_ARQUIVO for definido, também são
+    # gravadas nesse arquivo a cada METRICAS_INTERVALO segundos
+    METRICAS_ARQUIVO = None
+    METRICAS_INTERVALO = 15
+
+    # Proxy ARP: responde pedidos ARP de IPs já conhecidos direto do controlador,
+    # sem inundação; capacidade do cache e tempo de vida (s) das associações
+    ARP_PROXY_ATIVO = True
+    ARP_CAPACIDADE = 8192
+    ARP_TEMPO_VIDA = 120
+
+    # Ethertypes que exigem o parser completo do Ryu (camadas superiores);
+    # os demais quadros passam só pelo fast path L2 de parser_l2. O ARP é
+    # incluído automaticamente quando o proxy ARP está ativo
+    ETHERTYPES_PARSE_COMPLETO = frozenset()
+
+    # Modo proativo: ao conectar, cada switch recebe de uma vez os fluxos
+    # eth_dst -> porta de todos os hosts e interfaces do r1 do inventário
+    # (arquivo exportado pela topologia ou, sem ele, as listas da RobustTopo),
+    # sem timeout e acima dos fluxos aprendidos; os endereços também entram no
+    # proxy ARP. Só hosts fora do inventário passam pelo PacketIn reativo
+    PROATIVO_ATIVO = False
+    PROATIVO_INVENTARIO = INVENTARIO_PADRAO
+    PROATIVO_PRIORIDADE = 2
+    COOKIE_PROATIVO = 0x2
+
+    # Coleta de estatísticas: a cada ESTATISTICAS_INTERVALO segundos, cada
+    # switch recebe um OFPFlowStatsRequest e um OFPPortStatsRequest, com os
+    # switches espalhados ao longo do intervalo; taxas por diferença entre
+    # amostras, até ESTATISTICAS_CAPACIDADE fluxos por datapath e
+    # ESTATISTICAS_HISTORICO amostras por fluxo/porta. Um fluxo acima de
+    # ELEFANTE_BPS (bit/s) em ELEFANTE_AMOSTRAS amostras seguidas é elefante;
+    # os ESTATISTICAS_TOP maiores fluxos e portas saem em /metrics e /estatisticas
+    ESTATISTICAS_ATIVO = True
+    ESTATISTICAS_INTERVALO = 10
+    ESTATISTICAS_CAPACIDADE = 10000
+    ESTATISTICAS_HISTORICO = 30
+    ESTATISTICAS_TOP = 10
+    ELEFANTE_BPS = 10_000_000
+    ELEFANTE_AMOSTRAS = 3
 
     def __init__(self, *args, **kwargs):
         super(MeuSwitch13, self).__init__(*args, **kwargs)
-        self.mac_to_port = {}
+        self.tabela_mac = TabelaMAC(self.MAC_CAPACIDADE, self.MAC_TEMPO_VIDA)
+        # Cache dos fluxos instalados: (dpid, eth_dst) -> {in_port: out_port},
+        # com os MACs na forma compacta de 6 bytes
+        self.flows_instalados = {}
+        self.datapaths = {}
+        self.enviador = EnviadorLote(self.LOTE_JANELA, self.LOTE_TAMANHO_MAX,
+                                     self.LOTE_BARREIRA, self.LOTE_ATIVO)
+        self.limitador = LimitadorPacketIn(self.LIMITE_TAXA_DATAPATH, self.LIMITE_RAJADA_DATAPATH,
+                                           self.LIMITE_TAXA_PORTA, self.LIMITE_RAJADA_PORTA,
+                                           self.LIMITE_AMOSTRAGEM)
+        self.proxy_arp = ProxyARP(self.ARP_CAPACIDADE, self.ARP_TEMPO_VIDA)
+        self.ethertypes_parse_completo = set(self.ETHERTYPES_PARSE_COMPLETO)
+        self.inventario = CacheInventario(self.PROATIVO_INVENTARIO)
+        # dpid -> {'fluxos', 'enfileirado_s', 'confirmado_s'} da última instalação proativa
+        self.proativo = {}
+        # dpid -> (OFPBarrierRequest enviado após os fluxos, início da instalação)
+        self._barreiras_proativas = {}
+        self.monitor = MonitorTrafego(self.ESTATISTICAS_CAPACIDADE, self.ESTATISTICAS_HISTORICO,
+                                      self.ELEFANTE_BPS, self.ELEFANTE_AMOSTRAS)
+        if self.ARP_PROXY_ATIVO:
+            self.ethertypes_parse_completo.add(ETH_TYPE_ARP)
+        self.envelhecimento_thread = hub.spawn(self._envelhecer_tabela_mac)
+        self.relatorio_limite_thread = hub.spawn(self._relatar_descartes)
+
+        self.metricas = RegistroMetricas()
+        self._registrar_metricas()
+        wsgi = kwargs.get('wsgi')
+        if wsgi is not None:
+            wsgi.register(MetricasController, {'app': self})
+        if self.METRICAS_ARQUIVO:
+            self.metricas_thread = hub.spawn(self._gravar_metricas)
+        if self.ESTATISTICAS_ATIVO:
+            self.estatisticas_thread = hub.spawn(self._coletar_estatisticas)
+
+    def _registrar_metricas(self):
+        m = self.metricas
+        self.m_packet_in = m.histograma('ryu_packet_in_segundos',
+                                        'Tempo de processamento de cada PacketIn')
+        self.m_envios = m.contador('ryu_mensagens_enviadas_total',
+                                   'Mensagens OpenFlow enviadas aos switches', ('tipo',))
+        self.m_envio_tempo = m.histograma('ryu_envio_segundos',
+                                          'Tempo gasto para enviar/enfileirar cada mensagem', ('tipo',))
+        m.medidor('ryu_datapaths_conectados', 'Switches conectados', lambda: len(self.datapaths))
+        m.medidor('ryu_tabela_mac_entradas', 'Entradas na tabela MAC por datapath',
+                  lambda: {(dpid,): self.tabela_mac.tamanho(dpid) for dpid in self.datapaths}, ('dpid',))
+        m.medidor('ryu_tabela_mac_memoria_bytes', 'Memória estimada da tabela MAC',
+                  self.tabela_mac.memoria_bytes)
+        m.medidor('ryu_fluxos_em_cache', 'Destinos com fluxos unicast em cache',
+                  lambda: len(self.flows_instalados))
+        m.medidor('ryu_fila_eventos', 'Eventos pendentes na fila do app', lambda: self.events.qsize())
+        m.medidor('ryu_fila_envio', 'Mensagens pendentes na fila de envio de cada datapath',
+                  self._profundidade_filas_envio, ('dpid',))
+        m.medidor('ryu_lote_mensagens_por_escrita', 'Razão de agrupamento do envio em lote',
+                  lambda: self.enviador.estatisticas()['mensagens_por_escrita'])
+        m.contador_funcao('ryu_lote_escritas_total', 'Escritas no socket feitas pelo envio em lote',
+                          lambda: self.enviador.escritas)
+        m.contador_funcao('ryu_lote_barreiras_total', 'OFPBarrierRequests acrescentados ao fim dos lotes',
+                          lambda: self.enviador.barreiras)
+        m.contador_funcao('ryu_packet_in_descartados_total', 'PacketIns descartados pelo controle de tempestade',
+                          self.limitador.total_descartes)
+        m.medidor('ryu_arp_associacoes', 'Associações IP->MAC no cache do proxy ARP', self.proxy_arp.__len__)
+        m.contador_funcao('ryu_arp_respostas_proxy_total',
+                          'Pedidos ARP respondidos pelo controlador (inundações evitadas)',
+                          lambda: self.proxy_arp.respostas)
+        m.contador_funcao('ryu_arp_pedidos_inundados_total', 'Pedidos ARP inundados por destino desconhecido',
+                          lambda: self.proxy_arp.inundacoes)
+        m.medidor('ryu_fluxos_proativos', 'Fluxos instalados proativamente na conexão do switch',
+                  lambda: {(dpid,): r['fluxos'] for dpid, r in self.proativo.items()}, ('dpid',))
+        m.medidor('ryu_proativo_instalacao_segundos', 'Tempo até o switch confirmar (barrier) os fluxos proativos',
+                  lambda: {(dpid,): r['confirmado_s'] for dpid, r in self.proativo.items()
+                           if r['confirmado_s'] is not None}, ('dpid',))
+        self.m_estatisticas_tempo = m.histograma('ryu_estatisticas_processamento_segundos',
+                                                 'Tempo de processamento de cada resposta de estatísticas',
+                                                 ('tipo',))
+        self.m_estatisticas_entradas = m.contador('ryu_estatisticas_entradas_total',
+                                                  'Entradas de fluxo/porta recebidas nas estatísticas', ('tipo',))
+        m.medidor('ryu_fluxos_monitorados', 'Fluxos com taxa acompanhada pelo coletor de estatísticas',
+                  self.monitor.__len__)
+        m.medidor('ryu_fluxos_elefantes', 'Fluxos acima do limite de elefante', lambda: len(self.monitor.elefantes))
+        m.medidor('ryu_porta_rx_bits_por_segundo', 'Taxa recebida nas portas dos maiores emissores (top-N)',
+                  lambda: {(dpid, porta): bps for dpid, porta, bps, _ in
+                           self.monitor.maiores_portas(self.ESTATISTICAS_TOP)}, ('dpid', 'porta'))
+
+    def _profundidade_filas_envio(self):
+        filas = {}
+        for dpid, datapath in self.datapaths.items():
+            send_q = getattr(datapath, 'send_q', None)
+            filas[(dpid,)] = send_q.qsize() if send_q is not None else 0
+        return filas
+
+    def _gravar_metricas(self):
+        while True:
+            hub.sleep(self.METRICAS_INTERVALO)
+            try:
+                self.metricas.salvar(self.METRICAS_ARQUIVO)
+            except OSError as e:
+                self.logger.error("Falha ao gravar métricas em %s: %s", self.METRICAS_ARQUIVO, e)
+
+    def enviar(self, datapath, msg):
+        """Envia uma mensagem OpenFlow (via envio em lote) registrando as métricas."""
+        tipo = (type(msg).__name__,)
+        inicio = time.perf_counter()
+        self.enviador.enviar(datapath, msg)
+        self.m_envio_tempo.observar(time.perf_counter() - inicio, tipo)
+        self.m_envios.inc(rotulos=tipo)
 
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
     def switch_features_handler(self, ev):
@@ -21,53 +220,381 @@ class MeuSwitch13(app_manager.RyuApp):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
 
+        # Switch (re)conectado: os fluxos antigos podem ter sido perdidos
+        self.limpar_cache_datapath(datapath.id)
+
+        meter_id = None
+        if self.METER_ATIVO:
+            self.instalar_meter_controlador(datapath)
+            meter_id = self.METER_ID
+
         match = parser.OFPMatch()
         actions = [parser.OFPActionOutput(ofproto.OFPP_CONTROLLER,
                                           ofproto.OFPCML_NO_BUFFER)]
-        self.add_flow(datapath, 0, match, actions)
+        self.add_flow(datapath, 0, match, actions, meter_id=meter_id)
+
+        if self.PROATIVO_ATIVO:
+            self.instalar_fluxos_proativos(datapath)
+
+    def instalar_fluxos_proativos(self, datapath):
+        """Instala os fluxos de todos os destinos do inventário e pede confirmação com um barrier."""
+        parser = datapath.ofproto_parser
+        inicio = time.perf_counter()
+        destinos = self.inventario.fluxos().get(datapath.id, [])
+        if self.inventario.erro is not None:
+            self.logger.error("Inventário '%s' inválido (%s); usando %s", self.inventario.caminho,
+                              self.inventario.erro, self.inventario.origem)
+        for destino in destinos:
+            self.add_flow(datapath, self.PROATIVO_PRIORIDADE, parser.OFPMatch(eth_dst=destino.mac),
+                          [parser.OFPActionOutput(destino.porta)], cookie=self.COOKIE_PROATIVO)
+            if self.ARP_PROXY_ATIVO and destino.ip:
+                self.proxy_arp.aprender(destino.ip, mac_binario(destino.mac), datapath.id, destino.porta)
+        barreira = parser.OFPBarrierRequest(datapath)
+        self.enviar(datapath, barreira)
+        self.proativo[datapath.id] = {'fluxos': len(destinos), 'enfileirado_s': time.perf_counter() - inicio,
+                                      'confirmado_s': None}
+        self._barreiras_proativas[datapath.id] = (barreira, inicio)
+
+    @set_ev_cls(ofp_event.EventOFPBarrierReply, [CONFIG_DISPATCHER, MAIN_DISPATCHER])
+    def barrier_reply_handler(self, ev):
+        dpid = ev.msg.datapath.id
+        pendente = self._barreiras_proativas.get(dpid)
+        if pendente is None or pendente[0].xid != ev.msg.xid:
+            return
+        del self._barreiras_proativas[dpid]
+        relatorio = self.proativo[dpid]
+        relatorio['confirmado_s'] = time.perf_counter() - pendente[1]
+        self.logger.info("Modo proativo: %d fluxos instalados em %016x (%s) em %.1f ms "
+                         "(%.1f ms para enfileirar)", relatorio['fluxos'], dpid, self.inventario.origem,
+                         relatorio['confirmado_s'] * 1000, relatorio['enfileirado_s'] * 1000)
+
+    def instalar_meter_controlador(self, datapath):
+        """Cria o meter que limita, no switch, os pacotes enviados ao controlador."""
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        bands = [parser.OFPMeterBandDrop(rate=self.METER_TAXA_PPS,
+                                         burst_size=self.METER_RAJADA)]
+        # Remove um meter anterior com o mesmo id (switch reconectado)
+        self.enviar(datapath, parser.OFPMeterMod(
+            datapath, command=ofproto.OFPMC_DELETE, meter_id=self.METER_ID))
+        self.enviar(datapath, parser.OFPMeterMod(
+            datapath, command=ofproto.OFPMC_ADD,
+            flags=ofproto.OFPMF_PKTPS | ofproto.OFPMF_BURST,
+            meter_id=self.METER_ID, bands=bands))
+
+    @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER, DEAD_DISPATCHER])
+    def state_change_handler(self, ev):
+        datapath = ev.datapath
+        if ev.state == MAIN_DISPATCHER:
+            self.datapaths[datapath.id] = datapath
+        elif datapath.id is not None:
+            self.datapaths.pop(datapath.id, None)
+            self._barreiras_proativas.pop(datapath.id, None)
+            self.monitor.remover_datapath(datapath.id)
+            self.enviador.descartar(datapath.id)
+            self.limitador.remover_datapath(datapath.id)
+            self.proxy_arp.remover_datapath(datapath.id)
+            self.limpar_cache_datapath(datapath.id)
+
+    def limpar_cache_datapath(self, dpid):
+        """Remove do cache todos os fluxos e MACs aprendidos de um datapath."""
+        self.tabela_mac.remover_datapath(dpid)
+        for chave in [k for k in self.flows_instalados if k[0] == dpid]:
+            del self.flows_instalados[chave]
+
+    def _envelhecer_tabela_mac(self):
+        while True:
+            hub.sleep(self.MAC_INTERVALO_ENVELHECIMENTO)
+            self.proxy_arp.envelhecer()
+            expiradas = self.tabela_mac.envelhecer()
+            if expiradas:
+                self.invalidar_fluxos(expiradas)
+                self.logger.debug("Tabela MAC: %d entradas expiradas, %s",
+                                  len(expiradas), self.tabela_mac.estatisticas())
+
+    def _relatar_descartes(self):
+        anterior = 0
+        while True:
+            hub.sleep(self.LIMITE_INTERVALO_RELATORIO)
+            total = self.limitador.total_descartes()
+            if total > anterior:
+                self.logger.warning("Controle de tempestade: %d PacketIns descartados nos últimos %ds "
+                                    "(total %d, amostrados %d)", total - anterior,
+                                    self.LIMITE_INTERVALO_RELATORIO, total, self.limitador.amostrados)
+            anterior = total
+
+    def _coletar_estatisticas(self):
+        while True:
+            datapaths = list(self.datapaths.values())
+            if not datapaths:
+                hub.sleep(self.ESTATISTICAS_INTERVALO)
+                continue
+            # Um switch por vez, espaçados: as respostas não chegam todas juntas
+            passo = self.ESTATISTICAS_INTERVALO / len(datapaths)
+            for datapath in datapaths:
+                if datapath.id in self.datapaths:
+                    self.pedir_estatisticas(datapath)
+                hub.sleep(passo)
+
+    def pedir_estatisticas(self, datapath):
+        parser = datapath.ofproto_parser
+        self.monitor.nova_rodada(datapath.id)
+        self.enviar(datapath, parser.OFPFlowStatsRequest(datapath))
+        self.enviar(datapath, parser.OFPPortStatsRequest(datapath, 0, datapath.ofproto.OFPP_ANY))
+
+    @set_ev_cls(ofp_event.EventOFPFlowStatsReply, MAIN_DISPATCHER)
+    def flow_stats_reply_handler(self, ev):
+        inicio = time.perf_counter()
+        msg = ev.msg
+        dpid = msg.datapath.id
+        for stat in msg.body:
+            if stat.priority == 0:
+                continue  # table-miss
+            chave = (stat.priority, tuple(stat.match.items()))
+            if self.monitor.registrar_fluxo(dpid, chave, stat.byte_count, stat.packet_count,
+                                            stat.duration_sec + stat.duration_nsec / 1e9):
+                self.logger.warning("Fluxo elefante em %016x: prioridade %d %s (%.1f Mbit/s)", dpid,
+                                    stat.priority, dict(chave[1]), self.monitor.taxa_fluxo(dpid, chave)[0] / 1e6)
+        # Respostas grandes chegam em várias partes: só a última fecha a rodada
+        if not msg.flags & msg.datapath.ofproto.OFPMPF_REPLY_MORE:
+            self.monitor.fim_rodada(dpid)
+        self.m_estatisticas_entradas.inc(len(msg.body), ('fluxos',))
+        self.m_estatisticas_tempo.observar(time.perf_counter() - inicio, ('fluxos',))
+
+    @set_ev_cls(ofp_event.EventOFPPortStatsReply, MAIN_DISPATCHER)
+    def port_stats_reply_handler(self, ev):
+        inicio = time.perf_counter()
+        msg = ev.msg
+        dpid = msg.datapath.id
+        porta_max = msg.datapath.ofproto.OFPP_MAX
+        for stat in msg.body:
+            if stat.port_no > porta_max:
+                continue  # OFPP_LOCAL
+            self.monitor.registrar_porta(dpid, stat.port_no, stat.rx_bytes, stat.tx_bytes, stat.rx_packets,
+                                         stat.tx_packets, stat.duration_sec + stat.duration_nsec / 1e9)
+        if not msg.flags & msg.datapath.ofproto.OFPMPF_REPLY_MORE:
+            self.monitor.fim_rodada(dpid, fluxos=False)
+        self.m_estatisticas_entradas.inc(len(msg.body), ('portas',))
+        self.m_estatisticas_tempo.observar(time.perf_counter() - inicio, ('portas',))
 
-    def add_flow(self, datapath, priority, match, actions, buffer_id=None):
+    def resumo_estatisticas(self, n=None):
+        """Maiores fluxos, maiores emissores (rx nas portas) e elefantes, para o /estatisticas."""
+        n = n or self.ESTATISTICAS_TOP
+        fluxos = [{'dpid': f'{dpid:016x}', 'prioridade': chave[0], 'match': dict(chave[1]),
+                   'bps': bps, 'pps': pps, 'elefante': (dpid, chave) in self.monitor.elefantes}
+                  for dpid, chave, bps, pps in self.monitor.maiores_fluxos(n)]
+        portas = [{'dpid': f'{dpid:016x}', 'porta': porta, 'bps': bps, 'pps': pps,
+                   'historico': [round(b) for _, b, _ in self.monitor.historico_porta(dpid, porta)]}
+                  for dpid, porta, bps, pps in self.monitor.maiores_portas(n)]
+        elefantes = [{'dpid': f'{dpid:016x}', 'prioridade': chave[0], 'match': dict(chave[1]),
+                      'bps': self.monitor.taxa_fluxo(dpid, chave)[0]}
+                     for dpid, chave in sorted(self.monitor.elefantes, key=lambda e: e[0])]
+        return {'intervalo_s': self.ESTATISTICAS_INTERVALO, 'resumo': self.monitor.estatisticas(),
+                'fluxos': fluxos, 'emissores': portas, 'elefantes': elefantes}
+
+    def invalidar_fluxos(self, entradas):
+        """Remove dos switches e do cache os fluxos em direção aos MACs informados."""
+        for dpid, mac, _ in entradas:
+            if self.tabela_mac.consultar(dpid, mac) is None:
+                # MAC expirado/despejado (não apenas movido): a associação ARP também caduca
+                self.proxy_arp.invalidar_mac(mac, dpid)
+            if self.flows_instalados.pop((dpid, mac), None) is None:
+                continue
+            datapath = self.datapaths.get(dpid)
+            if datapath is not None:
+                self.remover_fluxos_destino(datapath, mac)
+
+    def remover_fluxos_destino(self, datapath, mac):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        mod = parser.OFPFlowMod(datapath=datapath,
+                                cookie=self.COOKIE_APRENDIDO,
+                                cookie_mask=0xffffffffffffffff,
+                                command=ofproto.OFPFC_DELETE,
+                                out_port=ofproto.OFPP_ANY,
+                                out_group=ofproto.OFPG_ANY,
+                                match=parser.OFPMatch(eth_dst=mac_texto(mac)))
+        self.enviar(datapath, mod)
+
+    def add_flow(self, datapath, priority, match, actions, buffer_id=None,
+                 idle_timeout=0, hard_timeout=0, flags=0, cookie=0, meter_id=None):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
 
         inst = [parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS,
                                              actions)]
+        if meter_id is not None:
+            inst.insert(0, parser.OFPInstructionMeter(meter_id, ofproto.OFPIT_METER))
 
-        mod = parser.OFPFlowMod(datapath=datapath,
+        if buffer_id is None:
+            buffer_id = ofproto.OFP_NO_BUFFER
+
+        mod = parser.OFPFlowMod(datapath=datapath, cookie=cookie,
                                 priority=priority, match=match,
-                                instructions=inst, buffer_id=buffer_id)
-        datapath.send_msg(mod)
+                                instructions=inst, buffer_id=buffer_id,
+                                idle_timeout=idle_timeout,
+                                hard_timeout=hard_timeout, flags=flags)
+        self.enviar(datapath, mod)
+
+    def instalar_fluxo_unicast(self, datapath, in_port, dst, out_port, buffer_id=None):
+        """Instala o fluxo (in_port, eth_dst) -> out_port, evitando FlowMods repetidos.
+
+        Retorna True se um FlowMod foi enviado.
+        """
+        portas = self.flows_instalados.setdefault((datapath.id, dst), {})
+        if portas.get(in_port) == out_port:
+            return False
+
+        parser = datapath.ofproto_parser
+        actions = [parser.OFPActionOutput(out_port)]
+        match = parser.OFPMatch(in_port=in_port, eth_dst=mac_texto(dst))
+        self.add_flow(datapath, 1, match, actions, buffer_id,
+                      idle_timeout=self.IDLE_TIMEOUT,
+                      hard_timeout=self.HARD_TIMEOUT,
+                      flags=datapath.ofproto.OFPFF_SEND_FLOW_REM,
+                      cookie=self.COOKIE_APRENDIDO)
+        portas[in_port] = out_port
+        return True
+
+    @set_ev_cls(ofp_event.EventOFPFlowRemoved, MAIN_DISPATCHER)
+    def flow_removed_handler(self, ev):
+        msg = ev.msg
+        if msg.cookie != self.COOKIE_APRENDIDO:
+            return
+        if msg.reason == msg.datapath.ofproto.OFPRR_DELETE:
+            # As remoções pedidas por invalidar_fluxos já limparam o cache; um aviso
+            # atrasado apagaria a entrada reaprendida depois do DELETE
+            return
+        try:
+            in_port = msg.match['in_port']
+            chave = (msg.datapath.id, mac_binario(msg.match['eth_dst']))
+        except KeyError:
+            return
+        portas = self.flows_instalados.get(chave)
+        if portas is not None:
+            portas.pop(in_port, None)
+            if not portas:
+                del self.flows_instalados[chave]
+
+    def tratar_arp(self, datapath, in_port, pkt):
+        """Aprende a associação do ARP e responde pedidos de IPs conhecidos.
+
+        Retorna True se o pedido foi respondido pelo controlador (sem inundação).
+        """
+        pkt_arp = pkt.get_protocol(arp.arp)
+        if pkt_arp is None:
+            return False
+        mac_origem = mac_binario(pkt_arp.src_mac)
+        self.proxy_arp.aprender(pkt_arp.src_ip, mac_origem, datapath.id, in_port)
+
+        # ARP gratuito (src_ip == dst_ip) segue sendo inundado para atualizar os vizinhos
+        if pkt_arp.opcode != arp.ARP_REQUEST or pkt_arp.src_ip == pkt_arp.dst_ip:
+            return False
+        mac_alvo = self.proxy_arp.consultar(pkt_arp.dst_ip)
+        if mac_alvo is None or mac_alvo == mac_origem:
+            self.proxy_arp.inundacoes += 1
+            return False
+
+        self.responder_arp(datapath, in_port, pkt_arp, mac_texto(mac_alvo))
+        self.proxy_arp.respostas += 1
+        return True
+
+    def responder_arp(self, datapath, in_port, pedido, mac_alvo):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+
+        resposta = packet.Packet()
+        resposta.add_protocol(ethernet.ethernet(dst=pedido.src_mac, src=mac_alvo,
+                                                ethertype=ETH_TYPE_ARP))
+        resposta.add_protocol(arp.arp(opcode=arp.ARP_REPLY,
+                                      src_mac=mac_alvo, src_ip=pedido.dst_ip,
+                                      dst_mac=pedido.src_mac, dst_ip=pedido.src_ip))
+        resposta.serialize()
+
+        out = parser.OFPPacketOut(
+            datapath=datapath, buffer_id=ofproto.OFP_NO_BUFFER,
+            in_port=ofproto.OFPP_CONTROLLER,
+            actions=[parser.OFPActionOutput(in_port)], data=resposta.data
+        )
+        self.enviar(datapath, out)
 
     @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
     def packet_in_handler(self, ev):
+        inicio = time.perf_counter()
+        try:
+            self.processar_packet_in(ev)
+        finally:
+            self.m_packet_in.observar(time.perf_counter() - inicio)
+
+    def processar_packet_in(self, ev):
         msg = ev.msg
         datapath = msg.datapath
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
         in_port = msg.match['in_port']
 
-        pkt = packet.Packet(msg.data)
-        eth = pkt.get_protocols(ethernet.ethernet)[0]
+        if self.LIMITE_ATIVO and not self.limitador.permitir(datapath.id, in_port):
+            return
+
+        eth = parse_ethernet(msg.data)
+        if eth is None:
+            return
+        dst, src, ethertype = eth
+
+        # Fallback para o parser completo só quando as camadas superiores são usadas
+        pkt = None
+        if ethertype in self.ethertypes_parse_completo:
+            pkt = packet.Packet(msg.data)
 
-        dst = eth.dst
-        src = eth.src
         dpid = datapath.id
-        self.mac_to_port.setdefault(dpid, {})
+        invalidadas = self.tabela_mac.aprender(dpid, src, in_port)
+        if invalidadas:
+            self.invalidar_fluxos(invalidadas)
 
-        self.mac_to_port[dpid][src] = in_port
+        if pkt is not None and ethertype == ETH_TYPE_ARP and self.ARP_PROXY_ATIVO:
+            if self.tratar_arp(datapath, in_port, pkt):
+                return
 
-        out_port = self.mac_to_port[dpid].get(dst, ofproto.OFPP_FLOOD)
+        out_port = self.tabela_mac.consultar(dpid, dst)
+        if out_port is None:
+            out_port = ofproto.OFPP_FLOOD
         actions = [parser.OFPActionOutput(out_port)]
 
-        if msg.buffer_id != ofproto.OFP_NO_BUFFER:
-            self.add_flow(datapath, 1, parser.OFPMatch(in_port=in_port, eth_dst=dst), actions, msg.buffer_id)
-            return
-        else:
-            self.add_flow(datapath, 1, parser.OFPMatch(in_port=in_port, eth_dst=dst), actions)
+        # Só instala fluxo quando o destino já foi aprendido; destinos
+        # desconhecidos são apenas inundados via PacketOut
+        if out_port != ofproto.OFPP_FLOOD:
+            if msg.buffer_id != ofproto.OFP_NO_BUFFER:
+                if self.instalar_fluxo_unicast(datapath, in_port, dst, out_port, msg.buffer_id):
+                    return
+            else:
+                self.instalar_fluxo_unicast(datapath, in_port, dst, out_port)
+
+        data = None
+        if msg.buffer_id == ofproto.OFP_NO_BUFFER:
+            data = msg.data
 
         out = parser.OFPPacketOut(
             datapath=datapath, buffer_id=msg.buffer_id,
-            in_port=in_port, actions=actions, data=msg.data
+            in_port=in_port, actions=actions, data=data
         )
-        datapath.send_msg(out)
+        self.enviar(datapath, out)
+
+
+class MetricasController(ControllerBase):
+    def __init__(self, req, link, data, **config):
+        super(MetricasController, self).__init__(req, link, data, **config)
+        self.app = data['app']
+
+    @route('metricas', '/metrics', methods=['GET'])
+    def metricas(self, req, **kwargs):
+        return Response(content_type='text/plain', charset='utf-8',
+                        body=self.app.metricas.exportar_prometheus())
 
+    @route('estatisticas', '/estatisticas', methods=['GET'])
+    def estatisticas(self, req, **kwargs):
+        try:
+            n = int(req.GET.get('n', 0))
+        except ValueError:
+            return Response(status=400, content_type='text/plain', charset='utf-8', body='n inválido\n')
+        return Response(content_type='application/json', charset='utf-8',
+                        body=json.dumps(self.app.resumo_estatisticas(n), default=str, indent=2))
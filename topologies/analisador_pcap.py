@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""Analisador de capturas pcap com mmap e processamento vetorizado em lotes.
+
+O arquivo é mapeado em memória (``mmap``). Os registros são percorridos
+sem copiar os quadros: o laço Python lê só os 16 bytes do cabeçalho de
+cada registro e anota o deslocamento. A cada ``tamanho_lote`` pacotes, os
+primeiros bytes de todos os quadros do lote são reunidos em uma matriz
+NumPy, e os campos Ethernet/IPv4/TCP/UDP/ICMP são decodificados de uma só
+vez. A memória usada é constante em relação ao tamanho da captura e só
+depende do lote e dos limites de fluxos/pendências.
+
+Resultados:
+- pacotes e bytes por 5-tupla (no máximo ``max_fluxos``; os menores fluxos
+  são agregados em "outros" quando o limite é atingido);
+- RTT dos ecos ICMP (pedido -> resposta) por par de hosts;
+- latência do handshake TCP (SYN -> SYN/ACK -> ACK);
+- fração do tráfego roteado (10.0.1.0/24 <-> 10.0.2.0/24) e local.
+
+As latências vão para histogramas logarítmicos de tamanho fixo
+(``HistogramaLog``, ~1% de erro relativo nos percentis), preenchidos lote a
+lote com ``np.searchsorted``/``np.bincount``.
+
+Uso:
+    python3 analisador_pcap.py captura.pcap [--top 20] [--json resumo.json]
+"""
+import argparse
+import ipaddress
+import json
+import mmap
+import struct
+import sys
+import time
+
+import numpy as np
+
+# linktype -> deslocamento do cabeçalho IP (o ethertype fica nos 2 bytes anteriores)
+DESLOCAMENTO_L3 = {1: 14, 113: 16, 101: 0}
+BYTES_CABECALHO = 96
+
+REDE_A = ipaddress.ip_network('10.0.1.0/24')
+REDE_B = ipaddress.ip_network('10.0.2.0/24')
+
+TCP_SYN, TCP_ACK = 0x02, 0x10
+ICMP_ECHO_REPLY, ICMP_ECHO_REQUEST = 0, 8
+PROTOCOLOS = {1: 'icmp', 6: 'tcp', 17: 'udp'}
+
+
+
+class HistogramaLog:
+    """Histograma de buckets logarítmicos: percentis aproximados em memória fixa, por lotes."""
+
+    def __init__(self, minimo=1e-3, maximo=1e5, por_decada=100):
+        decadas = np.log10(maximo) - np.log10(minimo)
+        self.limites = np.logspace(np.log10(minimo), np.log10(maximo), int(decadas * por_decada) + 1)
+        self.contagens = np.zeros(len(self.limites) + 1, dtype=np.int64)
+        self.n = 0
+        self.soma = 0.0
+        self.soma_quadrados = 0.0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+
+    def adicionar_lote(self, valores):
+        valores = np.asarray(valores, dtype=float)
+        if not len(valores):
+            return
+        self.contagens += np.bincount(np.searchsorted(self.limites, valores), minlength=len(self.contagens))
+        self.n += len(valores)
+        self.soma += float(valores.sum())
+        self.soma_quadrados += float((valores ** 2).sum())
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+
+    def percentil(self, p):
+        if not self.n:
+            return float('nan')
+        i = int(np.searchsorted(np.cumsum(self.contagens), p / 100 * self.n))
+        # Centro geométrico do bucket, limitado pelos extremos observados
+        baixo = self.limites[i - 1] if i > 0 else self.minimo
+        alto = self.limites[i] if i < len(self.limites) else self.maximo
+        return float(min(max(np.sqrt(baixo * alto), self.minimo), self.maximo))
+
+    def resumo(self):
+        media = self.soma / self.n if self.n else float('nan')
+        variancia = (self.soma_quadrados - self.n * media ** 2) / (self.n - 1) if self.n > 1 else 0.0
+        return {'n': self.n, 'media': media, 'desvio': float(np.sqrt(max(variancia, 0.0))),
+                'min': self.minimo if self.n else float('nan'), 'max': self.maximo if self.n else float('nan'),
+                'p50': self.percentil(50), 'p90': self.percentil(90), 'p99': self.percentil(99)}
+
+
+def agrupar(a, b):
+    """Agrupa pares (a, b) de uint64: retorna (índice do primeiro de cada grupo, grupo de cada elemento).
+
+    Mais rápido que ``np.unique`` em arrays estruturados, que ordena por comparação de registros.
+    """
+    ordem = np.lexsort((b, a))
+    a_ord, b_ord = a[ordem], b[ordem]
+    novo = np.empty(len(ordem), dtype=bool)
+    novo[:1] = True
+    novo[1:] = (a_ord[1:] != a_ord[:-1]) | (b_ord[1:] != b_ord[:-1])
+    inverso = np.empty(len(ordem), dtype=np.int64)
+    inverso[ordem] = np.cumsum(novo) - 1
+    return ordem[novo], inverso
+
+
+def _chave_fluxo(campos, indices):
+    """5-tupla empacotada em dois uint64 (src|dst, sport|dport|proto)."""
+    a = (campos['src'][indices].astype(np.uint64) << np.uint64(32)) | campos['dst'][indices].astype(np.uint64)
+    b = ((campos['sport'][indices].astype(np.uint64) << np.uint64(24))
+         | (campos['dport'][indices].astype(np.uint64) << np.uint64(8))
+         | campos['proto'][indices].astype(np.uint64))
+    return a, b
+
+
+def abrir_pcap(caminho):
+    """Mapeia o arquivo e retorna (mmap, struct do registro, divisor da fração, linktype)."""
+    with open(caminho, 'rb') as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapa) < 24:
+        raise ValueError(f"Arquivo '{caminho}' curto demais para ser um pcap.")
+    magic = struct.unpack_from('<I', mapa)[0]
+    formatos = {0xa1b2c3d4: ('<', 1e6), 0xa1b23c4d: ('<', 1e9),
+                0xd4c3b2a1: ('>', 1e6), 0x4d3cb2a1: ('>', 1e9)}
+    if magic not in formatos:
+        mapa.close()
+        raise ValueError(f"Arquivo '{caminho}' não é um pcap clássico (pcapng não suportado).")
+    ordem, divisor = formatos[magic]
+    linktype = struct.unpack_from(ordem + 'I', mapa, 20)[0]
+    return mapa, struct.Struct(ordem + 'IIII'), divisor, linktype
+
+
+def lotes_registros(mapa, registro, divisor, tamanho_lote=16384):
+    """Gera (deslocamentos, comprimentos capturados, comprimentos originais, instantes) por lote."""
+    pos, fim = 24, len(mapa)
+    offs, incl, orig, ts = [], [], [], []
+    while pos + registro.size <= fim:
+        seg, frac, n_incl, n_orig = registro.unpack_from(mapa, pos)
+        pos += registro.size
+        if pos + n_incl > fim:
+            break
+        offs.append(pos)
+        incl.append(n_incl)
+        orig.append(n_orig)
+        ts.append(seg + frac / divisor)
+        pos += n_incl
+        if len(offs) == tamanho_lote:
+            yield np.array(offs), np.array(incl), np.array(orig), np.array(ts)
+            offs, incl, orig, ts = [], [], [], []
+    if offs:
+        yield np.array(offs), np.array(incl), np.array(orig), np.array(ts)
+
+
+def decodificar_lote(dados, offs, incl, base):
+    """Decodifica os cabeçalhos de um lote; retorna um dict de arrays (um elemento por pacote)."""
+    n = len(offs)
+    colunas = np.arange(BYTES_CABECALHO)
+    indices = np.minimum(offs[:, None] + colunas, len(dados) - 1)
+    cab = np.where(colunas < incl[:, None], dados[indices], 0).astype(np.uint32)
+
+    if base >= 2:
+        ethertype = (cab[:, base - 2] << 8) | cab[:, base - 1]
+        ip = (ethertype == 0x0800) & (cab[:, base] >> 4 == 4)
+    else:
+        ip = cab[:, base] >> 4 == 4
+    ihl = (cab[:, base] & 0x0f) * 4
+    proto = cab[:, base + 9]
+    src = (cab[:, base + 12] << 24) | (cab[:, base + 13] << 16) | (cab[:, base + 14] << 8) | cab[:, base + 15]
+    dst = (cab[:, base + 16] << 24) | (cab[:, base + 17] << 16) | (cab[:, base + 18] << 8) | cab[:, base + 19]
+
+    linhas = np.arange(n)
+    l4 = base + ihl
+    l4_ok = ip & (l4 + 14 <= np.minimum(incl, BYTES_CABECALHO))
+    l4c = np.where(l4_ok, l4, 0)
+
+    def campo16(deslocamento):
+        return (cab[linhas, l4c + deslocamento] << 8) | cab[linhas, l4c + deslocamento + 1]
+
+    portas = l4_ok & ((proto == 6) | (proto == 17))
+    return {
+        'ip': ip,
+        'proto': np.where(ip, proto, 0),
+        'src': src,
+        'dst': dst,
+        'sport': np.where(portas, campo16(0), 0),
+        'dport': np.where(portas, campo16(2), 0),
+        'tcp_flags': np.where(l4_ok & (proto == 6), cab[linhas, l4c + 13], 0),
+        'icmp_tipo': np.where(l4_ok & (proto == 1), cab[linhas, l4c], 255),
+        'icmp_id': campo16(4),
+        'icmp_seq': campo16(6),
+    }
+
+
+def _ip(valor):
+    return str(ipaddress.IPv4Address(int(valor)))
+
+
+class AnalisadorPcap:
+    def __init__(self, max_fluxos=100000, max_pendentes=65536, rede_a=REDE_A, rede_b=REDE_B):
+        self.max_fluxos = max_fluxos
+        self.max_pendentes = max_pendentes
+        self.rede_a, self.rede_b = rede_a, rede_b
+        self.fluxos = {}
+        self.outros = [0, 0]
+        self.pacotes = 0
+        self.bytes = 0
+        self.nao_ip = 0
+        self.trafego = {'roteado': [0, 0], 'local': [0, 0], 'outro': [0, 0]}
+        self.rtt_icmp = {}
+        self.rtt_icmp_total = HistogramaLog()
+        self.handshake_synack = HistogramaLog()
+        self.handshake_total = HistogramaLog()
+        self._ecos = {}
+        self._syns = {}
+        self._synacks = {}
+        self.ecos_sem_resposta = 0
+        self.inicio = self.fim = None
+
+    def _limitar(self, pendentes):
+        # Dicts preservam a ordem de inserção: descarta as pendências mais antigas
+        excesso = len(pendentes) - self.max_pendentes
+        if excesso > 0:
+            for chave in list(pendentes)[:excesso]:
+                del pendentes[chave]
+            return excesso
+        return 0
+
+    def _contar_fluxos(self, campos, orig):
+        ip = np.flatnonzero(campos['ip'])
+        if not len(ip):
+            return
+        primeiros, inverso = agrupar(*_chave_fluxo(campos, ip))
+        pacotes = np.bincount(inverso, minlength=len(primeiros))
+        octetos = np.bincount(inverso, weights=orig[ip], minlength=len(primeiros))
+        unicas = zip(*(campos[c][ip[primeiros]].tolist() for c in ('src', 'dst', 'sport', 'dport', 'proto')))
+        for chave, p, b in zip(unicas, pacotes.tolist(), octetos.tolist()):
+            contador = self.fluxos.get(chave)
+            if contador is None:
+                self.fluxos[chave] = [p, int(b)]
+            else:
+                contador[0] += p
+                contador[1] += int(b)
+        if len(self.fluxos) > self.max_fluxos:
+            # Mantém os maiores fluxos; os menores vão para "outros"
+            ordenados = sorted(self.fluxos.items(), key=lambda item: item[1][1], reverse=True)
+            for _, (p, b) in ordenados[self.max_fluxos // 2:]:
+                self.outros[0] += p
+                self.outros[1] += b
+            self.fluxos = dict(ordenados[:self.max_fluxos // 2])
+
+    def _classificar_trafego(self, campos, orig):
+        a_ini, a_fim = int(self.rede_a.network_address), int(self.rede_a.broadcast_address)
+        b_ini, b_fim = int(self.rede_b.network_address), int(self.rede_b.broadcast_address)
+        src, dst, ip = campos['src'], campos['dst'], campos['ip']
+        src_a, dst_a = (src >= a_ini) & (src <= a_fim), (dst >= a_ini) & (dst <= a_fim)
+        src_b, dst_b = (src >= b_ini) & (src <= b_fim), (dst >= b_ini) & (dst <= b_fim)
+        roteado = ip & ((src_a & dst_b) | (src_b & dst_a))
+        local = ip & ((src_a & dst_a) | (src_b & dst_b))
+        outro = ~(roteado | local)
+        for nome, mascara in (('roteado', roteado), ('local', local), ('outro', outro)):
+            self.trafego[nome][0] += int(mascara.sum())
+            self.trafego[nome][1] += int(orig[mascara].sum())
+
+    def _eventos_icmp(self, campos, ts):
+        tipo = campos['icmp_tipo']
+        selecionados = np.flatnonzero((tipo == ICMP_ECHO_REQUEST) | (tipo == ICMP_ECHO_REPLY))
+        src, dst = campos['src'][selecionados].tolist(), campos['dst'][selecionados].tolist()
+        ids, seqs = campos['icmp_id'][selecionados].tolist(), campos['icmp_seq'][selecionados].tolist()
+        rtts = {}
+        for t, s, d, i, q, instante in zip(tipo[selecionados].tolist(), src, dst, ids, seqs,
+                                            ts[selecionados].tolist()):
+            if t == ICMP_ECHO_REQUEST:
+                self._ecos[(s, d, i, q)] = instante
+                continue
+            enviado = self._ecos.pop((d, s, i, q), None)
+            if enviado is not None:
+                rtts.setdefault((d, s), []).append((instante - enviado) * 1000)
+        for par, valores in rtts.items():
+            if par not in self.rtt_icmp:
+                self.rtt_icmp[par] = HistogramaLog()
+            self.rtt_icmp[par].adicionar_lote(valores)
+            self.rtt_icmp_total.adicionar_lote(valores)
+        self.ecos_sem_resposta += self._limitar(self._ecos)
+
+    def _eventos_tcp(self, campos, ts):
+        flags = campos['tcp_flags']
+        tcp = campos['proto'] == 6
+        syn = (flags & TCP_SYN) != 0
+        ack = (flags & TCP_ACK) != 0
+        # Todos os SYN e SYN/ACK, mas só o primeiro ACK puro de cada conexão no lote:
+        # é o único candidato a fechar um handshake, e evita iterar sobre o tráfego de dados
+        acks = np.flatnonzero(tcp & (flags == TCP_ACK))
+        if len(acks):
+            acks = acks[agrupar(*_chave_fluxo(campos, acks))[0]]
+        selecionados = np.union1d(np.flatnonzero(tcp & syn), acks)
+        if not len(selecionados):
+            return
+        synack, total = [], []
+        colunas = [campos[c][selecionados].tolist() for c in ('src', 'dst', 'sport', 'dport')]
+        for e_syn, e_ack, s, d, sp, dp, instante in zip(syn[selecionados].tolist(), ack[selecionados].tolist(),
+                                                        *colunas, ts[selecionados].tolist()):
+            if e_syn and not e_ack:
+                self._syns[(s, d, sp, dp)] = instante
+            elif e_syn and e_ack:
+                enviado = self._syns.pop((d, s, dp, sp), None)
+                if enviado is not None:
+                    synack.append((instante - enviado) * 1000)
+                    self._synacks[(d, s, dp, sp)] = enviado
+            elif self._synacks:
+                enviado = self._synacks.pop((s, d, sp, dp), None)
+                if enviado is not None:
+                    total.append((instante - enviado) * 1000)
+        self.handshake_synack.adicionar_lote(synack)
+        self.handshake_total.adicionar_lote(total)
+        self._limitar(self._syns)
+        self._limitar(self._synacks)
+
+    def processar(self, caminho, tamanho_lote=16384):
+        mapa, registro, divisor, linktype = abrir_pcap(caminho)
+        if linktype not in DESLOCAMENTO_L3:
+            mapa.close()
+            raise ValueError(f"Linktype {linktype} não suportado (use Ethernet, Linux SLL ou IP bruto).")
+        base = DESLOCAMENTO_L3[linktype]
+        dados = np.frombuffer(mapa, dtype=np.uint8)
+        try:
+            for offs, incl, orig, ts in lotes_registros(mapa, registro, divisor, tamanho_lote):
+                campos = decodificar_lote(dados, offs, incl, base)
+                self.pacotes += len(offs)
+                self.bytes += int(orig.sum())
+                self.nao_ip += int((~campos['ip']).sum())
+                self.inicio = ts[0] if self.inicio is None else self.inicio
+                self.fim = ts[-1]
+                self._contar_fluxos(campos, orig)
+                self._classificar_trafego(campos, orig)
+                self._eventos_icmp(campos, ts)
+                self._eventos_tcp(campos, ts)
+        finally:
+            # O mmap só pode ser fechado sem views exportadas
+            del dados
+            mapa.close()
+        return self
+
+    def relatorio(self, top=20):
+        maiores = sorted(self.fluxos.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        total_ip = sum(p for p, _ in self.trafego.values()) or 1
+        total_bytes = sum(b for _, b in self.trafego.values()) or 1
+        return {
+            'pacotes': self.pacotes,
+            'bytes': self.bytes,
+            'nao_ip': self.nao_ip,
+            'duracao_s': (self.fim - self.inicio) if self.inicio is not None else 0.0,
+            'fluxos': len(self.fluxos),
+            'fluxos_outros': {'pacotes': self.outros[0], 'bytes': self.outros[1]},
+            'top_fluxos': [
+                {'src': _ip(s), 'dst': _ip(d), 'sport': sp, 'dport': dp,
+                 'proto': PROTOCOLOS.get(pr, pr), 'pacotes': c[0], 'bytes': c[1]}
+                for (s, d, sp, dp, pr), c in maiores
+            ],
+            'trafego': {
+                nome: {'pacotes': p, 'bytes': b, 'fracao_pacotes': p / total_ip, 'fracao_bytes': b / total_bytes}
+                for nome, (p, b) in self.trafego.items()
+            },
+            'rtt_icmp_ms': self.rtt_icmp_total.resumo(),
+            'rtt_icmp_por_par_ms': {f'{_ip(s)} -> {_ip(d)}': e.resumo()
+                                    for (s, d), e in sorted(self.rtt_icmp.items())},
+            'ecos_sem_resposta': self.ecos_sem_resposta + len(self._ecos),
+            'handshake_tcp_syn_synack_ms': self.handshake_synack.resumo(),
+            'handshake_tcp_total_ms': self.handshake_total.resumo(),
+        }
+
+
+def imprimir(relatorio):
+    print(f"Pacotes: {relatorio['pacotes']}  Bytes: {relatorio['bytes']}  "
+          f"Não-IP: {relatorio['nao_ip']}  Duração: {relatorio['duracao_s']:.2f}s  Fluxos: {relatorio['fluxos']}")
+    print("\n--- Tráfego roteado vs local ---")
+    for nome, t in relatorio['trafego'].items():
+        print(f"  {nome:<8} {t['pacotes']:>10} pkts ({t['fracao_pacotes']:6.1%})  "
+              f"{t['bytes']:>12} bytes ({t['fracao_bytes']:6.1%})")
+    print("\n--- Maiores fluxos (5-tupla) ---")
+    for f in relatorio['top_fluxos']:
+        print(f"  {f['src']:>15}:{f['sport']:<5} -> {f['dst']:>15}:{f['dport']:<5} {f['proto']!s:<4} "
+              f"{f['pacotes']:>8} pkts {f['bytes']:>10} bytes")
+    print("\n--- RTT ICMP (ms) por par ---")
+    for par, e in relatorio['rtt_icmp_por_par_ms'].items():
+        print(f"  {par:<32} n={e['n']:<5} média={e['media']:.3f} p50={e['p50']:.3f} p99={e['p99']:.3f}")
+    print(f"  Ecos sem resposta: {relatorio['ecos_sem_resposta']}")
+    for titulo, chave in (('SYN -> SYN/ACK', 'handshake_tcp_syn_synack_ms'), ('SYN -> ACK', 'handshake_tcp_total_ms')):
+        e = relatorio[chave]
+        if e['n']:
+            print(f"\nHandshake TCP {titulo} (ms): n={e['n']} média={e['media']:.3f} "
+                  f"p50={e['p50']:.3f} p99={e['p99']:.3f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Analisa capturas pcap em memória constante.")
+    ap.add_argument('pcap', nargs='?', default='captura.pcap')
+    ap.add_argument('--top', type=int, default=20)
+    ap.add_argument('--lote', type=int, default=16384)
+    ap.add_argument('--max-fluxos', type=int, default=100000)
+    ap.add_argument('--json', help="Grava o relatório completo em JSON")
+    args = ap.parse_args()
+
+    inicio = time.perf_counter()
+    analisador = AnalisadorPcap(args.max_fluxos).processar(args.pcap, args.lote)
+    relatorio = analisador.relatorio(args.top)
+    decorrido = time.perf_counter() - inicio
+    imprimir(relatorio)
+    print(f"\n{relatorio['pacotes']} pacotes analisados em {decorrido:.2f}s "
+          f"({relatorio['pacotes'] / decorrido if decorrido else 0:,.0f} pacotes/s)")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(relatorio, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Armazém de resultados dos testes de desempenho (SQLite, somente inserção).
+
+Cada execução recebe um id, o instante de início e metadados (JSON). Cada
+teste guarda o valor resumido e a série bruta de amostras (RTT de cada
+resposta do ping, banda de cada intervalo do iperf3) em um BLOB compacto de
+float64, que vira um array NumPy com ``np.frombuffer`` sem conversões
+linha a linha. Gatilhos impedem UPDATE/DELETE: o histórico só cresce.
+
+As estatísticas (média, percentis, jitter, perda, intervalo de confiança)
+são calculadas para milhares de execuções de uma vez: todas as amostras são
+concatenadas em um único vetor e agregadas por grupo com ``np.bincount`` e
+uma ordenação ``np.lexsort``, sem laços Python por amostra.
+
+Uso:
+    python3 armazem_resultados.py importar resultados_teste.csv
+    python3 armazem_resultados.py estatisticas --metrica 'RTT(ms)' --agrupar origem destino
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from statistics import NormalDist
+
+import numpy as np
+
+BANCO_PADRAO = 'resultados.db'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    id INTEGER PRIMARY KEY,
+    inicio REAL NOT NULL,
+    descricao TEXT,
+    metadados TEXT
+);
+CREATE TABLE IF NOT EXISTS testes (
+    id INTEGER PRIMARY KEY,
+    execucao INTEGER NOT NULL REFERENCES execucoes(id),
+    tipo TEXT NOT NULL,
+    origem TEXT NOT NULL,
+    destino TEXT NOT NULL,
+    metrica TEXT NOT NULL,
+    valor REAL,
+    tentativas INTEGER,
+    duracao REAL,
+    n_amostras INTEGER NOT NULL DEFAULT 0,
+    amostras BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_testes_metrica ON testes(metrica, execucao);
+CREATE TRIGGER IF NOT EXISTS execucoes_sem_update BEFORE UPDATE ON execucoes
+    BEGIN SELECT RAISE(ABORT, 'armazém somente de inserção'); END;
+CREATE TRIGGER IF NOT EXISTS execucoes_sem_delete BEFORE DELETE ON execucoes
+    BEGIN SELECT RAISE(ABORT, 'armazém somente de inserção'); END;
+CREATE TRIGGER IF NOT EXISTS testes_sem_update BEFORE UPDATE ON testes
+    BEGIN SELECT RAISE(ABORT, 'armazém somente de inserção'); END;
+CREATE TRIGGER IF NOT EXISTS testes_sem_delete BEFORE DELETE ON testes
+    BEGIN SELECT RAISE(ABORT, 'armazém somente de inserção'); END;
+"""
+
+AGRUPAMENTOS = ('execucao', 'tipo', 'origem', 'destino')
+PERCENTIS = (50, 90, 95, 99)
+
+
+class ArmazemResultados:
+    def __init__(self, caminho=BANCO_PADRAO):
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.executescript(_ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def fechar(self):
+        self.conexao.commit()
+        self.conexao.close()
+
+    def nova_execucao(self, descricao='', metadados=None, inicio=None):
+        cursor = self.conexao.execute(
+            'INSERT INTO execucoes (inicio, descricao, metadados) VALUES (?, ?, ?)',
+            (inicio or time.time(), descricao, json.dumps(metadados or {})))
+        return cursor.lastrowid
+
+    def registrar(self, execucao, tipo, origem, destino, metrica, valor, amostras=(),
+                  tentativas=1, duracao=None):
+        serie = np.asarray(amostras, dtype='<f8')
+        self.conexao.execute(
+            'INSERT INTO testes (execucao, tipo, origem, destino, metrica, valor, tentativas, '
+            'duracao, n_amostras, amostras) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (execucao, tipo, origem, destino, metrica, valor, tentativas, duracao,
+             len(serie), serie.tobytes() if len(serie) else None))
+
+    def registrar_testes(self, execucao, testes):
+        """Grava os testes de motor_testes.MotorTestes (resumos e séries brutas)."""
+        with self.conexao:
+            for t in testes:
+                metricas = t.resultado or {('RTT(ms)' if t.tipo == 'ping' else 'Banda(Mbps)'): None}
+                for metrica, valor in metricas.items():
+                    self.registrar(execucao, t.tipo, t.origem.name, t.destino.name, metrica, valor,
+                                   t.amostras.get(metrica, ()), t.tentativas, t.duracao)
+
+    def importar_csv(self, caminho, descricao=None):
+        """Importa um CSV 'Teste,Origem,Destino,Metrica,Valor' como uma execução sem séries brutas."""
+        with open(caminho, newline='', encoding='utf-8') as f:
+            leitor = csv.reader(f)
+            next(leitor, None)
+            linhas = [l for l in leitor if len(l) >= 5]
+        with self.conexao:
+            execucao = self.nova_execucao(descricao or f'importado de {caminho}', {'origem_csv': caminho})
+            for teste, origem, destino, metrica, valor in (l[:5] for l in linhas):
+                valor = float(valor) if valor.strip() else None
+                self.registrar(execucao, teste.lower(), origem, destino, metrica, valor, tentativas=None)
+        return execucao, len(linhas)
+
+    def execucoes(self):
+        return self.conexao.execute(
+            'SELECT e.id, e.inicio, e.descricao, COUNT(t.id) FROM execucoes e '
+            'LEFT JOIN testes t ON t.execucao = e.id GROUP BY e.id ORDER BY e.id').fetchall()
+
+    def _consultar(self, metrica, agrupar, tipo=None, execucoes=None):
+        filtros, parametros = ['metrica = ?', 'valor IS NOT NULL'], [metrica]
+        if tipo:
+            filtros.append('tipo = ?')
+            parametros.append(tipo)
+        if execucoes:
+            filtros.append(f'execucao IN ({",".join("?" * len(execucoes))})')
+            parametros.extend(execucoes)
+        colunas = ', '.join(agrupar)
+        return self.conexao.execute(
+            f'SELECT {colunas}, valor, n_amostras, amostras FROM testes '
+            f'WHERE {" AND ".join(filtros)} ORDER BY id', parametros).fetchall()
+
+    def estatisticas(self, metrica='RTT(ms)', agrupar=('origem', 'destino'), tipo=None,
+                     execucoes=None, percentis=PERCENTIS, confianca=0.95):
+        """Estatísticas por grupo; retorna uma lista de dicts, um por combinação de ``agrupar``."""
+        agrupar = tuple(agrupar)
+        invalidos = set(agrupar) - set(AGRUPAMENTOS)
+        if invalidos:
+            raise ValueError(f"Agrupamento inválido: {', '.join(sorted(invalidos))}")
+        linhas = self._consultar(metrica, agrupar, tipo, execucoes)
+        if not linhas:
+            return []
+        k = len(agrupar)
+
+        # Grupo de cada teste (np.unique sobre as chaves) e a série de cada teste;
+        # testes sem série bruta (ex.: importados do CSV) contribuem com o valor resumido
+        chaves = np.array(['\x1f'.join(map(str, l[:k])) for l in linhas])
+        nomes, grupo_teste = np.unique(chaves, return_inverse=True)
+        n_grupos = len(nomes)
+        tamanhos = np.array([l[k + 1] or 1 for l in linhas])
+        valores = np.frombuffer(b''.join(l[k + 2] if l[k + 1] else np.float64(l[k]).tobytes()
+                                         for l in linhas), dtype='<f8')
+
+        grupo = np.repeat(grupo_teste, tamanhos)
+        teste = np.repeat(np.arange(len(linhas)), tamanhos)
+        n = np.bincount(grupo, minlength=n_grupos)
+        media = np.bincount(grupo, weights=valores, minlength=n_grupos) / n
+        desvio_quadrado = np.bincount(grupo, weights=(valores - media[grupo]) ** 2, minlength=n_grupos)
+        desvio = np.sqrt(np.divide(desvio_quadrado, n - 1, out=np.zeros(n_grupos), where=n > 1))
+
+        # Percentis por interpolação linear sobre as amostras ordenadas dentro de cada grupo
+        ordenados = valores[np.lexsort((valores, grupo))]
+        inicio = np.concatenate(([0], np.cumsum(n)[:-1]))
+        tabela_percentis = {}
+        for p in percentis:
+            posicao = inicio + (n - 1) * (p / 100)
+            baixo = np.floor(posicao).astype(int)
+            alto = np.minimum(baixo + 1, inicio + n - 1)
+            fracao = posicao - baixo
+            tabela_percentis[p] = ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * fracao
+
+        # Jitter: média de |x[i] - x[i-1]| entre amostras consecutivas do mesmo teste
+        diferencas = np.abs(np.diff(valores))
+        mesmo_teste = teste[1:] == teste[:-1]
+        grupo_diferenca = grupo[1:][mesmo_teste]
+        soma_jitter = np.bincount(grupo_diferenca, weights=diferencas[mesmo_teste], minlength=n_grupos)
+        pares = np.bincount(grupo_diferenca, minlength=n_grupos)
+        jitter = np.divide(soma_jitter, pares, out=np.full(n_grupos, np.nan), where=pares > 0)
+
+        z = NormalDist().inv_cdf((1 + confianca) / 2)
+        margem = z * desvio / np.sqrt(n)
+        perda = self._perda(agrupar, tipo, execucoes, nomes) if metrica == 'RTT(ms)' else None
+
+        resultado = []
+        for i, nome in enumerate(nomes):
+            linha = dict(zip(agrupar, nome.split('\x1f')))
+            linha.update({
+                'testes': int(np.count_nonzero(grupo_teste == i)),
+                'amostras': int(n[i]),
+                'media': float(media[i]),
+                'desvio': float(desvio[i]),
+                'ic_inferior': float(media[i] - margem[i]),
+                'ic_superior': float(media[i] + margem[i]),
+                'jitter': float(jitter[i]),
+            })
+            linha.update({f'p{p}': float(v[i]) for p, v in tabela_percentis.items()})
+            if perda is not None:
+                linha['perda'] = float(perda[i])
+            resultado.append(linha)
+        return resultado
+
+    def _perda(self, agrupar, tipo, execucoes, nomes):
+        """Perda média (%) de cada grupo de ``nomes``, a partir dos resumos 'Perda(%)'."""
+        linhas = self._consultar('Perda(%)', agrupar, tipo, execucoes)
+        perda = np.full(len(nomes), np.nan)
+        if not linhas:
+            return perda
+        k = len(agrupar)
+        chaves = np.array(['\x1f'.join(map(str, l[:k])) for l in linhas])
+        valores = np.array([l[k] for l in linhas], dtype=float)
+        indice = np.searchsorted(nomes, chaves)
+        validos = (indice < len(nomes)) & (nomes[np.minimum(indice, len(nomes) - 1)] == chaves)
+        soma = np.bincount(indice[validos], weights=valores[validos], minlength=len(nomes))
+        contagem = np.bincount(indice[validos], minlength=len(nomes))
+        return np.divide(soma, contagem, out=perda, where=contagem > 0)
+
+
+def imprimir_estatisticas(linhas, agrupar):
+    if not linhas:
+        print("Nenhum resultado para os filtros informados.")
+        return
+    extras = ['perda'] if 'perda' in linhas[0] else []
+    colunas = list(agrupar) + ['amostras', 'media', 'p50', 'p95', 'p99', 'jitter',
+                               'ic_inferior', 'ic_superior'] + extras
+    print('  '.join(f'{c:>11}' for c in colunas))
+    for linha in linhas:
+        print('  '.join(f'{linha[c]:>11.3f}' if isinstance(linha[c], float) else f'{linha[c]:>11}'
+                        for c in colunas))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Armazém de resultados dos testes de desempenho.")
+    ap.add_argument('--banco', default=BANCO_PADRAO)
+    sub = ap.add_subparsers(dest='comando', required=True)
+    imp = sub.add_parser('importar', help="Importa um CSV no formato de resultados_teste.csv")
+    imp.add_argument('csv')
+    sub.add_parser('execucoes', help="Lista as execuções gravadas")
+    est = sub.add_parser('estatisticas', help="Percentis, jitter, perda e IC por grupo")
+    est.add_argument('--metrica', default='RTT(ms)')
+    est.add_argument('--tipo', choices=['ping', 'iperf'])
+    est.add_argument('--agrupar', nargs='+', default=['origem', 'destino'], choices=AGRUPAMENTOS)
+    est.add_argument('--execucoes', nargs='*', type=int)
+    args = ap.parse_args()
+
+    with ArmazemResultados(args.banco) as armazem:
+        if args.comando == 'importar':
+            execucao, total = armazem.importar_csv(args.csv)
+            print(f"✅ {total} linhas importadas como execução {execucao}.")
+        elif args.comando == 'execucoes':
+            for id_, inicio, descricao, testes in armazem.execucoes():
+                print(f"{id_:>5}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(inicio))}  "
+                      f"{testes:>6} testes  {descricao}")
+        else:
+            inicio = time.perf_counter()
+            linhas = armazem.estatisticas(args.metrica, args.agrupar, args.tipo, args.execucoes)
+            imprimir_estatisticas(linhas, args.agrupar)
+            print(f"\n{len(linhas)} grupos calculados em {time.perf_counter() - inicio:.3f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Benchmark offline do MeuSwitch13 (Ryu_controlador.py) sem Mininet/OVS.
+
+Instancia o app com datapaths falsos, que apenas registram as mensagens
+enviadas, e injeta eventos PacketIn construídos a partir de captura.pcap ou
+de perfis sintéticos de tráfego. Reporta PacketIns/s, percentis de latência
+por evento, FlowMods/PacketOuts emitidos e pico de memória.
+
+Uso:
+    python3 benchmark_controlador.py --perfil pcap --eventos 50000
+    python3 benchmark_controlador.py --perfil muitos_macs --eventos 200000 --datapaths 4
+"""
+import argparse
+import hashlib
+import random
+import resource
+import struct
+import time
+import tracemalloc
+
+from ryu.controller import ofp_event
+from ryu.ofproto import ofproto_v1_3, ofproto_v1_3_parser
+
+from Ryu_controlador import MeuSwitch13
+from benchmark_parser_l2 import ler_frames_pcap
+
+PERFIS = ('pcap', 'muitos_macs', 'muitas_portas', 'broadcast')
+
+_CABECALHO_OF = struct.Struct('!BBHI')
+_PAYLOAD = bytes(46)
+
+
+class DatapathFalso:
+    """Datapath em memória: conta as mensagens OpenFlow em vez de enviá-las."""
+
+    def __init__(self, dpid):
+        self.id = dpid
+        self.ofproto = ofproto_v1_3
+        self.ofproto_parser = ofproto_v1_3_parser
+        self.is_active = True
+        self.xid = 0
+        self.escritas = 0
+        # tipo de mensagem OpenFlow -> quantidade
+        self.mensagens = {}
+        # Resumo (SHA-1) do fluxo de bytes enviado, para comparar execuções
+        self.resumo = hashlib.sha1()
+
+    def set_xid(self, msg):
+        self.xid = (self.xid + 1) & 0xffffffff
+        msg.set_xid(self.xid)
+        return self.xid
+
+    def send_msg(self, msg):
+        # Serializa como o Datapath real do Ryu
+        self.set_xid(msg)
+        msg.serialize()
+        self.escritas += 1
+        self.mensagens[msg.msg_type] = self.mensagens.get(msg.msg_type, 0) + 1
+        self.resumo.update(msg.buf)
+
+    def send(self, buf):
+        # Lote serializado: percorre os cabeçalhos OpenFlow concatenados
+        self.escritas += 1
+        self.resumo.update(buf)
+        pos = 0
+        while pos + _CABECALHO_OF.size <= len(buf):
+            _, tipo, tamanho, _ = _CABECALHO_OF.unpack_from(buf, pos)
+            self.mensagens[tipo] = self.mensagens.get(tipo, 0) + 1
+            pos += tamanho
+
+
+def _mac(n):
+    return struct.pack('!HI', 0x0200, n)
+
+
+def _quadro(dst, src, ethertype=0x0800):
+    return dst + src + struct.pack('!H', ethertype) + _PAYLOAD
+
+
+def gerar_trafego(perfil, eventos, datapaths, portas, macs, pcap):
+    """Retorna a lista de (dpid, in_port, quadro) do perfil escolhido."""
+    rnd = random.Random(42)
+    trafego = []
+    if perfil == 'pcap':
+        frames = ler_frames_pcap(pcap)
+        if not frames:
+            raise SystemExit(f"Nenhum quadro encontrado em '{pcap}'.")
+        # Cada MAC de origem fica sempre atrás da mesma porta
+        for i in range(eventos):
+            frame = frames[i % len(frames)]
+            in_port = 1 + int.from_bytes(frame[6:12], 'big') % portas
+            trafego.append((1 + i % datapaths, in_port, frame))
+        return trafego
+
+    broadcast = b'\xff' * 6
+    for i in range(eventos):
+        dpid = 1 + i % datapaths
+        if perfil == 'muitos_macs':
+            origem = rnd.randrange(macs)
+            destino = rnd.randrange(macs)
+            in_port = 1 + origem % portas
+            trafego.append((dpid, in_port, _quadro(_mac(destino), _mac(origem))))
+        elif perfil == 'muitas_portas':
+            in_port = 1 + rnd.randrange(portas)
+            origem = in_port * 1000 + rnd.randrange(max(1, macs // portas))
+            destino = rnd.randrange(portas) * 1000 + 1
+            trafego.append((dpid, in_port, _quadro(_mac(destino), _mac(origem))))
+        else:
+            origem = rnd.randrange(macs)
+            in_port = 1 + origem % portas
+            if rnd.random() < 0.8:
+                trafego.append((dpid, in_port, _quadro(broadcast, _mac(origem), 0x0806)))
+            else:
+                destino = rnd.randrange(macs)
+                trafego.append((dpid, in_port, _quadro(_mac(destino), _mac(origem))))
+    return trafego
+
+
+def construir_eventos(trafego, dps):
+    """Pré-constrói os eventos PacketIn para não medir o custo de montá-los."""
+    eventos = []
+    ofp = ofproto_v1_3
+    for dpid, in_port, frame in trafego:
+        dp = dps[dpid]
+        msg = ofproto_v1_3_parser.OFPPacketIn(
+            dp, buffer_id=ofp.OFP_NO_BUFFER, total_len=len(frame),
+            reason=ofp.OFPR_NO_MATCH, table_id=0, cookie=0,
+            match=ofproto_v1_3_parser.OFPMatch(in_port=in_port), data=frame)
+        eventos.append(ofp_event.EventOFPPacketIn(msg))
+    return eventos
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(p / 100.0 * len(ordenados)))]
+
+
+def criar_app(dps, com_limite=False, classe=MeuSwitch13):
+    """Instancia o MeuSwitch13 (ou ``classe``) com os datapaths falsos já conectados."""
+    app = classe()
+    app.LIMITE_ATIVO = com_limite
+    for dp in dps.values():
+        app.datapaths[dp.id] = dp
+    return app
+
+
+def executar_replay(app, eventos, lote):
+    """Injeta os eventos no app; retorna (tempo total, latências por evento)."""
+    latencias = []
+    relogio = time.perf_counter
+    handler = app.packet_in_handler
+    descarregar = app.enviador.descarregar_todos
+    inicio = relogio()
+    for i, ev in enumerate(eventos, 1):
+        t0 = relogio()
+        handler(ev)
+        latencias.append(relogio() - t0)
+        if i % lote == 0:
+            descarregar()
+    descarregar()
+    return relogio() - inicio, latencias
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark offline do controlador MeuSwitch13.")
+    ap.add_argument('--perfil', choices=PERFIS, default='pcap')
+    ap.add_argument('--pcap', default='captura.pcap')
+    ap.add_argument('--eventos', type=int, default=100000)
+    ap.add_argument('--datapaths', type=int, default=1)
+    ap.add_argument('--portas', type=int, default=16)
+    ap.add_argument('--macs', type=int, default=1000)
+    ap.add_argument('--lote', type=int, default=64,
+                    help="Descarrega o envio em lote a cada N eventos (simula a janela)")
+    ap.add_argument('--com-limite', action='store_true',
+                    help="Mantém o controle de tempestade ativo (por padrão é desligado)")
+    ap.add_argument('--tracemalloc', action='store_true',
+                    help="Mede o pico de memória Python com tracemalloc (aumenta a latência)")
+    args = ap.parse_args()
+
+    dps = {dpid: DatapathFalso(dpid) for dpid in range(1, args.datapaths + 1)}
+    trafego = gerar_trafego(args.perfil, args.eventos, args.datapaths,
+                            args.portas, args.macs, args.pcap)
+    eventos = construir_eventos(trafego, dps)
+
+    app = criar_app(dps, args.com_limite)
+
+    print(f"=== Benchmark do controlador: perfil '{args.perfil}', {len(eventos)} PacketIns, "
+          f"{args.datapaths} datapath(s), lote {'ativo' if app.enviador.ativo else 'desativado'} ===")
+
+    rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    total, latencias = executar_replay(app, eventos, args.lote)
+
+    pico_python = None
+    if args.tracemalloc:
+        pico_python = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    rss_final = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    ofp = ofproto_v1_3
+    flowmods = sum(dp.mensagens.get(ofp.OFPT_FLOW_MOD, 0) for dp in dps.values())
+    packetouts = sum(dp.mensagens.get(ofp.OFPT_PACKET_OUT, 0) for dp in dps.values())
+    escritas = sum(dp.escritas for dp in dps.values())
+
+    latencias.sort()
+    print(f"Tempo total:          {total:.3f} s")
+    print(f"Vazão:                {len(eventos) / total:,.0f} PacketIns/s")
+    print("Latência por evento:  "
+          + "  ".join(f"p{p}={percentil(latencias, p) * 1e6:.1f}us" for p in (50, 90, 99, 99.9))
+          + f"  max={latencias[-1] * 1e6:.1f}us")
+    print(f"FlowMods emitidos:    {flowmods}")
+    print(f"PacketOuts emitidos:  {packetouts}")
+    print(f"Escritas no socket:   {escritas}")
+    print(f"Tabela MAC:           {app.tabela_mac.estatisticas()['entradas']} entradas, "
+          f"{app.tabela_mac.memoria_bytes() / 1024:.1f} KiB")
+    if args.com_limite:
+        print(f"Controle tempestade:  {app.limitador.total_descartes()} descartados")
+    # ru_maxrss é dado em KiB no Linux
+    print(f"Pico de RSS:          {rss_final / 1024:.1f} MiB (+{(rss_final - rss_inicial) / 1024:.1f} MiB)")
+    if pico_python is not None:
+        print(f"Pico tracemalloc:     {pico_python / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: parser rápido (parser_l2) vs ryu.lib.packet.Packet.
+
+Uso: python3 benchmark_parser_l2.py [arquivo.pcap] [repeticoes]
+"""
+import struct
+import sys
+import time
+
+from parser_l2 import parse_ethernet
+
+PCAP_PADRAO = 'captura.pcap'
+
+_PCAP_GLOBAL = struct.Struct('<IHHiIII')
+_PCAP_REGISTRO = struct.Struct('<IIII')
+
+
+def ler_frames_pcap(caminho):
+    """Lê todos os quadros de um arquivo pcap (formato clássico) como bytes."""
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    if len(dados) < _PCAP_GLOBAL.size:
+        return []
+
+    magic = struct.unpack_from('<I', dados)[0]
+    if magic in (0xa1b2c3d4, 0xa1b23c4d):
+        registro = _PCAP_REGISTRO
+    elif magic in (0xd4c3b2a1, 0x4d3cb2a1):
+        registro = struct.Struct('>IIII')
+    else:
+        raise ValueError(f"Arquivo '{caminho}' não é um pcap válido.")
+
+    frames = []
+    pos = _PCAP_GLOBAL.size
+    while pos + registro.size <= len(dados):
+        _, _, incl_len, _ = registro.unpack_from(dados, pos)
+        pos += registro.size
+        frames.append(dados[pos:pos + incl_len])
+        pos += incl_len
+    return frames
+
+
+def medir(nome, funcao, frames, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for frame in frames:
+            funcao(frame)
+    total = time.perf_counter() - inicio
+    n = len(frames) * repeticoes
+    print(f"{nome:<22} {n:>9} quadros  {total:8.3f} s  "
+          f"{n / total:>12,.0f} quadros/s  {total / n * 1e6:7.2f} us/quadro")
+    return total
+
+
+def parse_ryu(frame):
+    from ryu.lib.packet import packet, ethernet
+    eth = packet.Packet(frame).get_protocols(ethernet.ethernet)[0]
+    return eth.dst, eth.src, eth.ethertype
+
+
+def main():
+    caminho = sys.argv[1] if len(sys.argv) > 1 else PCAP_PADRAO
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    frames = ler_frames_pcap(caminho)
+    if not frames:
+        print(f"Nenhum quadro encontrado em '{caminho}'.")
+        return
+    print(f"=== Benchmark do parser L2: {len(frames)} quadros de '{caminho}', {repeticoes} repetições ===")
+
+    t_rapido = medir("parser_l2 (memoryview)", parse_ethernet, frames, repeticoes)
+    try:
+        import ryu.lib.packet.packet  # noqa: F401
+    except ImportError:
+        print("Ryu não instalado: comparação com ryu.lib.packet ignorada.")
+        return
+    t_ryu = medir("ryu.lib.packet.Packet", parse_ryu, frames, repeticoes)
+    print(f"Ganho do fast path: {t_ryu / t_rapido:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
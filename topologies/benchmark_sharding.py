@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Benchmark de escalabilidade do modo shardeado (sharding_controlador.py).
+
+Para cada quantidade de workers, particiona os datapaths pelo anel de hash
+consistente e executa, em processos paralelos, o replay offline de
+benchmark_controlador.py com os PacketIns dos datapaths de cada worker.
+Reporta a vazão agregada e confere, comparando o resumo SHA-1 das mensagens
+emitidas por datapath, que o encaminhamento é idêntico ao do processo único.
+Todas as execuções, inclusive a de referência, usam o app dos workers
+(controlador_shard.py, sem o proxy ARP).
+
+Uso:
+    python3 benchmark_sharding.py --workers 1 2 4 --datapaths 16 --perfil muitos_macs
+"""
+import argparse
+import multiprocessing
+import time
+
+from sharding_controlador import AnelConsistente
+
+PERFIS = ('pcap', 'muitos_macs', 'muitas_portas', 'broadcast')
+
+
+def _executar_worker(parametros):
+    indice, workers, args = parametros
+    # Importado só no processo filho: o Ryu_controlador aplica o monkey_patch do eventlet
+    from benchmark_controlador import (DatapathFalso, construir_eventos, criar_app,
+                                       executar_replay, gerar_trafego)
+    from controlador_shard import MeuSwitch13Shard
+
+    anel = AnelConsistente(workers)
+    todos = range(1, args.datapaths + 1)
+    dps = {dpid: DatapathFalso(dpid) for dpid in todos if anel.worker_de(dpid) == indice}
+    trafego = gerar_trafego(args.perfil, args.eventos, args.datapaths,
+                            args.portas, args.macs, args.pcap)
+    eventos = construir_eventos([t for t in trafego if t[0] in dps], dps)
+    if not eventos:
+        return 0, 0.0, {}
+
+    app = criar_app(dps, classe=MeuSwitch13Shard)
+    tempo, _ = executar_replay(app, eventos, args.lote)
+    return len(eventos), tempo, {dpid: dp.resumo.hexdigest() for dpid, dp in dps.items()}
+
+
+def executar(workers, args):
+    """Executa o replay com ``workers`` processos; retorna (eventos, tempo, resumos)."""
+    ctx = multiprocessing.get_context('fork')
+    with ctx.Pool(workers) as pool:
+        resultados = pool.map(_executar_worker, [(i, workers, args) for i in range(workers)])
+    eventos = sum(r[0] for r in resultados)
+    # Os workers rodam em paralelo: o tempo do conjunto é o do worker mais lento
+    tempo = max(r[1] for r in resultados)
+    resumos = {}
+    for r in resultados:
+        resumos.update(r[2])
+    return eventos, tempo, resumos
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de escalabilidade do controlador shardeado.")
+    ap.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    ap.add_argument('--perfil', choices=PERFIS, default='muitos_macs')
+    ap.add_argument('--pcap', default='captura.pcap')
+    ap.add_argument('--eventos', type=int, default=200000)
+    ap.add_argument('--datapaths', type=int, default=16)
+    ap.add_argument('--portas', type=int, default=16)
+    ap.add_argument('--macs', type=int, default=1000)
+    ap.add_argument('--lote', type=int, default=64)
+    args = ap.parse_args()
+
+    print(f"=== Benchmark do sharding: perfil '{args.perfil}', {args.eventos} PacketIns, "
+          f"{args.datapaths} datapaths ===")
+    print(f"{'workers':>7} {'PacketIns/s':>14} {'tempo (s)':>10} {'speedup':>8}  encaminhamento")
+
+    # A execução com 1 worker é a referência do encaminhamento e da vazão (speedup 1.0x)
+    eventos, tempo, referencia = executar(1, args)
+    base = eventos / tempo if tempo else 0.0
+    for workers in args.workers:
+        inicio = time.perf_counter()
+        eventos, tempo, resumos = executar(workers, args)
+        parede = time.perf_counter() - inicio
+        vazao = eventos / tempo if tempo else 0.0
+        iguais = resumos == referencia
+        print(f"{workers:>7} {vazao:>14,.0f} {tempo:>10.3f} {vazao / base if base else 0.0:>7.2f}x  "
+              f"{'idêntico' if iguais else 'DIVERGENTE'} (parede {parede:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""Contabilidade de tráfego do r1 a partir de amostras NFLOG.
+
+No modo de contabilidade (padrão, ver gateway_nfv.regras_logging) a cadeia
+LOGGING envia 1 a cada N pacotes ao grupo NFLOG 1, truncados nos cabeçalhos,
+em vez de um ``-j LOG`` por pacote no log do kernel. Este coletor lê essas
+amostras de ``tcpdump -i nflog:1 -U -w -`` (pcap em fluxo, linktype NFLOG) e
+as agrega em memória em contadores por fluxo (5-tupla) e por par de sub-redes.
+As contagens são multiplicadas por N para estimar o tráfego real.
+
+A memória é limitada: no máximo ``max_fluxos`` fluxos e ``max_subredes``
+pares de sub-redes por intervalo (LRU); o que é despejado vai para o
+contador ``outros`` para que os totais continuem corretos. A cada
+``intervalo`` segundos um resumo (totais, top fluxos e sub-redes) é anexado
+ao arquivo como uma linha JSON e os contadores do intervalo são zerados.
+
+Uso:
+    python3 contabilidade_nflog.py --amostragem 100 --saida contabil.jsonl
+    mnexec -a <pid do r1> tcpdump -i nflog:1 -U -w - | python3 contabilidade_nflog.py -
+"""
+import argparse
+import ipaddress
+import json
+import struct
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+GRUPO_NFLOG = 1
+LINKTYPE_NFLOG = 239
+NFULA_PAYLOAD = 9
+
+_PCAP_GLOBAL = struct.Struct('<IHHiIII')
+_NFLOG_TLV = struct.Struct('<HH')  # comprimento e tipo em ordem do host (x86)
+_IPV4 = struct.Struct('!BBHHHBBH4s4s')
+_PORTAS = struct.Struct('!HH')
+
+PROTOCOLOS = {1: 'icmp', 6: 'tcp', 17: 'udp'}
+
+
+def ler_pcap_fluxo(arquivo):
+    """Gera (timestamp, linktype, dados) de um pcap lido incrementalmente (ex.: pipe)."""
+    cabecalho = arquivo.read(_PCAP_GLOBAL.size)
+    if len(cabecalho) < _PCAP_GLOBAL.size:
+        return
+    magic = struct.unpack_from('<I', cabecalho)[0]
+    if magic in (0xa1b2c3d4, 0xa1b23c4d):
+        ordem = '<'
+    elif magic in (0xd4c3b2a1, 0x4d3cb2a1):
+        ordem = '>'
+    else:
+        raise ValueError("Fluxo de entrada não é um pcap válido.")
+    linktype = struct.unpack_from(ordem + 'I', cabecalho, 20)[0]
+    registro = struct.Struct(ordem + 'IIII')
+    while True:
+        cab = arquivo.read(registro.size)
+        if len(cab) < registro.size:
+            return
+        seg, _, incl_len, _ = registro.unpack(cab)
+        dados = arquivo.read(incl_len)
+        if len(dados) < incl_len:
+            return
+        yield seg, linktype, dados
+
+
+def payload_nflog(dados):
+    """Extrai o pacote IP (atributo NFULA_PAYLOAD) de um registro NFLOG."""
+    pos, fim = 4, len(dados)  # família, versão, resource_id
+    while pos + _NFLOG_TLV.size <= fim:
+        comprimento, tipo = _NFLOG_TLV.unpack_from(dados, pos)
+        if comprimento < _NFLOG_TLV.size:
+            return None
+        if tipo == NFULA_PAYLOAD:
+            return dados[pos + _NFLOG_TLV.size:pos + comprimento]
+        pos += (comprimento + 3) & ~3
+    return None
+
+
+def parse_ipv4(pacote):
+    """Retorna (src, dst, proto, sport, dport, tamanho) ou None; usa o tamanho total do cabeçalho IP."""
+    if len(pacote) < _IPV4.size or pacote[0] >> 4 != 4:
+        return None
+    ver_ihl, _, tamanho, _, _, _, proto, _, src, dst = _IPV4.unpack_from(pacote)
+    ihl = (ver_ihl & 0x0f) * 4
+    sport = dport = 0
+    if proto in (6, 17) and len(pacote) >= ihl + _PORTAS.size:
+        sport, dport = _PORTAS.unpack_from(pacote, ihl)
+    return src, dst, proto, sport, dport, tamanho
+
+
+class ContadorLimitado:
+    """Contadores [pacotes, bytes] por chave com no máximo ``capacidade`` chaves (LRU)."""
+
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self.contadores = OrderedDict()
+        self.outros = [0, 0]
+        self.despejos = 0
+
+    def somar(self, chave, pacotes, octetos):
+        contador = self.contadores.get(chave)
+        if contador is None:
+            if len(self.contadores) >= self.capacidade:
+                _, antigo = self.contadores.popitem(last=False)
+                self.outros[0] += antigo[0]
+                self.outros[1] += antigo[1]
+                self.despejos += 1
+            contador = self.contadores[chave] = [0, 0]
+        else:
+            self.contadores.move_to_end(chave)
+        contador[0] += pacotes
+        contador[1] += octetos
+
+    def maiores(self, n):
+        return sorted(self.contadores.items(), key=lambda item: item[1][1], reverse=True)[:n]
+
+    def zerar(self):
+        self.contadores.clear()
+        self.outros = [0, 0]
+        self.despejos = 0
+
+    def __len__(self):
+        return len(self.contadores)
+
+
+class ContabilidadeNFLOG:
+    def __init__(self, amostragem=100, max_fluxos=10000, max_subredes=1024,
+                 prefixo_subrede=24, top=20, relogio=time.time):
+        self.amostragem = max(1, amostragem)
+        self.prefixo_subrede = prefixo_subrede
+        self.top = top
+        self.relogio = relogio
+        self.fluxos = ContadorLimitado(max_fluxos)
+        self.subredes = ContadorLimitado(max_subredes)
+        self._mascara = (0xffffffff << (32 - prefixo_subrede)) & 0xffffffff
+        self.inicio_intervalo = relogio()
+        self.amostras = 0
+        self.ignoradas = 0
+
+    def _subrede(self, endereco):
+        rede = int.from_bytes(endereco, 'big') & self._mascara
+        return f'{ipaddress.IPv4Address(rede)}/{self.prefixo_subrede}'
+
+    def registrar(self, pacote):
+        """Contabiliza um pacote IP amostrado (já sem o cabeçalho NFLOG)."""
+        campos = parse_ipv4(pacote) if pacote else None
+        if campos is None:
+            self.ignoradas += 1
+            return
+        src, dst, proto, sport, dport, tamanho = campos
+        self.amostras += 1
+        # Cada amostra representa ``amostragem`` pacotes
+        pacotes, octetos = self.amostragem, tamanho * self.amostragem
+        self.fluxos.somar((src, dst, proto, sport, dport), pacotes, octetos)
+        self.subredes.somar((self._subrede(src), self._subrede(dst)), pacotes, octetos)
+
+    def resumo(self):
+        agora = self.relogio()
+        total_pacotes = sum(c[0] for c in self.subredes.contadores.values()) + self.subredes.outros[0]
+        total_bytes = sum(c[1] for c in self.subredes.contadores.values()) + self.subredes.outros[1]
+        return {
+            'inicio': self.inicio_intervalo,
+            'fim': agora,
+            'amostragem': self.amostragem,
+            'amostras': self.amostras,
+            'ignoradas': self.ignoradas,
+            'pacotes_estimados': total_pacotes,
+            'bytes_estimados': total_bytes,
+            'fluxos_ativos': len(self.fluxos),
+            'fluxos_despejados': self.fluxos.despejos,
+            'top_fluxos': [
+                {'src': str(ipaddress.IPv4Address(src)), 'dst': str(ipaddress.IPv4Address(dst)),
+                 'proto': PROTOCOLOS.get(proto, proto), 'sport': sport, 'dport': dport,
+                 'pacotes': c[0], 'bytes': c[1]}
+                for (src, dst, proto, sport, dport), c in self.fluxos.maiores(self.top)
+            ],
+            'subredes': [
+                {'src': src, 'dst': dst, 'pacotes': c[0], 'bytes': c[1]}
+                for (src, dst), c in self.subredes.maiores(self.top)
+            ],
+        }
+
+    def descarregar(self, caminho):
+        """Anexa o resumo do intervalo ao arquivo (JSON por linha) e zera os contadores."""
+        resumo = self.resumo()
+        with open(caminho, 'a') as f:
+            f.write(json.dumps(resumo) + '\n')
+        self.fluxos.zerar()
+        self.subredes.zerar()
+        self.amostras = self.ignoradas = 0
+        self.inicio_intervalo = resumo['fim']
+        return resumo
+
+
+class ColetorNFLOG:
+    """Lê o pcap do tcpdump em uma thread e descarrega os resumos periodicamente.
+
+    O descarregamento é feito por um temporizador próprio, e não na chegada de
+    pacotes: depois de uma rajada, o resumo sai no fim do intervalo mesmo que
+    nenhuma nova amostra chegue. A trava serializa as amostras, o
+    descarregamento e as consultas da CLI.
+    """
+
+    def __init__(self, contabilidade, caminho, intervalo=10.0):
+        self.contabilidade = contabilidade
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.processo = None
+        self.thread = None
+        self.resumos = 0
+        self.trava = threading.Lock()
+
+    def descarregar(self):
+        with self.trava:
+            resumo = self.contabilidade.descarregar(self.caminho)
+            self.resumos += 1
+        return resumo
+
+    def resumo(self):
+        with self.trava:
+            return self.contabilidade.resumo()
+
+    def _temporizador(self, fim):
+        while not fim.wait(self.intervalo):
+            self.descarregar()
+
+    def consumir(self, arquivo):
+        fim = threading.Event()
+        temporizador = threading.Thread(target=self._temporizador, args=(fim,), daemon=True)
+        temporizador.start()
+        try:
+            for _, linktype, dados in ler_pcap_fluxo(arquivo):
+                amostra = payload_nflog(dados) if linktype == LINKTYPE_NFLOG else None
+                with self.trava:
+                    self.contabilidade.registrar(amostra)
+        finally:
+            fim.set()
+            temporizador.join()
+        self.descarregar()
+
+    def iniciar(self, processo):
+        """Consome o stdout de um processo ``tcpdump -w -`` (ex.: ``r1.popen``) em segundo plano."""
+        self.processo = processo
+        self.thread = threading.Thread(target=self.consumir, args=(processo.stdout,), daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        if self.processo is not None and self.processo.poll() is None:
+            self.processo.terminate()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+
+def comando_tcpdump(grupo=GRUPO_NFLOG):
+    return ['tcpdump', '-i', f'nflog:{grupo}', '-U', '-w', '-', '-q']
+
+
+def iniciar_coletor_r1(r1, caminho='contabil_r1.jsonl', intervalo=10.0, amostragem=100,
+                       max_fluxos=10000):
+    """Inicia o tcpdump no namespace do r1 e o coletor no processo do Mininet."""
+    processo = r1.popen(comando_tcpdump(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    coletor = ColetorNFLOG(ContabilidadeNFLOG(amostragem, max_fluxos), caminho, intervalo)
+    coletor.iniciar(processo)
+    return coletor
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Agrega amostras NFLOG do r1 em contadores por fluxo e sub-rede.")
+    ap.add_argument('entrada', nargs='?', default=None,
+                    help="Arquivo pcap ou '-' para stdin (padrão: executa o tcpdump no grupo NFLOG)")
+    ap.add_argument('--saida', default='contabil_r1.jsonl')
+    ap.add_argument('--intervalo', type=float, default=10.0)
+    ap.add_argument('--amostragem', type=int, default=100,
+                    help="N da regra 'statistic --every N' (fator de escala das contagens)")
+    ap.add_argument('--max-fluxos', type=int, default=10000)
+    ap.add_argument('--grupo', type=int, default=GRUPO_NFLOG)
+    args = ap.parse_args()
+
+    coletor = ColetorNFLOG(ContabilidadeNFLOG(args.amostragem, args.max_fluxos), args.saida, args.intervalo)
+    try:
+        if args.entrada == '-':
+            coletor.consumir(sys.stdin.buffer)
+        elif args.entrada:
+            with open(args.entrada, 'rb') as f:
+                coletor.consumir(f)
+        else:
+            processo = subprocess.Popen(comando_tcpdump(args.grupo), stdout=subprocess.PIPE)
+            try:
+                coletor.consumir(processo.stdout)
+            finally:
+                processo.terminate()
+    except KeyboardInterrupt:
+        coletor.descarregar()
+    print(f"Resumos gravados em '{args.saida}'.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,14 @@
+"""App do Ryu executado por cada worker do modo shardeado (sharding_controlador.py).
+
+É o MeuSwitch13 com o proxy ARP desligado. O cache do proxy não é
+particionável por dpid: no processo único, um pedido ARP recebido em s1 é
+respondido com uma associação aprendida em s2, enquanto o worker de s1 não a
+conhece e inunda o pedido. Sem o proxy, todo o estado do app é indexado por
+dpid e o encaminhamento dos workers é idêntico ao de um único processo com
+a mesma configuração (o que benchmark_sharding.py confere).
+"""
+from Ryu_controlador import MeuSwitch13
+
+
+class MeuSwitch13Shard(MeuSwitch13):
+    ARP_PROXY_ATIVO = False
@@ -0,0 +1,82 @@
+"""Envio em lote de mensagens OpenFlow (FlowMod/PacketOut) por datapath.
+
+Em vez de um ``datapath.send_msg`` (uma escrita no socket e uma troca de
+contexto do eventlet) por mensagem, as mensagens de cada datapath são
+acumuladas durante uma janela curta ou até um tamanho máximo e enviadas
+serializadas em uma única escrita, opcionalmente seguidas de um
+OFPBarrierRequest.
+"""
+from ryu.lib import hub
+
+
+class EnviadorLote:
+    def __init__(self, janela=0.001, tamanho_max=64, barreira=False, ativo=True):
+        self.janela = janela
+        self.tamanho_max = tamanho_max
+        self.barreira = barreira
+        self.ativo = ativo
+        # dpid -> (datapath, [mensagens pendentes], temporizador da janela)
+        self._pendentes = {}
+        self.mensagens = 0
+        self.escritas = 0
+        self.barreiras = 0
+
+    def enviar(self, datapath, msg):
+        """Enfileira ``msg`` no lote do datapath (ou envia direto se desativado)."""
+        self.mensagens += 1
+        if not self.ativo:
+            self.escritas += 1
+            datapath.send_msg(msg)
+            return
+
+        pendente = self._pendentes.get(datapath.id)
+        if pendente is None:
+            temporizador = hub.spawn_after(self.janela, self.descarregar, datapath.id)
+            pendente = self._pendentes[datapath.id] = (datapath, [], temporizador)
+        pendente[1].append(msg)
+        if len(pendente[1]) >= self.tamanho_max:
+            self.descarregar(datapath.id)
+
+    def descarregar(self, dpid):
+        """Envia em uma única escrita todas as mensagens pendentes do datapath."""
+        pendente = self._pendentes.pop(dpid, None)
+        if pendente is None:
+            return
+        datapath, mensagens, temporizador = pendente
+        # Lote fechado pelo tamanho: o temporizador não pode descarregar o próximo
+        # lote antes da janela dele (no próprio temporizador, cancel() não faz nada)
+        temporizador.cancel()
+        if not mensagens or not datapath.is_active:
+            return
+
+        if self.barreira:
+            mensagens.append(datapath.ofproto_parser.OFPBarrierRequest(datapath))
+            self.barreiras += 1
+
+        bufs = []
+        for msg in mensagens:
+            datapath.set_xid(msg)
+            msg.serialize()
+            bufs.append(msg.buf)
+        datapath.send(b''.join(bufs))
+        self.escritas += 1
+
+    def descarregar_todos(self):
+        for dpid in list(self._pendentes):
+            self.descarregar(dpid)
+
+    def descartar(self, dpid):
+        """Descarta o lote pendente de um datapath desconectado."""
+        pendente = self._pendentes.pop(dpid, None)
+        if pendente is not None:
+            pendente[2].cancel()
+
+    def estatisticas(self):
+        return {
+            'ativo': self.ativo,
+            'mensagens': self.mensagens,
+            'escritas': self.escritas,
+            'barreiras': self.barreiras,
+            'mensagens_por_escrita': self.mensagens / self.escritas if self.escritas else 0.0,
+            'pendentes': sum(len(m) for _, m, _ in self._pendentes.values()),
+        }
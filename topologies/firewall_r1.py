@@ -0,0 +1,181 @@
+"""Compilador de regras de firewall do gateway NFV r1 baseado em ipset.
+
+Em vez de uma regra ``iptables -A FORWARD ... -j DROP`` por IP ou porta
+(custo linear por pacote), as regras são agrupadas em conjuntos ipset com
+busca O(1) e referenciadas por um número fixo de regras na cadeia
+FW_BLOQUEIO:
+
+    fw_src        hash:net       IPs/redes de origem bloqueados
+    fw_dst        hash:net       IPs/redes de destino bloqueados
+    fw_tcp        bitmap:port    portas TCP de destino bloqueadas (qualquer destino)
+    fw_udp        bitmap:port    portas UDP de destino bloqueadas (qualquer destino)
+    fw_dst_porta  hash:net,port  pares destino + porta TCP/UDP
+
+A cadeia FORWARD é reconstruída na ordem correta: as respostas de conexões já
+estabelecidas são aceitas primeiro (sem consultar os conjuntos), depois vem o
+salto para FW_BLOQUEIO e só então o ACCEPT de conexões NEW e o LOGGING. Antes,
+o ``-j LOGGING`` (que aceita tudo) tornava os DROPs anexados inalcançáveis.
+
+A aplicação é atômica: o conteúdo dos conjuntos é carregado em conjuntos
+temporários e trocado com ``ipset swap`` em um único ``ipset restore``, e a
+FORWARD/FW_BLOQUEIO são substituídas em um único ``iptables-restore --noflush``.
+"""
+import ipaddress
+import json
+import os
+import tempfile
+
+CONJUNTOS = {
+    'fw_src': 'hash:net family inet hashsize 1024 maxelem 1048576',
+    'fw_dst': 'hash:net family inet hashsize 1024 maxelem 1048576',
+    'fw_tcp': 'bitmap:port range 0-65535',
+    'fw_udp': 'bitmap:port range 0-65535',
+    'fw_dst_porta': 'hash:net,port family inet hashsize 1024 maxelem 1048576',
+}
+
+TIPOS_REGRA = ('src_ip', 'dst_ip', 'tcp_port', 'udp_port')
+
+
+class RegraInvalida(ValueError):
+    pass
+
+
+def _rede(valor):
+    try:
+        rede = ipaddress.ip_network(valor.strip(), strict=False)
+    except (AttributeError, ValueError) as e:
+        raise RegraInvalida(f"Endereço inválido: {valor!r}") from e
+    if rede.version != 4 or rede.prefixlen == 0:
+        # hash:net não aceita /0 e os conjuntos são da família inet
+        raise RegraInvalida(f"Rede não suportada: {valor!r}")
+    return str(rede)
+
+
+def _porta(valor):
+    try:
+        porta = int(str(valor).strip())
+    except ValueError as e:
+        raise RegraInvalida(f"Porta inválida: {valor!r}") from e
+    if not 0 <= porta <= 65535:
+        raise RegraInvalida(f"Porta fora do intervalo 0-65535: {porta}")
+    return porta
+
+
+def _qualquer(valor):
+    return valor is None or str(valor).strip().lower() in ('', 'any', '0.0.0.0/0')
+
+
+class FirewallR1:
+    """Conjunto de regras de bloqueio do r1, compilado para ipset + iptables-restore."""
+
+    def __init__(self, interface_lan='r1-eth0', interface_wan='r1-eth1'):
+        self.interface_lan = interface_lan
+        self.interface_wan = interface_wan
+        self.elementos = {nome: set() for nome in CONJUNTOS}
+
+    def adicionar(self, tipo, ip=None, porta=None):
+        """Adiciona uma regra; ``tipo`` é um de TIPOS_REGRA. Retorna o conjunto usado."""
+        nome, elemento = self._compilar(tipo, ip, porta)
+        self.elementos[nome].add(elemento)
+        return nome
+
+    @staticmethod
+    def _compilar(tipo, ip=None, porta=None):
+        """Valida a regra e retorna (conjunto, elemento) sem alterar o firewall."""
+        if tipo == 'src_ip':
+            nome, elemento = 'fw_src', _rede(ip)
+        elif tipo == 'dst_ip':
+            nome, elemento = 'fw_dst', _rede(ip)
+        elif tipo in ('tcp_port', 'udp_port'):
+            protocolo = tipo[:3]
+            if _qualquer(ip):
+                nome, elemento = f'fw_{protocolo}', str(_porta(porta))
+            else:
+                nome, elemento = 'fw_dst_porta', f'{_rede(ip)},{protocolo}:{_porta(porta)}'
+        else:
+            raise RegraInvalida(f"Tipo de regra desconhecido: {tipo!r}")
+        return nome, elemento
+
+    def adicionar_lista(self, regras):
+        """Adiciona uma lista de dicts {'tipo', 'ip', 'porta'}; retorna quantas foram aceitas.
+
+        Tudo ou nada: as regras são validadas à parte e só entram no firewall
+        se todas forem válidas.
+        """
+        if not isinstance(regras, list):
+            raise RegraInvalida(f"Esperada uma lista de regras, não {type(regras).__name__}.")
+        novos = {nome: set() for nome in CONJUNTOS}
+        for i, regra in enumerate(regras, 1):
+            if not isinstance(regra, dict) or 'tipo' not in regra:
+                raise RegraInvalida(f"Regra {i}: esperado um objeto com 'tipo', não {regra!r}.")
+            try:
+                nome, elemento = self._compilar(regra['tipo'], regra.get('ip'), regra.get('porta'))
+            except RegraInvalida as e:
+                raise RegraInvalida(f"Regra {i}: {e}") from None
+            novos[nome].add(elemento)
+        for nome, elementos in novos.items():
+            self.elementos[nome] |= elementos
+        return len(regras)
+
+    def carregar_arquivo(self, caminho):
+        with open(caminho) as f:
+            return self.adicionar_lista(json.load(f))
+
+    def limpar(self):
+        for elementos in self.elementos.values():
+            elementos.clear()
+
+    def __len__(self):
+        return sum(len(e) for e in self.elementos.values())
+
+    def script_ipset(self):
+        """Script para ``ipset restore``: recarrega todos os conjuntos atomicamente (swap)."""
+        linhas = []
+        for nome, tipo in CONJUNTOS.items():
+            temporario = f'{nome}_novo'
+            linhas.append(f'create {nome} {tipo} -exist')
+            linhas.append(f'create {temporario} {tipo} -exist')
+            linhas.append(f'flush {temporario}')
+            linhas.extend(f'add {temporario} {e}' for e in sorted(self.elementos[nome]))
+            linhas.append(f'swap {temporario} {nome}')
+            linhas.append(f'destroy {temporario}')
+        return '\n'.join(linhas) + '\n'
+
+    def regras_forward(self):
+        """Regras da FORWARD e da FW_BLOQUEIO, sem cabeçalho, declarações de cadeia nem COMMIT."""
+        lan, wan = self.interface_lan, self.interface_wan
+        return [
+            f'-A FORWARD -i {wan} -o {lan} -m conntrack --ctstate ESTABLISHED,RELATED -j ACCEPT',
+            '-A FORWARD -j FW_BLOQUEIO',
+            f'-A FORWARD -i {lan} -o {wan} -m conntrack --ctstate NEW -j ACCEPT',
+            '-A FORWARD -j LOGGING',
+            '-A FW_BLOQUEIO -m set --match-set fw_src src -j DROP',
+            '-A FW_BLOQUEIO -m set --match-set fw_dst dst -j DROP',
+            '-A FW_BLOQUEIO -p tcp -m set --match-set fw_tcp dst -j DROP',
+            '-A FW_BLOQUEIO -p udp -m set --match-set fw_udp dst -j DROP',
+            '-A FW_BLOQUEIO -m set --match-set fw_dst_porta dst,dst -j DROP',
+        ]
+
+    def script_iptables(self):
+        """Script para ``iptables-restore --noflush`` com a FORWARD na ordem correta."""
+        return '\n'.join(['*filter', ':FORWARD DROP [0:0]', ':FW_BLOQUEIO - [0:0]', '-F FORWARD']
+                         + self.regras_forward() + ['COMMIT']) + '\n'
+
+    def aplicar(self, r1):
+        """Aplica os conjuntos e a cadeia FORWARD no r1; retorna a saída de erro (vazia se ok)."""
+        # Os hosts do Mininet compartilham o sistema de arquivos com a máquina
+        arquivos = []
+        try:
+            for conteudo in (self.script_ipset(), self.script_iptables()):
+                fd, caminho = tempfile.mkstemp(prefix='fw_r1_', suffix='.rules')
+                with os.fdopen(fd, 'w') as f:
+                    f.write(conteudo)
+                arquivos.append(caminho)
+            return r1.cmd(f'ipset restore -f {arquivos[0]} && '
+                          f'iptables-restore --noflush {arquivos[1]} && echo FW_OK').replace('FW_OK', '').strip()
+        finally:
+            for caminho in arquivos:
+                os.unlink(caminho)
+
+    def resumo(self):
+        return ', '.join(f'{nome}: {len(e)}' for nome, e in self.elementos.items())
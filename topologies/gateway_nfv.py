@@ -0,0 +1,203 @@
+"""Inicialização rápida do gateway NFV r1, compartilhada pelas topologias.
+
+- As ferramentas do r1 só são instaladas quando algum binário está ausente:
+  uma única verificação com ``command -v`` substitui o ``apk update`` /
+  ``apt-get update && apt-get install`` que rodava a cada execução (e
+  falhava sem rede).
+- A configuração do r1 (endereços, sysctl, NAT e cadeias de filtro) é
+  aplicada como um único script: os conjuntos ipset via ``ipset restore`` e
+  as tabelas nat/filter via ``iptables-restore``, em vez de ~25 ``r1.cmd()``.
+- O log do FORWARD é, por padrão, amostrado via NFLOG (1 a cada N pacotes,
+  agregados por contabilidade_nflog.py); o ``-j LOG`` por pacote no log do
+  kernel virou o modo ``debug``, opcional e alternável em tempo de execução.
+- ``Cronometro`` mede cada fase da inicialização até a CLI ficar pronta.
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from mininet.log import info, error
+from mininet.node import Node
+
+# binário -> (pacote apk, pacote apt)
+BINARIOS_GATEWAY = {
+    'iptables': ('iptables', 'iptables'),
+    'iptables-restore': ('iptables', 'iptables'),
+    'ipset': ('ipset', 'ipset'),
+    'ip': ('iproute2', 'iproute2'),
+    'curl': ('curl', 'curl'),
+    'tcpdump': ('tcpdump', 'tcpdump'),
+    'conntrack': ('conntrack-tools', 'conntrack'),
+    'traceroute': ('traceroute', 'traceroute'),
+}
+
+
+def binarios_ausentes(node, binarios=BINARIOS_GATEWAY):
+    """Lista os binários que não estão no PATH do nó (uma única ida ao shell)."""
+    saida = node.cmd(f'for b in {" ".join(binarios)}; do command -v "$b" >/dev/null 2>&1 || echo "$b"; done')
+    return saida.split()
+
+
+class EnhancedDockerHost(Node):
+    def __init__(self, name, dimage='alpine', **kwargs):
+        super().__init__(name, **kwargs)
+        self.dimage = dimage
+
+    def garantir_ferramentas(self, binarios=BINARIOS_GATEWAY):
+        """Instala só os pacotes dos binários ausentes; retorna os pacotes instalados."""
+        ausentes = binarios_ausentes(self, binarios)
+        if not ausentes:
+            info(f'\n🟢 Gateway \033[92m{self.name}\033[0m: ferramentas já presentes, instalação ignorada.')
+            return []
+
+        apk = sorted({binarios[b][0] for b in ausentes})
+        apt = sorted({binarios[b][1] for b in ausentes})
+        self.cmd(
+            f'(apk add --no-cache {" ".join(apk)}) || '
+            f'(apt-get update && apt-get install -y {" ".join(apt)}) || '
+            f'echo "\\033[91m[⚠️  Falha]\\033[0m Não foi possível instalar pacotes no gateway \\033[93m{self.name}\\033[0m."'
+        )
+        faltando = binarios_ausentes(self, binarios)
+        if faltando:
+            error(f'\n⚠️  Gateway {self.name}: binários ainda ausentes: {", ".join(faltando)}')
+        info(f'\n🟢 Gateway \033[92m{self.name}\033[0m inicializado; instalados: {", ".join(apk)}.')
+        return apk
+
+
+# Ordem original da FORWARD: NEW da LAN, respostas da WAN, e o restante logado e aceito
+FORWARD_PADRAO = [
+    '-A FORWARD -i r1-eth0 -o r1-eth1 -m conntrack --ctstate NEW -j ACCEPT',
+    '-A FORWARD -i r1-eth1 -o r1-eth0 -m conntrack --ctstate ESTABLISHED,RELATED -j ACCEPT',
+    '-A FORWARD -j LOGGING',
+]
+
+
+MODOS_LOG = ('contabil', 'debug')
+AMOSTRAGEM_PADRAO = 100
+GRUPO_NFLOG = 1
+
+
+def regras_nat(wan='r1-eth1', modo_log='contabil'):
+    regras = [f'-A POSTROUTING -o {wan} -j MASQUERADE']
+    if modo_log == 'debug':
+        regras.append(f'-A POSTROUTING -o {wan} -j LOG --log-prefix "NAT: "')
+    return regras
+
+
+def regras_logging(modo_log='contabil', amostragem=AMOSTRAGEM_PADRAO):
+    """Regras da cadeia LOGGING: NFLOG amostrado (contabil) ou LOG por pacote (debug)."""
+    if modo_log not in MODOS_LOG:
+        raise ValueError(f"Modo de log desconhecido: {modo_log!r} (use {', '.join(MODOS_LOG)})")
+    if modo_log == 'debug':
+        regras = ['-A LOGGING -j LOG --log-prefix "FORWARD: " --log-level 4']
+    else:
+        amostra = f'-m statistic --mode nth --every {amostragem} --packet 0 ' if amostragem > 1 else ''
+        # Só os cabeçalhos (--nflog-size) e em lotes (--nflog-threshold) para o coletor
+        regras = [f'-A LOGGING {amostra}-j NFLOG --nflog-group {GRUPO_NFLOG} '
+                  f'--nflog-size 64 --nflog-threshold 16']
+    return regras + ['-A LOGGING -j ACCEPT']
+
+
+def regras_iptables(forward=FORWARD_PADRAO, wan='r1-eth1', modo_log='contabil',
+                    amostragem=AMOSTRAGEM_PADRAO):
+    """Ruleset completo (nat + filter) para ``iptables-restore`` sem --noflush."""
+    return '\n'.join([
+        '*nat',
+        ':PREROUTING ACCEPT [0:0]',
+        ':INPUT ACCEPT [0:0]',
+        ':OUTPUT ACCEPT [0:0]',
+        ':POSTROUTING ACCEPT [0:0]',
+        *regras_nat(wan, modo_log),
+        'COMMIT',
+        '*filter',
+        ':INPUT ACCEPT [0:0]',
+        ':FORWARD DROP [0:0]',
+        ':OUTPUT ACCEPT [0:0]',
+        ':LOGGING - [0:0]',
+        ':FW_BLOQUEIO - [0:0]',
+        *regras_logging(modo_log, amostragem),
+        *forward,
+        'COMMIT',
+    ]) + '\n'
+
+
+def _arquivo_temporario(conteudo, sufixo):
+    # Os hosts do Mininet compartilham o sistema de arquivos com a máquina
+    fd, caminho = tempfile.mkstemp(prefix='nfv_r1_', suffix=sufixo)
+    with os.fdopen(fd, 'w') as f:
+        f.write(conteudo)
+    return caminho
+
+
+def configurar_r1(r1, forward=FORWARD_PADRAO, script_ipset=None,
+                  enderecos=(('r1-eth0', '10.0.1.254/24'), ('r1-eth1', '10.0.2.254/24')),
+                  modo_log='contabil', amostragem=AMOSTRAGEM_PADRAO):
+    """Aplica toda a configuração do r1 em uma única chamada; retorna os erros (vazio se ok)."""
+    regras = regras_iptables(forward, enderecos[1][0], modo_log, amostragem)
+    arquivos = [_arquivo_temporario(regras, '.rules')]
+    linhas = ['exec 2>&1']
+    for intf, ip in enderecos:
+        linhas.append(f'ip link set dev {intf} up')
+        linhas.append(f'ip addr replace {ip} dev {intf}')
+    linhas += [
+        'echo "net.ipv4.ip_forward=1" > /etc/sysctl.d/99-ipforward.conf',
+        'sysctl -q -p /etc/sysctl.d/99-ipforward.conf',
+        'echo 1 > /proc/sys/net/ipv4/conf/all/log_martians',
+    ]
+    if script_ipset:
+        # Os conjuntos precisam existir antes das regras que os referenciam
+        arquivos.append(_arquivo_temporario(script_ipset, '.ipset'))
+        linhas.append(f'ipset restore -f {arquivos[-1]}')
+    linhas.append(f'iptables-restore {arquivos[0]}')
+    arquivos.append(_arquivo_temporario('\n'.join(linhas) + '\n', '.sh'))
+    try:
+        return r1.cmd(f'sh {arquivos[-1]}').strip()
+    finally:
+        for caminho in arquivos:
+            os.unlink(caminho)
+
+
+def alternar_log(r1, modo_log, amostragem=AMOSTRAGEM_PADRAO, wan='r1-eth1'):
+    """Troca o modo de log do r1 em tempo de execução (só POSTROUTING e LOGGING)."""
+    regras = '\n'.join(['*nat', '-F POSTROUTING', *regras_nat(wan, modo_log), 'COMMIT',
+                        '*filter', ':LOGGING - [0:0]', *regras_logging(modo_log, amostragem), 'COMMIT']) + '\n'
+    caminho = _arquivo_temporario(regras, '.rules')
+    try:
+        return r1.cmd(f'iptables-restore --noflush {caminho} 2>&1').strip()
+    finally:
+        os.unlink(caminho)
+
+
+def relatorio_r1(r1):
+    """Endereços, rotas e regras do r1 em uma única chamada."""
+    return r1.cmd(
+        'echo "\n=== \033[94mConfiguração de Rede\033[0m ==="; ip addr show; '
+        'echo "\n=== \033[94mTabela de Roteamento\033[0m ==="; ip route show; '
+        'echo "\n=== \033[94mRegras NAT\033[0m ==="; iptables -t nat -L -v -n; '
+        'echo "\n=== \033[94mRegras de Firewall\033[0m ==="; iptables -L -v -n'
+    )
+
+
+class Cronometro:
+    """Mede a duração de cada fase da inicialização."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases = []
+
+    @contextmanager
+    def fase(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases.append((nome, time.perf_counter() - inicio))
+
+    def relatorio(self):
+        total = time.perf_counter() - self.inicio
+        linhas = ['\n=== \033[94mTempo de Inicialização\033[0m ===']
+        linhas += [f'  {nome:<28} {duracao:7.2f}s' for nome, duracao in self.fases]
+        linhas.append(f'  {"total (run() -> CLI pronta)":<28} {total:7.2f}s')
+        info('\n'.join(linhas) + '\n')
+        return total
@@ -1,5 +1,23 @@
+import argparse
+import hashlib
+import json
 import os
+import re
 import subprocess # Usar subprocess para melhor tratamento de erros
+import sys
+import time
+
+from parser_fluxos import parse_dump, resumo_tabela
+
+# Fluxos carregados em lote (modo --aplicar) são marcados com um cookie cujo
+# byte mais alto é COOKIE_PREFIXO; os demais bytes são um hash da regra. Assim
+# o diff com o estado do switch é feito só por cookie e os fluxos instalados
+# pelo controlador (cookie 0/0x1) nunca são tocados.
+COOKIE_PREFIXO = 0xf1 << 56
+COOKIE_MASCARA_PREFIXO = 0xff << 56
+PRIORIDADE_PADRAO = 100
+
+_RE_COOKIE = re.compile(r'cookie=(0x[0-9a-fA-F]+)')
 
 def clear():
     """Limpa a tela do terminal."""
@@ -59,6 +77,7 @@ def listar_fluxos():
         )
         print(f"\n Fluxos ativos em '{switch}':")
         print(result.stdout)
+        print(resumo_tabela(parse_dump(result.stdout)))
     except subprocess.CalledProcessError as e:
         print(f"\n Erro ao listar fluxos do switch '{switch}'. Detalhes do erro:")
         print(f"Stdout: {e.stdout}")
@@ -90,6 +109,144 @@ def remover_fluxo():
         print("\nOperação de remoção de fluxos cancelada.")
     input("\nPressione Enter para continuar...")
 
+def _campo_curinga(valor):
+    return valor is None or str(valor).strip().lower() in ('', 'any', '*', '0')
+
+def regra_para_ofctl(regra):
+    """Converte uma regra no esquema de flows.json para a sintaxe do ovs-ofctl (sem cookie)."""
+    protocolo = str(regra.get('protocol', 'tcp')).lower()
+    partes = [f"priority={int(regra.get('priority', PRIORIDADE_PADRAO))}", protocolo]
+    if not _campo_curinga(regra.get('src_ip')):
+        partes.append(f"nw_src={regra['src_ip']}")
+    if not _campo_curinga(regra.get('dst_ip')):
+        partes.append(f"nw_dst={regra['dst_ip']}")
+    if protocolo in ('tcp', 'udp', 'sctp'):
+        if not _campo_curinga(regra.get('src_port')):
+            partes.append(f"tp_src={int(regra['src_port'])}")
+        if not _campo_curinga(regra.get('dst_port')):
+            partes.append(f"tp_dst={int(regra['dst_port'])}")
+    acao = str(regra.get('action', 'DROP')).strip()
+    partes.append('actions=' + ('drop' if acao.upper() == 'DROP' else acao.lower()))
+    return ','.join(partes)
+
+def cookie_da_regra(regra_id, especificacao):
+    """Cookie determinístico da regra: muda sempre que o id ou a especificação mudam."""
+    digest = hashlib.sha1(f'{regra_id}|{especificacao}'.encode()).digest()
+    return COOKIE_PREFIXO | int.from_bytes(digest[:7], 'big')
+
+class RegrasInvalidas(ValueError):
+    pass
+
+def carregar_regras(caminho):
+    """Lê um arquivo no esquema de flows.json; retorna {switch: {cookie: especificacao}}.
+
+    Duas regras com o mesmo match e prioridade no mesmo switch são rejeitadas:
+    no OVS uma sobrescreveria a outra, e a sincronização ficaria readicionando
+    a que falta a cada execução.
+    """
+    with open(caminho) as f:
+        regras = json.load(f)
+    if isinstance(regras, dict):
+        regras = regras.get('flows', [])
+    if not isinstance(regras, list):
+        raise RegrasInvalidas("As regras devem ser uma lista (ou um objeto com a lista em 'flows').")
+
+    desejado = {}
+    # (switch, prioridade + match) -> id da primeira regra
+    vistos = {}
+    for regra in regras:
+        if not isinstance(regra, dict):
+            raise RegrasInvalidas(f"Regra inválida (esperado um objeto): {regra!r}")
+        if 'switch' not in regra:
+            raise RegrasInvalidas(f"Regra '{regra.get('id', '?')}' sem o campo 'switch'.")
+        especificacao = regra_para_ofctl(regra)
+        chave = (regra['switch'], especificacao.rsplit(',actions=', 1)[0])
+        if chave in vistos:
+            raise RegrasInvalidas(f"Regras '{vistos[chave]}' e '{regra.get('id', '?')}' têm o mesmo match e "
+                                  f"prioridade em '{regra['switch']}' ({chave[1]}).")
+        vistos[chave] = regra.get('id', '?')
+        cookie = cookie_da_regra(regra.get('id', ''), especificacao)
+        desejado.setdefault(regra['switch'], {})[cookie] = especificacao
+    return desejado
+
+def cookies_instalados(switch):
+    """Retorna os cookies dos fluxos gerenciados (prefixo COOKIE_PREFIXO) presentes no switch."""
+    filtro = f'cookie={COOKIE_PREFIXO:#x}/{COOKIE_MASCARA_PREFIXO:#x}'
+    result = subprocess.run(
+        ["sudo", "ovs-ofctl", "-O", "OpenFlow13", "dump-flows", switch, filtro],
+        check=True, capture_output=True, text=True
+    )
+    return {int(c, 16) for c in _RE_COOKIE.findall(result.stdout)}
+
+def calcular_delta(desejado, instalados):
+    """Retorna (adicoes, remocoes): especificações a adicionar e cookies a remover."""
+    adicoes = [(c, e) for c, e in desejado.items() if c not in instalados]
+    remocoes = sorted(instalados - desejado.keys())
+    return adicoes, remocoes
+
+def montar_lote(adicoes, remocoes):
+    """Monta o arquivo de flow_mods para um único ovs-ofctl add-flows."""
+    linhas = [f'delete cookie={c:#x}/-1' for c in remocoes]
+    linhas.extend(f'add cookie={c:#x},{e}' for c, e in adicoes)
+    return '\n'.join(linhas) + '\n'
+
+def aplicar_lote(switch, adicoes, remocoes, bundle=True):
+    """Envia adições e remoções ao switch em uma única chamada do ovs-ofctl."""
+    if not adicoes and not remocoes:
+        return
+    cmd = ["sudo", "ovs-ofctl", "-O", "OpenFlow13"]
+    if bundle:
+        # Transação atômica (OpenFlow 1.4 bundles, suportado pelo OVS também em OF1.3)
+        cmd.append("--bundle")
+    cmd += ["add-flows", switch, "-"]
+    subprocess.run(cmd, input=montar_lote(adicoes, remocoes),
+                   check=True, capture_output=True, text=True)
+
+def sincronizar_switch(switch, desejado, simular=False, bundle=True):
+    """Aplica o delta entre as regras desejadas e as instaladas; retorna (adicoes, remocoes)."""
+    adicoes, remocoes = calcular_delta(desejado, cookies_instalados(switch))
+    if not simular:
+        aplicar_lote(switch, adicoes, remocoes, bundle)
+    return adicoes, remocoes
+
+def aplicar_arquivo(caminho, switches_extras=(), simular=False, bundle=True):
+    """Sincroniza todos os switches do arquivo (e os extras) com as regras desejadas.
+
+    Switches listados em ``switches_extras`` sem regras no arquivo têm todos os
+    seus fluxos gerenciados removidos. Retorna True se todos tiveram sucesso.
+    """
+    desejado = carregar_regras(caminho)
+    for switch in switches_extras:
+        desejado.setdefault(switch, {})
+
+    sucesso = True
+    for switch, regras in sorted(desejado.items()):
+        inicio = time.perf_counter()
+        try:
+            adicoes, remocoes = sincronizar_switch(switch, regras, simular, bundle)
+        except subprocess.CalledProcessError as e:
+            sucesso = False
+            print(f"\n Erro ao sincronizar o switch '{switch}'. Detalhes do erro:")
+            print(f"Stdout: {e.stdout}")
+            print(f"Stderr: {e.stderr}")
+            continue
+        duracao = time.perf_counter() - inicio
+        prefixo = "🔎 [simulação] " if simular else "✅ "
+        print(f"{prefixo}{switch}: {len(regras)} regras desejadas, "
+              f"+{len(adicoes)} adicionadas, -{len(remocoes)} removidas em {duracao:.2f}s")
+    return sucesso
+
+def aplicar_arquivo_interativo():
+    """Aplica um arquivo de regras (JSON no esquema de flows.json) a partir do menu."""
+    clear()
+    print("=== Aplicar Arquivo de Fluxos ===")
+    caminho = input("Arquivo de regras (padrão flows.json): ").strip() or "flows.json"
+    try:
+        aplicar_arquivo(caminho)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"\n Erro ao ler o arquivo '{caminho}': {e}")
+    input("\nPressione Enter para continuar...")
+
 def main():
     """Função principal que exibe o menu e gerencia as opções."""
     while True:
@@ -100,7 +257,8 @@ def main():
         print("║ 1 - Listar fluxos          ║")
         print("║ 2 - Adicionar fluxo        ║")
         print("║ 3 - Remover fluxos         ║")
-        print("║ 4 - Sair                   ║")
+        print("║ 4 - Aplicar arquivo JSON   ║")
+        print("║ 5 - Sair                   ║")
         print("╚════════════════════════════╝\n")
         opcao = input("Escolha uma opção: ").strip()
 
@@ -111,11 +269,34 @@ def main():
         elif opcao == '3':
             remover_fluxo()
         elif opcao == '4':
+            aplicar_arquivo_interativo()
+        elif opcao == '5':
             print("Saindo do gerenciador de fluxos. Até mais!")
             break
         else:
-            print("Opção inválida. Por favor, escolha um número de 1 a 4.")
+            print("Opção inválida. Por favor, escolha um número de 1 a 5.")
             input("\nPressione Enter para continuar...")
 
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(
+        description="Gerenciador de fluxos OpenFlow. Sem argumentos, abre o menu interativo.")
+    ap.add_argument('--aplicar', metavar='ARQUIVO',
+                    help="Sincroniza os switches com as regras do arquivo JSON (esquema de flows.json)")
+    ap.add_argument('--switch', action='append', default=[],
+                    help="Switch a sincronizar mesmo sem regras no arquivo (remove os fluxos gerenciados)")
+    ap.add_argument('--simular', action='store_true',
+                    help="Só calcula e mostra o delta, sem alterar os switches")
+    ap.add_argument('--sem-bundle', action='store_true',
+                    help="Não usa --bundle (OVS antigo sem suporte a bundles)")
+    return ap.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.aplicar:
+        try:
+            ok = aplicar_arquivo(args.aplicar, args.switch, args.simular, not args.sem_bundle)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"\n Erro ao ler o arquivo '{args.aplicar}': {e}")
+            ok = False
+        sys.exit(0 if ok else 1)
     main()
@@ -0,0 +1,167 @@
+"""Inventário de hosts para a instalação proativa de fluxos L2 no MeuSwitch13.
+
+O inventário diz, para cada host e cada interface do gateway r1, o IP, o MAC
+e o switch/porta de acesso, além dos enlaces entre switches. Ele vem de:
+
+- um arquivo JSON exportado pela topologia antes do ``net.start()``
+  (``inventario_de_rede``, em teste_performance.py e topologia_gateway.py, ou
+  ``TopologiaParametrica.inventario`` em topologia_parametrica.py);
+- na falta do arquivo, das listas estáticas da RobustTopo (``HOSTS_S1`` e
+  ``HOSTS_S2``), com os MACs que o Mininet atribui com ``autoSetMacs``.
+
+``fluxos_por_switch`` converte o inventário em ``dpid -> [Destino]``: para
+cada switch, a porta de saída em direção a cada MAC conhecido, seguindo o
+menor caminho pelos enlaces entre switches. Em malhas com laços e STP, o
+caminho escolhido pode passar por uma porta bloqueada.
+
+Este módulo não depende do Mininet nem do Ryu: é usado pelos dois lados.
+"""
+import ipaddress
+import json
+import os
+import re
+from collections import deque, namedtuple
+
+INVENTARIO_PADRAO = '/tmp/inventario_hosts.json'
+
+# Listas da RobustTopo (s1: 10.0.1.0/24, s2: 10.0.2.0/24), na ordem dos addLink
+HOSTS_S1 = [
+    ('h1', '10.0.1.1'), ('h2', '10.0.1.2'), ('h6', '10.0.1.3'),
+    ('h10', '10.0.1.4'), ('h11', '10.0.1.5'), ('h12', '10.0.1.6'),
+    ('h9', '10.0.1.7'),
+    ('h13', '10.0.1.13')  # Adicionado h13 na topologia inicial para facilitar o provisionamento
+]
+HOSTS_S2 = [
+    ('h3', '10.0.2.1'), ('h4', '10.0.2.2'), ('h5', '10.0.2.3'),
+    ('h7', '10.0.2.4'), ('h8', '10.0.2.5')
+]
+# r1-eth0 recebe o MAC do autoSetMacs (interface padrão); o da r1-eth1 é fixado na topologia
+MAC_R1_ETH1 = '02:00:0a:00:02:fe'
+
+Destino = namedtuple('Destino', 'mac porta ip')
+
+
+def _ordem_natural(nome):
+    return [int(parte) if parte.isdigit() else parte for parte in re.split(r'(\d+)', nome)]
+
+
+def inventario_robusttopo(hosts_s1=HOSTS_S1, hosts_s2=HOSTS_S2):
+    """Inventário da RobustTopo, reproduzindo a numeração de portas e MACs do Mininet."""
+    # autoSetMacs: o n-ésimo host criado (em ordem natural de nome) recebe 00:00:00:00:00:n
+    nomes = sorted([nome for nome, _ in hosts_s1 + hosts_s2] + ['r1'], key=_ordem_natural)
+    macs = {nome: f'00:00:00:00:{i >> 8 & 0xff:02x}:{i & 0xff:02x}' for i, nome in enumerate(nomes, 1)}
+    hosts = []
+    for switch, lista in (('s1', hosts_s1), ('s2', hosts_s2)):
+        hosts += [{'nome': nome, 'ip': ip, 'mac': macs[nome], 'switch': switch, 'porta': porta}
+                  for porta, (nome, ip) in enumerate(lista, 1)]
+    return {
+        'switches': {'s1': f'{1:016x}', 's2': f'{2:016x}'},
+        'hosts': hosts,
+        'sub_redes': [
+            {'rede': '10.0.1.0/24', 'gateway': '10.0.1.254', 'mac_gateway': macs['r1'],
+             'interface': 'r1-eth0', 'switch': 's1', 'porta': len(hosts_s1) + 1},
+            {'rede': '10.0.2.0/24', 'gateway': '10.0.2.254', 'mac_gateway': MAC_R1_ETH1,
+             'interface': 'r1-eth1', 'switch': 's2', 'porta': len(hosts_s2) + 1},
+        ],
+        'enlaces': [],
+    }
+
+
+def inventario_de_rede(net, gateway='r1'):
+    """Inventário de um ``Mininet`` já construído (MACs e portas reais); chamar antes do ``net.start()``."""
+    switches = {sw.name: sw.dpid for sw in net.switches}
+    hosts, sub_redes = [], []
+    for no in net.hosts:
+        for intf in no.intfList():
+            if intf.link is None:
+                continue
+            outra = intf.link.intf2 if intf.link.intf1 is intf else intf.link.intf1
+            if outra.node.name not in switches:
+                continue
+            local = {'switch': outra.node.name, 'porta': outra.node.ports[outra]}
+            mac = intf.mac or intf.MAC()
+            if no.name == gateway:
+                rede = ipaddress.ip_interface(f'{intf.IP()}/{intf.prefixLen}').network
+                sub_redes.append({'rede': str(rede), 'gateway': intf.IP(), 'mac_gateway': mac,
+                                  'interface': intf.name, **local})
+            else:
+                hosts.append({'nome': no.name, 'ip': intf.IP(), 'mac': mac, **local})
+    enlaces = []
+    for link in net.links:
+        a, b = link.intf1, link.intf2
+        if a.node.name in switches and b.node.name in switches:
+            enlaces.append([a.node.name, a.node.ports[a], b.node.name, b.node.ports[b]])
+    return {'switches': switches, 'hosts': hosts, 'sub_redes': sub_redes, 'enlaces': enlaces}
+
+
+def salvar_inventario(inventario, caminho=INVENTARIO_PADRAO):
+    with open(caminho, 'w') as f:
+        json.dump(inventario, f, indent=2)
+    return caminho
+
+
+def carregar_inventario(caminho=INVENTARIO_PADRAO):
+    with open(caminho) as f:
+        inventario = json.load(f)
+    if not isinstance(inventario, dict) or 'switches' not in inventario or 'hosts' not in inventario:
+        raise ValueError(f"Inventário inválido em '{caminho}': faltam 'switches'/'hosts'.")
+    return inventario
+
+
+def fluxos_por_switch(inventario):
+    """dpid -> [Destino(mac, porta de saída, ip)] para todos os MACs alcançáveis em L2."""
+    dpids = {nome: int(dpid, 16) for nome, dpid in inventario['switches'].items()}
+    vizinhos = {nome: [] for nome in dpids}
+    for a, porta_a, b, porta_b in inventario.get('enlaces', []):
+        vizinhos[a].append((b, porta_a))
+        vizinhos[b].append((a, porta_b))
+
+    destinos = [(h['mac'], h['switch'], h['porta'], h.get('ip')) for h in inventario['hosts']]
+    destinos += [(s['mac_gateway'], s['switch'], s['porta'], s.get('gateway'))
+                 for s in inventario.get('sub_redes', [])]
+
+    fluxos = {}
+    for origem, dpid in dpids.items():
+        # Busca em largura: porta de saída da origem rumo a cada switch alcançável
+        saida = {origem: None}
+        fila = deque([origem])
+        while fila:
+            atual = fila.popleft()
+            for vizinho, porta in sorted(vizinhos[atual]):
+                if vizinho not in saida:
+                    saida[vizinho] = porta if atual == origem else saida[atual]
+                    fila.append(vizinho)
+        fluxos[dpid] = [Destino(mac, porta if switch == origem else saida[switch], ip)
+                        for mac, switch, porta, ip in destinos if switch in saida]
+    return fluxos
+
+
+class CacheInventario:
+    """Fluxos do inventário em arquivo (relido quando o arquivo muda) ou, sem ele, da RobustTopo."""
+
+    def __init__(self, caminho=INVENTARIO_PADRAO):
+        self.caminho = caminho
+        self.origem = None
+        self.erro = None
+        self._versao = object()
+        self._fluxos = None
+
+    def fluxos(self):
+        try:
+            versao = os.stat(self.caminho).st_mtime_ns if self.caminho else None
+        except OSError:
+            versao = None
+        if versao != self._versao:
+            self.erro = None
+            try:
+                if versao is None:
+                    raise FileNotFoundError(self.caminho)
+                self._fluxos = fluxos_por_switch(carregar_inventario(self.caminho))
+                self.origem = self.caminho
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                if versao is not None:
+                    self.erro = e
+                self._fluxos = fluxos_por_switch(inventario_robusttopo())
+                self.origem = 'RobustTopo (estático)'
+            self._versao = versao
+        return self._fluxos
@@ -0,0 +1,105 @@
+"""Controle de tempestade de PacketIn com baldes de tokens.
+
+Cada datapath e cada porta de entrada (dpid, in_port) têm seu próprio balde.
+Um PacketIn só é processado se houver token nos dois baldes; o excesso é
+descartado ou, no modo de amostragem, 1 a cada ``amostragem`` excedentes
+ainda é processado (útil para continuar aprendendo MACs durante uma rajada).
+"""
+import time
+
+
+class BaldeTokens:
+    __slots__ = ('taxa', 'capacidade', 'tokens', 'atualizado', 'relogio')
+
+    def __init__(self, taxa, capacidade, relogio=time.monotonic):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade)
+        self.tokens = self.capacidade
+        self.relogio = relogio
+        self.atualizado = relogio()
+
+    def _reabastecer(self):
+        agora = self.relogio()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+
+    def disponivel(self, n=1):
+        """Indica se há ``n`` tokens, sem retirá-los."""
+        self._reabastecer()
+        return self.tokens >= n
+
+    def consumir(self, n=1):
+        """Retira ``n`` tokens se disponíveis; retorna False se o balde estiver vazio."""
+        self._reabastecer()
+        if self.tokens >= n:
+            self.tokens -= n
+            return True
+        return False
+
+
+class LimitadorPacketIn:
+    def __init__(self, taxa_datapath=1000, rajada_datapath=2000,
+                 taxa_porta=200, rajada_porta=400, amostragem=0,
+                 relogio=time.monotonic):
+        self.taxa_datapath = taxa_datapath
+        self.rajada_datapath = rajada_datapath
+        self.taxa_porta = taxa_porta
+        self.rajada_porta = rajada_porta
+        self.amostragem = amostragem
+        self.relogio = relogio
+        self._baldes_datapath = {}
+        self._baldes_porta = {}
+        self._excedentes = 0
+        self.aceitos = 0
+        self.amostrados = 0
+        # (dpid, in_port) -> PacketIns descartados
+        self.descartes = {}
+        # Descartes de datapaths já removidos (mantém o total monotônico)
+        self.descartes_removidos = 0
+
+    def permitir(self, dpid, in_port):
+        """Decide se o PacketIn recebido em (dpid, in_port) deve ser processado."""
+        chave = (dpid, in_port)
+        balde_porta = self._baldes_porta.get(chave)
+        if balde_porta is None:
+            balde_porta = self._baldes_porta[chave] = BaldeTokens(
+                self.taxa_porta, self.rajada_porta, self.relogio)
+        balde_dp = self._baldes_datapath.get(dpid)
+        if balde_dp is None:
+            balde_dp = self._baldes_datapath[dpid] = BaldeTokens(
+                self.taxa_datapath, self.rajada_datapath, self.relogio)
+
+        # Confere os dois baldes antes de debitar: uma sobrecarga do datapath
+        # não consome o orçamento das portas cujos pacotes são descartados
+        if balde_porta.disponivel() and balde_dp.disponivel():
+            balde_porta.consumir()
+            balde_dp.consumir()
+            self.aceitos += 1
+            return True
+
+        if self.amostragem:
+            self._excedentes += 1
+            if self._excedentes % self.amostragem == 0:
+                self.amostrados += 1
+                return True
+
+        self.descartes[chave] = self.descartes.get(chave, 0) + 1
+        return False
+
+    def remover_datapath(self, dpid):
+        self._baldes_datapath.pop(dpid, None)
+        for chave in [k for k in self._baldes_porta if k[0] == dpid]:
+            del self._baldes_porta[chave]
+        for chave in [k for k in self.descartes if k[0] == dpid]:
+            self.descartes_removidos += self.descartes.pop(chave)
+
+    def total_descartes(self):
+        return self.descartes_removidos + sum(self.descartes.values())
+
+    def estatisticas(self):
+        return {
+            'aceitos': self.aceitos,
+            'amostrados': self.amostrados,
+            'descartados': self.total_descartes(),
+            'descartes_por_porta': dict(self.descartes),
+        }
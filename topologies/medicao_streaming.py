@@ -0,0 +1,227 @@
+"""Medição em fluxo (streaming) de ping e iperf3 nos hosts do Mininet.
+
+As saídas são lidas linha a linha de ``host.popen`` enquanto a ferramenta
+roda, em vez de bloquear em ``host.cmd()`` até o fim. Cada linha vira um
+registro tipado (``AmostraPing``/``AmostraIperf``) e alimenta estatísticas
+incrementais de memória constante: média (Welford), mínimo/máximo, jitter
+(RFC 3550) e percentis pelo algoritmo P² (Jain & Chlamtac), que mantém só
+5 marcadores por percentil, independentemente do número de amostras.
+
+O iperf3 é lido com ``--json-stream`` (um evento JSON por linha, iperf3 >=
+3.17); em versões anteriores, cai para a saída de texto com ``--forceflush``.
+Os servidores iperf3 ficam ativos entre os testes (``ServidoresIperf``), em
+vez de ``iperf3 -s &`` + ``pkill iperf3`` a cada teste.
+"""
+import json
+import math
+import re
+import subprocess
+import time
+from collections import namedtuple
+
+AmostraPing = namedtuple('AmostraPing', 'seq ttl rtt_ms instante')
+AmostraIperf = namedtuple('AmostraIperf', 'inicio fim octetos mbps retransmissoes')
+
+_RE_PING = re.compile(r'icmp_seq=(\d+) ttl=(\d+) time=([\d.]+) ms')
+_RE_PING_PERDIDO = re.compile(r'no answer yet for icmp_seq=(\d+)')
+_RE_IPERF_TEXTO = re.compile(r'\]\s+([\d.]+)-([\d.]+)\s+sec\s+([\d.]+)\s+(\w?)Bytes\s+([\d.]+)\s+(\w?)bits/sec')
+_UNIDADES = {'': 1, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12}
+
+
+class EstimadorP2:
+    """Percentil ``p`` (0-1) em memória constante pelo algoritmo P²."""
+
+    __slots__ = ('p', 'q', 'n', 'desejada', 'incremento')
+
+    def __init__(self, p):
+        self.p = p
+        self.q = []
+        self.n = [0, 1, 2, 3, 4]
+        self.desejada = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.incremento = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def adicionar(self, x):
+        q, n = self.q, self.n
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desejada[i] += self.incremento[i]
+        for i in (1, 2, 3):
+            d = self.desejada[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    # Fórmula parabólica saiu do intervalo: usa a linear
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def valor(self):
+        if not self.q:
+            return math.nan
+        if len(self.q) < 5:
+            return self.q[min(len(self.q) - 1, int(round(self.p * (len(self.q) - 1))))]
+        return self.q[2]
+
+
+class EstatisticasStreaming:
+    """Contagem, média, desvio, mín/máx, jitter e percentis P² de uma série."""
+
+    def __init__(self, percentis=(0.5, 0.9, 0.99)):
+        self.n = 0
+        self.media = 0.0
+        self._m2 = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self.jitter = 0.0
+        self._anterior = None
+        self.percentis = {p: EstimadorP2(p) for p in percentis}
+
+    def adicionar(self, x):
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self._m2 += delta * (x - self.media)
+        self.minimo = min(self.minimo, x)
+        self.maximo = max(self.maximo, x)
+        if self._anterior is not None:
+            # Estimador suavizado da RFC 3550 (J += (|D| - J) / 16)
+            self.jitter += (abs(x - self._anterior) - self.jitter) / 16
+        self._anterior = x
+        for estimador in self.percentis.values():
+            estimador.adicionar(x)
+
+    @property
+    def desvio(self):
+        return math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def resumo(self):
+        resumo = {'n': self.n, 'media': self.media, 'desvio': self.desvio,
+                  'min': self.minimo, 'max': self.maximo, 'jitter': self.jitter}
+        resumo.update({f'p{round(p * 100):g}': e.valor() for p, e in self.percentis.items()})
+        return resumo
+
+    def __str__(self):
+        if not self.n:
+            return 'sem amostras'
+        partes = [f'n={self.n}', f'média={self.media:.3f}']
+        partes += [f'p{round(p * 100):g}={e.valor():.3f}' for p, e in self.percentis.items()]
+        partes.append(f'jitter={self.jitter:.3f}')
+        return ' '.join(partes)
+
+
+def _linhas(processo):
+    for linha in iter(processo.stdout.readline, b''):
+        yield linha.decode(errors='replace')
+
+
+def stream_ping(host, ip, contagem=10, intervalo=1.0, perdidos=None):
+    """Gera uma ``AmostraPing`` por resposta, à medida que chegam.
+
+    Com ``-O`` o ping informa cada pedido sem resposta; se ``perdidos`` (lista)
+    for informada, os números de sequência perdidos são anexados a ela.
+    """
+    processo = host.popen(['ping', '-n', '-O', '-c', str(contagem), '-i', str(intervalo), ip],
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        for linha in _linhas(processo):
+            m = _RE_PING.search(linha)
+            if m:
+                yield AmostraPing(int(m.group(1)), int(m.group(2)), float(m.group(3)), time.time())
+            elif perdidos is not None:
+                m = _RE_PING_PERDIDO.search(linha)
+                if m:
+                    perdidos.append(int(m.group(1)))
+    finally:
+        if processo.poll() is None:
+            processo.terminate()
+        processo.wait()
+
+
+_suporta_json_stream = None
+
+
+def suporta_json_stream(host):
+    """Verifica (uma vez) se o iperf3 instalado aceita ``--json-stream``."""
+    global _suporta_json_stream
+    if _suporta_json_stream is None:
+        _suporta_json_stream = '--json-stream' in host.cmd('iperf3 --help 2>&1')
+    return _suporta_json_stream
+
+
+def stream_iperf(host, ip, duracao=10, porta=5201, intervalo=1.0):
+    """Gera uma ``AmostraIperf`` por intervalo do iperf3, à medida que são relatados."""
+    json_stream = suporta_json_stream(host)
+    comando = ['iperf3', '-c', ip, '-p', str(porta), '-t', str(duracao), '-i', str(intervalo)]
+    comando += ['--json-stream'] if json_stream else ['--forceflush', '-f', 'm']
+    processo = host.popen(comando, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        for linha in _linhas(processo):
+            if json_stream:
+                try:
+                    evento = json.loads(linha)
+                except ValueError:
+                    continue
+                if evento.get('event') == 'interval':
+                    s = evento['data']['sum']
+                    yield AmostraIperf(s['start'], s['end'], s['bytes'], s['bits_per_second'] / 1e6,
+                                       s.get('retransmits'))
+                elif evento.get('event') == 'error':
+                    raise RuntimeError(evento.get('data'))
+                continue
+            m = _RE_IPERF_TEXTO.search(linha)
+            # Linhas de resumo final ("sender"/"receiver") repetem o teste inteiro
+            if m and 'sender' not in linha and 'receiver' not in linha:
+                octetos = float(m.group(3)) * _UNIDADES.get(m.group(4), 1)
+                mbps = float(m.group(5)) * _UNIDADES.get(m.group(6), 1) / 1e6
+                yield AmostraIperf(float(m.group(1)), float(m.group(2)), int(octetos), mbps, None)
+            elif 'iperf3: error' in linha:
+                raise RuntimeError(linha.strip())
+    finally:
+        if processo.poll() is None:
+            processo.terminate()
+        processo.wait()
+
+
+class ServidoresIperf:
+    """Servidores iperf3 de longa duração, um por host, reaproveitados entre testes."""
+
+    def __init__(self, porta=5201):
+        self.porta = porta
+        self._processos = {}
+
+    def garantir(self, host):
+        processo = self._processos.get(host.name)
+        if processo is not None and processo.poll() is None:
+            return False
+        self._processos[host.name] = host.popen(['iperf3', '-s', '-p', str(self.porta)],
+                                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # Dá tempo ao servidor de abrir o socket antes do primeiro cliente
+        time.sleep(0.3)
+        return True
+
+    def parar_todos(self):
+        for processo in self._processos.values():
+            if processo.poll() is None:
+                processo.terminate()
+        for processo in self._processos.values():
+            processo.wait()
+        self._processos.clear()
+
+    def __len__(self):
+        return sum(1 for p in self._processos.values() if p.poll() is None)
@@ -0,0 +1,129 @@
+"""Contadores, histogramas e medidores do controlador no formato texto do Prometheus.
+
+Sem dependências externas: o registro é exportado por ``exportar_prometheus()``,
+que o Ryu_controlador publica em /metrics no servidor WSGI do Ryu e/ou grava
+periodicamente em arquivo.
+"""
+import os
+from bisect import bisect_left
+
+# Limites (em segundos) padrão dos histogramas de latência: 10us .. 1s
+BUCKETS_LATENCIA = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3,
+                    2.5e-3, 5e-3, 1e-2, 2.5e-2, 0.1, 1.0)
+
+
+def _formatar_rotulos(nomes, valores, extra=''):
+    pares = [f'{n}="{v}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.valores = {}
+
+    def inc(self, n=1, rotulos=()):
+        self.valores[rotulos] = self.valores.get(rotulos, 0) + n
+
+    def amostras(self):
+        for valores, v in self.valores.items():
+            yield self.nome + _formatar_rotulos(self.rotulos, valores), v
+
+
+class Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(sorted(buckets))
+        # rotulos -> [contagens por bucket (+Inf no fim), soma, total]
+        self.series = {}
+
+    def observar(self, valor, rotulos=()):
+        serie = self.series.get(rotulos)
+        if serie is None:
+            serie = self.series[rotulos] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        serie[0][bisect_left(self.buckets, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def amostras(self):
+        for valores, (contagens, soma, total) in self.series.items():
+            acumulado = 0
+            for limite, n in zip(self.buckets + (float('inf'),), contagens):
+                acumulado += n
+                le = '+Inf' if limite == float('inf') else repr(limite)
+                yield self.nome + '_bucket' + _formatar_rotulos(self.rotulos, valores, f'le="{le}"'), acumulado
+            yield self.nome + '_sum' + _formatar_rotulos(self.rotulos, valores), soma
+            yield self.nome + '_count' + _formatar_rotulos(self.rotulos, valores), total
+
+
+class Medidor:
+    """Valor lido no momento da exportação; ``funcao`` retorna um número ou
+    um dict {tupla_de_rotulos: valor}."""
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, funcao, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao
+        self.rotulos = tuple(rotulos)
+
+    def amostras(self):
+        valor = self.funcao()
+        if isinstance(valor, dict):
+            for valores, v in valor.items():
+                yield self.nome + _formatar_rotulos(self.rotulos, valores), v
+        else:
+            yield self.nome, valor
+
+
+class ContadorFuncao(Medidor):
+    """Contador monotônico mantido por outro objeto e lido na exportação
+    (ex.: descartes do limitador); exportado como ``counter``."""
+    tipo = 'counter'
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA):
+        return self._registrar(Histograma(nome, ajuda, rotulos, buckets))
+
+    def medidor(self, nome, ajuda, funcao, rotulos=()):
+        return self._registrar(Medidor(nome, ajuda, funcao, rotulos))
+
+    def contador_funcao(self, nome, ajuda, funcao, rotulos=()):
+        return self._registrar(ContadorFuncao(nome, ajuda, funcao, rotulos))
+
+    def exportar_prometheus(self):
+        linhas = []
+        for m in self._metricas:
+            linhas.append(f'# HELP {m.nome} {m.ajuda}')
+            linhas.append(f'# TYPE {m.nome} {m.tipo}')
+            for serie, valor in m.amostras():
+                linhas.append(f'{serie} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+    def salvar(self, caminho):
+        """Grava o snapshot das métricas de forma atômica (arquivo temporário + rename)."""
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w') as f:
+            f.write(self.exportar_prometheus())
+        os.replace(temporario, caminho)
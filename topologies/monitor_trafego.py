@@ -0,0 +1,156 @@
+"""Taxas por fluxo e por porta a partir das estatísticas OpenFlow coletadas periodicamente.
+
+O MeuSwitch13 consulta cada datapath com OFPFlowStatsRequest e
+OFPPortStatsRequest; cada entrada das respostas passa por ``registrar_fluxo``
+ou ``registrar_porta``, que calculam a taxa (bit/s e pacotes/s) pela
+diferença em relação à amostra anterior, usando a duração informada pelo
+próprio switch (sem depender do atraso da coleta). O custo é O(1) por
+entrada: nada é ordenado durante a coleta, e os maiores (top-N) só são
+calculados quando consultados.
+
+A memória é limitada: no máximo ``capacidade`` fluxos por datapath (LRU) e
+``historico`` amostras por fluxo/porta. Como cada entrada vista em uma rodada
+vai para o fim da ordem LRU, as que sumiram do switch ficam no início e são
+removidas em ``fim_rodada`` sem percorrer a tabela.
+
+Um fluxo vira elefante quando passa de ``elefante_bps`` em
+``elefante_amostras`` amostras consecutivas, e deixa de ser na primeira
+amostra abaixo do limite.
+"""
+import heapq
+import time
+from collections import OrderedDict, deque
+
+# Posições da lista de cada entrada
+_OCTETOS, _PACOTES, _DURACAO, _BPS, _PPS, _RODADA, _ACIMA, _HISTORICO = range(8)
+
+
+class MonitorTrafego:
+    def __init__(self, capacidade=10000, historico=30, elefante_bps=10e6, elefante_amostras=3,
+                 relogio=time.time):
+        self.capacidade = capacidade
+        self.historico = historico
+        self.elefante_bps = elefante_bps
+        self.elefante_amostras = elefante_amostras
+        self.relogio = relogio
+        # dpid -> OrderedDict(chave -> entrada), do menos ao mais recentemente visto
+        self._fluxos = {}
+        self._portas = {}
+        # dpid -> número da rodada de coleta em andamento
+        self._rodadas = {}
+        # (dpid, chave) dos fluxos elefantes atuais
+        self.elefantes = set()
+        self.despejos = 0
+        self.removidos = 0
+
+    def nova_rodada(self, dpid):
+        self._rodadas[dpid] = self._rodadas.get(dpid, 0) + 1
+
+    def _atualizar(self, tabelas, dpid, chave, octetos, pacotes, duracao):
+        tabela = tabelas.get(dpid)
+        if tabela is None:
+            tabela = tabelas[dpid] = OrderedDict()
+        rodada = self._rodadas.get(dpid, 0)
+        entrada = tabela.get(chave)
+        if entrada is None:
+            while len(tabela) >= self.capacidade:
+                chave_antiga, _ = tabela.popitem(last=False)
+                self.elefantes.discard((dpid, chave_antiga))
+                self.despejos += 1
+            tabela[chave] = [octetos, pacotes, duracao, 0.0, 0.0, rodada, 0, deque(maxlen=self.historico)]
+            return None
+        tabela.move_to_end(chave)
+        intervalo = duracao - entrada[_DURACAO]
+        if intervalo > 0 and octetos >= entrada[_OCTETOS] and pacotes >= entrada[_PACOTES]:
+            bps = (octetos - entrada[_OCTETOS]) * 8 / intervalo
+            pps = (pacotes - entrada[_PACOTES]) / intervalo
+        else:
+            # Fluxo recriado ou contadores zerados: recomeça a partir desta amostra
+            bps = pps = 0.0
+        entrada[:_RODADA + 1] = [octetos, pacotes, duracao, bps, pps, rodada]
+        entrada[_HISTORICO].append((self.relogio(), bps, pps))
+        return entrada
+
+    def registrar_fluxo(self, dpid, chave, octetos, pacotes, duracao):
+        """Atualiza a taxa do fluxo; retorna True se ele acabou de virar elefante."""
+        entrada = self._atualizar(self._fluxos, dpid, chave, octetos, pacotes, duracao)
+        if entrada is None:
+            return False
+        if entrada[_BPS] >= self.elefante_bps:
+            entrada[_ACIMA] += 1
+            if entrada[_ACIMA] == self.elefante_amostras:
+                self.elefantes.add((dpid, chave))
+                return True
+        elif entrada[_ACIMA]:
+            entrada[_ACIMA] = 0
+            self.elefantes.discard((dpid, chave))
+        return False
+
+    def registrar_porta(self, dpid, porta, rx_octetos, tx_octetos, rx_pacotes, tx_pacotes, duracao):
+        # rx: tráfego que o host atrás da porta envia ao switch; tx: o que recebe
+        self._atualizar(self._portas, dpid, (porta, 'rx'), rx_octetos, rx_pacotes, duracao)
+        self._atualizar(self._portas, dpid, (porta, 'tx'), tx_octetos, tx_pacotes, duracao)
+
+    def fim_rodada(self, dpid, fluxos=True):
+        """Remove as entradas do datapath que não apareceram na rodada atual."""
+        tabela = (self._fluxos if fluxos else self._portas).get(dpid)
+        if not tabela:
+            return 0
+        rodada = self._rodadas.get(dpid, 0)
+        removidos = 0
+        while tabela:
+            chave, entrada = next(iter(tabela.items()))
+            if entrada[_RODADA] == rodada:
+                break
+            del tabela[chave]
+            if fluxos:
+                self.elefantes.discard((dpid, chave))
+            removidos += 1
+        self.removidos += removidos
+        return removidos
+
+    def remover_datapath(self, dpid):
+        self._fluxos.pop(dpid, None)
+        self._portas.pop(dpid, None)
+        self._rodadas.pop(dpid, None)
+        self.elefantes = {e for e in self.elefantes if e[0] != dpid}
+
+    def _maiores(self, tabelas, n, filtro=None):
+        candidatos = ((entrada[_BPS], dpid, chave, entrada)
+                      for dpid, tabela in tabelas.items() for chave, entrada in tabela.items()
+                      if filtro is None or filtro(chave))
+        return [(dpid, chave, entrada[_BPS], entrada[_PPS])
+                for _, dpid, chave, entrada in heapq.nlargest(n, candidatos, key=lambda c: c[0])]
+
+    def maiores_fluxos(self, n=10):
+        """[(dpid, chave, bit/s, pacotes/s)] dos ``n`` fluxos mais intensos na última amostra."""
+        return self._maiores(self._fluxos, n)
+
+    def maiores_portas(self, n=10, sentido='rx'):
+        """[(dpid, porta, bit/s, pacotes/s)]: com 'rx', os hosts que mais enviam (top talkers)."""
+        return [(dpid, chave[0], bps, pps)
+                for dpid, chave, bps, pps in self._maiores(self._portas, n, lambda c: c[1] == sentido)]
+
+    def historico_fluxo(self, dpid, chave):
+        entrada = self._fluxos.get(dpid, {}).get(chave)
+        return list(entrada[_HISTORICO]) if entrada is not None else []
+
+    def historico_porta(self, dpid, porta, sentido='rx'):
+        entrada = self._portas.get(dpid, {}).get((porta, sentido))
+        return list(entrada[_HISTORICO]) if entrada is not None else []
+
+    def taxa_fluxo(self, dpid, chave):
+        entrada = self._fluxos.get(dpid, {}).get(chave)
+        return (entrada[_BPS], entrada[_PPS]) if entrada is not None else None
+
+    def __len__(self):
+        return sum(len(t) for t in self._fluxos.values())
+
+    def estatisticas(self):
+        return {
+            'fluxos': len(self),
+            'portas': sum(len(t) for t in self._portas.values()) // 2,
+            'elefantes': len(self.elefantes),
+            'despejos': self.despejos,
+            'removidos': self.removidos,
+        }
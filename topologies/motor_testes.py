@@ -0,0 +1,273 @@
+"""Motor de testes de desempenho concorrente sobre o objeto ``net`` do Mininet.
+
+Substitui o laço sequencial de testar_desempenho.sh (35 pings + 35 iperfs,
+um após o outro, endereçando ``${dst}-eth0``, que não resolve) por um
+escalonador que:
+
+- resolve o IP de cada host com ``host.IP()``;
+- associa a cada teste os recursos do seu caminho: os enlaces de acesso da
+  origem e do destino e o gargalo compartilhado (o r1, para pares entre
+  sub-redes, ou o switch, para pares locais);
+- executa em paralelo todos os testes cujos recursos estão livres; um teste
+  só espera por outro que disputa o mesmo gargalo. Assim o tempo total
+  cresce com o número de caminhos independentes, e não com o número de
+  pares;
+- aplica timeout por teste (o processo é morto) e novas tentativas.
+
+O gargalo é reservado como leitura/escrita: o iperf3 satura o caminho e o
+reserva com exclusividade; pings são leves e o compartilham entre si, mas
+nunca com um iperf, para que o RTT não inclua a fila criada por ele. Um
+iperf à espera de um gargalo tem preferência sobre pings que chegam depois.
+Os enlaces de acesso são sempre exclusivos. Cada teste roda em um processo próprio
+(``host.popen``), então vários testes podem rodar ao mesmo tempo sem
+disputar o shell do host.
+"""
+import csv
+import ipaddress
+import json
+import re
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from mininet.log import info, error
+
+from medicao_streaming import ServidoresIperf
+
+CABECALHO_CSV = ['Teste', 'Origem', 'Destino', 'Métrica', 'Valor']
+
+_RE_RTT = re.compile(r'= ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+) ms')
+_RE_PERDA = re.compile(r'([\d.]+)% packet loss')
+_RE_AMOSTRA_RTT = re.compile(r'time=([\d.]+) ms')
+
+
+class Teste:
+    __slots__ = ('tipo', 'origem', 'destino', 'recursos', 'compartilhados', 'tentativas', 'resultado',
+                 'amostras', 'duracao')
+
+    def __init__(self, tipo, origem, destino, recursos, compartilhados=frozenset()):
+        self.tipo = tipo
+        self.origem = origem
+        self.destino = destino
+        # Reservados com exclusividade / compartilhados com outros testes que também só os leem
+        self.recursos = recursos
+        self.compartilhados = compartilhados
+        self.tentativas = 0
+        self.resultado = None
+        # métrica -> série bruta (RTT de cada resposta, banda de cada intervalo do iperf3)
+        self.amostras = {}
+        self.duracao = 0.0
+
+
+def _sub_rede(host):
+    intf = host.defaultIntf()
+    return ipaddress.ip_interface(f'{intf.IP()}/{intf.prefixLen}').network
+
+
+def _switch_de(host):
+    """Nome do switch ao qual o enlace padrão do host está conectado."""
+    link = host.defaultIntf().link
+    if link is None:
+        return None
+    outro = link.intf2 if link.intf1.node is host else link.intf1
+    return outro.node.name
+
+
+def recursos_caminho(origem, destino, gateway='r1'):
+    """Enlaces de acesso e o gargalo do caminho origem -> destino."""
+    acesso = {f'acesso:{origem.name}', f'acesso:{destino.name}'}
+    if _sub_rede(origem) != _sub_rede(destino):
+        return acesso, f'gargalo:{gateway}'
+    return acesso, f'gargalo:{_switch_de(origem)}'
+
+
+def montar_testes(net, origens, destinos, tipos=('ping', 'iperf')):
+    testes = []
+    for tipo in tipos:
+        for o in origens:
+            for d in destinos:
+                origem, destino = net.get(o), net.get(d)
+                acesso, gargalo = recursos_caminho(origem, destino)
+                if tipo == 'ping':
+                    teste = Teste(tipo, origem, destino, frozenset(acesso), frozenset({gargalo}))
+                else:
+                    teste = Teste(tipo, origem, destino, frozenset(acesso | {gargalo}))
+                testes.append(teste)
+    return testes
+
+
+def hosts_por_sub_rede(net, rede):
+    rede = ipaddress.ip_network(rede)
+    return [h.name for h in net.hosts
+            if h.name != 'r1' and h.IP() and ipaddress.ip_address(h.IP()) in rede]
+
+
+def _executar(host, comando, timeout):
+    """Executa ``comando`` no namespace do host; retorna a saída ou None em timeout/falha."""
+    processo = host.popen(comando, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        saida, _ = processo.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        processo.kill()
+        processo.communicate()
+        return None
+    return saida.decode(errors='replace')
+
+
+def medir_ping(teste, contagem=5, intervalo=0.2, timeout=None):
+    ip = teste.destino.IP()
+    timeout = timeout or contagem * intervalo + 5
+    saida = _executar(teste.origem, ['ping', '-n', '-c', str(contagem), '-i', str(intervalo),
+                                     '-W', '2', ip], timeout)
+    if saida is None:
+        return None
+    rtt, perda = _RE_RTT.search(saida), _RE_PERDA.search(saida)
+    if perda is None:
+        return None
+    resultado = {'Perda(%)': float(perda.group(1))}
+    teste.amostras['RTT(ms)'] = [float(v) for v in _RE_AMOSTRA_RTT.findall(saida)]
+    if rtt is not None:
+        resultado['RTT(ms)'] = float(rtt.group(2))
+        resultado['Jitter(ms)'] = float(rtt.group(4))
+    return resultado
+
+
+def medir_iperf(teste, duracao=5, porta=5201, timeout=None):
+    timeout = timeout or duracao + 10
+    saida = _executar(teste.origem, ['iperf3', '-c', teste.destino.IP(), '-p', str(porta),
+                                     '-t', str(duracao), '-J'], timeout)
+    if saida is None:
+        return None
+    try:
+        dados = json.loads(saida)
+        resumo = dados['end']['sum_received']
+    except (ValueError, KeyError):
+        return None
+    teste.amostras['Banda(Mbps)'] = [i['sum']['bits_per_second'] / 1e6 for i in dados.get('intervals', [])]
+    return {'Banda(Mbps)': resumo['bits_per_second'] / 1e6}
+
+
+class MotorTestes:
+    def __init__(self, net, tentativas=2, max_paralelo=32, contagem_ping=5, duracao_iperf=5,
+                 porta_iperf=5201, servidores=None):
+        self.net = net
+        self.tentativas = tentativas
+        self.max_paralelo = max_paralelo
+        self.contagem_ping = contagem_ping
+        self.duracao_iperf = duracao_iperf
+        # Com ``servidores`` (o conjunto da CLI), usa a porta dele e não o encerra
+        self._servidores_proprios = servidores is None
+        self.servidores = ServidoresIperf(porta_iperf) if servidores is None else servidores
+        self.porta_iperf = self.servidores.porta
+
+    def _iniciar_servidores(self, testes):
+        for host in {t.destino for t in testes if t.tipo == 'iperf'}:
+            self.servidores.garantir(host)
+
+    def parar_servidores(self):
+        if self._servidores_proprios:
+            self.servidores.parar_todos()
+
+    def _rodar(self, teste):
+        inicio = time.perf_counter()
+        while teste.tentativas < self.tentativas:
+            teste.tentativas += 1
+            teste.amostras = {}
+            if teste.tipo == 'ping':
+                teste.resultado = medir_ping(teste, self.contagem_ping)
+            else:
+                teste.resultado = medir_iperf(teste, self.duracao_iperf, self.porta_iperf)
+            if teste.resultado is not None:
+                break
+        teste.duracao = time.perf_counter() - inicio
+        return teste
+
+    def executar(self, testes):
+        """Executa os testes respeitando as reservas de recursos; retorna (testes, tempo total)."""
+        self._iniciar_servidores(testes)
+        pendentes = list(testes)
+        ocupados = set()
+        # recurso -> número de testes que o compartilham no momento
+        leitores = {}
+        em_execucao = {}
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_paralelo) as executor:
+            while pendentes or em_execucao:
+                # Recursos que um teste exclusivo já espera: novos leitores não entram na frente
+                aguardados = set()
+                for teste in list(pendentes):
+                    if len(em_execucao) >= self.max_paralelo:
+                        break
+                    livre = (teste.recursos.isdisjoint(ocupados) and teste.recursos.isdisjoint(leitores)
+                             and teste.compartilhados.isdisjoint(ocupados)
+                             and teste.compartilhados.isdisjoint(aguardados))
+                    if not livre:
+                        aguardados |= teste.recursos
+                        continue
+                    pendentes.remove(teste)
+                    ocupados |= teste.recursos
+                    for recurso in teste.compartilhados:
+                        leitores[recurso] = leitores.get(recurso, 0) + 1
+                    em_execucao[executor.submit(self._rodar, teste)] = teste
+                concluidos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    teste = em_execucao.pop(futuro)
+                    ocupados -= teste.recursos
+                    for recurso in teste.compartilhados:
+                        leitores[recurso] -= 1
+                        if not leitores[recurso]:
+                            del leitores[recurso]
+                    futuro.result()
+                    estado = '✅' if teste.resultado is not None else '❌'
+                    info(f"{estado} {teste.tipo}: {teste.origem.name} -> {teste.destino.name} "
+                         f"({teste.duracao:.1f}s, {teste.tentativas} tentativa(s))\n")
+        return testes, time.perf_counter() - inicio
+
+
+def salvar_csv(testes, caminho):
+    with open(caminho, 'w', newline='') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(CABECALHO_CSV)
+        for teste in testes:
+            nome = 'Ping' if teste.tipo == 'ping' else 'Iperf'
+            if teste.resultado is None:
+                # Falha não é zero: deixa o valor vazio para não distorcer médias
+                metrica = 'RTT(ms)' if teste.tipo == 'ping' else 'Banda(Mbps)'
+                escritor.writerow([nome, teste.origem.name, teste.destino.name, metrica, ''])
+                continue
+            for metrica, valor in teste.resultado.items():
+                escritor.writerow([nome, teste.origem.name, teste.destino.name, metrica, f'{valor:.3f}'])
+
+
+def executar_matriz(net, tipos=('ping', 'iperf'), caminho='/tmp/resultados_teste.csv',
+                    origens=None, destinos=None, banco=None, metadados=None, **opcoes):
+    """Matriz origens (10.0.1.0/24) x destinos (10.0.2.0/24) completa, salva em CSV.
+
+    Com ``banco``, a execução e as séries brutas também são gravadas no
+    armazém SQLite (armazem_resultados.py), com ``metadados`` (ex.: o perfil
+    de enlace) junto dos parâmetros da execução.
+    """
+    origens = origens or hosts_por_sub_rede(net, '10.0.1.0/24')
+    destinos = destinos or hosts_por_sub_rede(net, '10.0.2.0/24')
+    motor = MotorTestes(net, **opcoes)
+    testes = montar_testes(net, origens, destinos, tipos)
+    try:
+        testes, total = motor.executar(testes)
+    finally:
+        motor.parar_servidores()
+    salvar_csv(testes, caminho)
+    if banco:
+        from armazem_resultados import ArmazemResultados
+        with ArmazemResultados(banco) as armazem:
+            execucao = armazem.nova_execucao('matriz', {'tipos': list(tipos), 'origens': origens,
+                                                        'destinos': destinos, 'duracao_total': total,
+                                                        **(metadados or {})})
+            armazem.registrar_testes(execucao, testes)
+        info(f"Execução {execucao} gravada em '{banco}'.\n")
+    falhas = sum(1 for t in testes if t.resultado is None)
+    soma = sum(t.duracao for t in testes)
+    info(f"\n✅ {len(testes)} testes em {total:.1f}s (sequencial seria ~{soma:.1f}s); "
+         f"{falhas} falha(s). Resultados em '{caminho}'.\n")
+    if falhas:
+        error(f"⚠️  {falhas} teste(s) falharam após {motor.tentativas} tentativa(s).\n")
+    return testes
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""Parser estruturado da saída de ``ovs-ofctl dump-flows`` e análise da tabela.
+
+Converte cada linha do dump em um registro ``Fluxo`` compacto (match,
+prioridade, ações, contadores, durações) e monta uma ``TabelaFluxos`` com
+índices por prioridade, por prefixo de nw_src/nw_dst e por tp_dst, para
+consultas rápidas mesmo com milhares de entradas.
+
+A detecção de regras sombreadas/redundantes não compara todos os pares de
+fluxos: os fluxos são agrupados pelo "formato" do match (campos exatos
+presentes e comprimento dos prefixos IP) e, para cada fluxo, só os grupos
+cujo formato é mais geral são consultados, com uma busca em hash usando os
+valores do próprio fluxo. O custo é O(n x número de formatos distintos).
+
+Funciona sobre arquivos de dump salvos, para análise offline:
+    sudo ovs-ofctl -O OpenFlow13 dump-flows s1 > s1.txt
+    python3 parser_fluxos.py s1.txt --sombreamento
+    python3 parser_fluxos.py s1.txt --nw-dst 10.0.2.1 --tp-dst 80
+"""
+import argparse
+import ipaddress
+import subprocess
+import sys
+from bisect import bisect_left, bisect_right
+
+PRIORIDADE_PADRAO_OVS = 32768
+
+# Campos de estatística que aparecem antes do match, separados por ", "
+_CAMPOS_ESTATISTICA = {
+    'cookie', 'duration', 'table', 'n_packets', 'n_bytes', 'idle_timeout',
+    'hard_timeout', 'idle_age', 'hard_age', 'importance',
+}
+
+# Flags do flow-mod: o ovs-ofctl as separa do match por espaço, não por ", "
+# ("hard_timeout=300, send_flow_rem priority=1,in_port=...")
+_FLAGS_FLOW_MOD = {'send_flow_rem', 'reset_counts', 'check_overlap', 'no_packet_counts', 'no_byte_counts'}
+
+# Atalhos de protocolo do ovs-ofctl -> campos equivalentes
+_PROTOCOLOS = {
+    'ip': {'dl_type': '0x0800'},
+    'ipv6': {'dl_type': '0x86dd'},
+    'arp': {'dl_type': '0x0806'},
+    'icmp': {'dl_type': '0x0800', 'nw_proto': '1'},
+    'tcp': {'dl_type': '0x0800', 'nw_proto': '6'},
+    'udp': {'dl_type': '0x0800', 'nw_proto': '17'},
+    'sctp': {'dl_type': '0x0800', 'nw_proto': '132'},
+    'icmp6': {'dl_type': '0x86dd', 'nw_proto': '58'},
+    'tcp6': {'dl_type': '0x86dd', 'nw_proto': '6'},
+    'udp6': {'dl_type': '0x86dd', 'nw_proto': '17'},
+}
+
+# Sinônimos OXM usados por versões diferentes do OVS
+_SINONIMOS = {'ip_src': 'nw_src', 'ip_dst': 'nw_dst', 'eth_src': 'dl_src',
+              'eth_dst': 'dl_dst', 'eth_type': 'dl_type', 'ip_proto': 'nw_proto',
+              'tcp_src': 'tp_src', 'tcp_dst': 'tp_dst', 'udp_src': 'tp_src',
+              'udp_dst': 'tp_dst'}
+
+_CAMPOS_PREFIXO = ('nw_src', 'nw_dst')
+
+
+def _numero(valor):
+    try:
+        return int(valor, 0)
+    except ValueError:
+        return valor
+
+
+def _normalizar_valor(campo, valor):
+    valor = valor.strip('"')
+    if campo == 'dl_type':
+        numero = _numero(valor)
+        return f'{numero:#06x}' if isinstance(numero, int) else valor
+    if campo in ('nw_proto', 'tp_src', 'tp_dst', 'in_port', 'dl_vlan'):
+        numero = _numero(valor)
+        return str(numero) if isinstance(numero, int) else valor
+    return valor.lower()
+
+
+def _prefixo(valor):
+    """'10.0.1.0/24' -> (rede como inteiro, comprimento do prefixo)."""
+    rede = ipaddress.ip_network(valor, strict=False)
+    return int(rede.network_address), rede.prefixlen
+
+
+class Fluxo:
+    __slots__ = ('cookie', 'tabela', 'prioridade', 'match', 'acoes', 'n_pacotes',
+                 'n_bytes', 'duracao', 'idle_timeout', 'hard_timeout', 'prefixos')
+
+    def __init__(self, cookie=0, tabela=0, prioridade=PRIORIDADE_PADRAO_OVS, match=None,
+                 acoes='', n_pacotes=0, n_bytes=0, duracao=0.0, idle_timeout=0,
+                 hard_timeout=0):
+        self.cookie = cookie
+        self.tabela = tabela
+        self.prioridade = prioridade
+        # Campos exatos normalizados (strings); os prefixos IP ficam em self.prefixos
+        self.match = match or {}
+        self.acoes = acoes
+        self.n_pacotes = n_pacotes
+        self.n_bytes = n_bytes
+        self.duracao = duracao
+        self.idle_timeout = idle_timeout
+        self.hard_timeout = hard_timeout
+        # campo -> (rede, comprimento) para nw_src/nw_dst
+        self.prefixos = {}
+
+    @property
+    def drop(self):
+        return self.acoes in ('drop', '')
+
+    @property
+    def tp_dst(self):
+        valor = self.match.get('tp_dst')
+        return int(valor) if valor is not None and valor.isdigit() else None
+
+    def formato(self):
+        """Campos exatos presentes e comprimento de cada prefixo IP."""
+        return (self.tabela, tuple(sorted(self.match)),
+                tuple(self.prefixos[c][1] if c in self.prefixos else None
+                      for c in _CAMPOS_PREFIXO))
+
+    def __repr__(self):
+        return f'Fluxo(priority={self.prioridade}, match={self.linha_match()}, actions={self.acoes})'
+
+    def linha_match(self):
+        campos = [f'{c}={v}' for c, v in sorted(self.match.items())]
+        for c, (rede, plen) in sorted(self.prefixos.items()):
+            campos.append(f'{c}={ipaddress.ip_address(rede)}/{plen}')
+        return ','.join(campos) or '*'
+
+
+def parse_linha(linha):
+    """Converte uma linha do dump-flows em Fluxo (ou None para cabeçalhos/linhas vazias).
+
+    Linha de um fluxo aprendido pelo MeuSwitch13 (OFPFF_SEND_FLOW_REM), do
+    dump-flows do s1:
+
+    >>> parse_linha(' cookie=0x1, duration=4.512s, table=0, n_packets=3, n_bytes=294, '
+    ...             'idle_timeout=30, hard_timeout=300, idle_age=1, send_flow_rem '
+    ...             'priority=1,in_port="s1-eth1",dl_dst=00:00:00:00:00:03 actions=output:"s1-eth8"')
+    Fluxo(priority=1, match=dl_dst=00:00:00:00:00:03,in_port=s1-eth1, actions=output:"s1-eth8")
+    """
+    texto = linha.strip()
+    pos = texto.rfind(' actions=')
+    if pos < 0:
+        if texto.startswith('actions='):
+            cabeca, acoes = '', texto[len('actions='):]
+        else:
+            return None
+    else:
+        cabeca, acoes = texto[:pos].rstrip(','), texto[pos + len(' actions='):]
+
+    fluxo = Fluxo(acoes=acoes.strip().lower())
+    tokens = [t for t in cabeca.split(', ') if t]
+    if tokens:
+        palavras = tokens[-1].split(' ')
+        while palavras and palavras[0] in _FLAGS_FLOW_MOD:
+            palavras.pop(0)
+        tokens[-1] = ' '.join(palavras)
+        if not tokens[-1]:
+            tokens.pop()
+    texto_match = ''
+    if tokens and tokens[-1].split('=', 1)[0] not in _CAMPOS_ESTATISTICA:
+        texto_match = tokens.pop()
+
+    for token in tokens:
+        chave, _, valor = token.partition('=')
+        if chave == 'cookie':
+            fluxo.cookie = int(valor, 16)
+        elif chave == 'duration':
+            fluxo.duracao = float(valor.rstrip('s'))
+        elif chave == 'table':
+            fluxo.tabela = int(valor)
+        elif chave == 'n_packets':
+            fluxo.n_pacotes = int(valor)
+        elif chave == 'n_bytes':
+            fluxo.n_bytes = int(valor)
+        elif chave == 'idle_timeout':
+            fluxo.idle_timeout = int(valor)
+        elif chave == 'hard_timeout':
+            fluxo.hard_timeout = int(valor)
+
+    for campo in (c for c in texto_match.split(',') if c):
+        chave, igual, valor = campo.partition('=')
+        if not igual:
+            for campo_proto, valor in _PROTOCOLOS.get(chave, {chave: '1'}).items():
+                fluxo.match[campo_proto] = _normalizar_valor(campo_proto, valor)
+            continue
+        chave = _SINONIMOS.get(chave, chave)
+        if chave == 'priority':
+            fluxo.prioridade = int(valor)
+        elif chave in _CAMPOS_PREFIXO:
+            try:
+                fluxo.prefixos[chave] = _prefixo(valor)
+            except ValueError:
+                fluxo.match[chave] = valor
+        else:
+            fluxo.match[chave] = _normalizar_valor(chave, valor)
+
+    # nw_src=0.0.0.0/0 equivale a não casar o campo
+    for chave, (_, plen) in list(fluxo.prefixos.items()):
+        if plen == 0:
+            del fluxo.prefixos[chave]
+    return fluxo
+
+
+def parse_dump(texto):
+    """Converte a saída completa do dump-flows em lista de Fluxo."""
+    fluxos = []
+    for linha in texto.splitlines():
+        fluxo = parse_linha(linha)
+        if fluxo is not None:
+            fluxos.append(fluxo)
+    return fluxos
+
+
+def carregar_dump(caminho):
+    with open(caminho) as f:
+        return parse_dump(f.read())
+
+
+def dump_switch(switch):
+    """Executa o dump-flows no switch e retorna a lista de Fluxo."""
+    result = subprocess.run(
+        ["sudo", "ovs-ofctl", "-O", "OpenFlow13", "dump-flows", switch],
+        check=True, capture_output=True, text=True
+    )
+    return parse_dump(result.stdout)
+
+
+def _mascarar(rede, plen, bits=32):
+    return rede & (((1 << plen) - 1) << (bits - plen)) if plen else 0
+
+
+class TabelaFluxos:
+    def __init__(self, fluxos):
+        self.fluxos = sorted(fluxos, key=lambda f: -f.prioridade)
+        self.por_prioridade = {}
+        self.por_tp_dst = {}
+        # campo -> comprimento do prefixo -> rede -> [fluxos]
+        self.por_prefixo = {c: {} for c in _CAMPOS_PREFIXO}
+        # fluxos sem o campo (curinga) em cada dimensão indexada
+        self.curinga = {c: [] for c in _CAMPOS_PREFIXO + ('tp_dst',)}
+
+        for f in self.fluxos:
+            self.por_prioridade.setdefault(f.prioridade, []).append(f)
+            tp_dst = f.tp_dst
+            if tp_dst is None:
+                self.curinga['tp_dst'].append(f)
+            else:
+                self.por_tp_dst.setdefault(tp_dst, []).append(f)
+            for campo in _CAMPOS_PREFIXO:
+                if campo in f.prefixos:
+                    rede, plen = f.prefixos[campo]
+                    self.por_prefixo[campo].setdefault(plen, {}).setdefault(rede, []).append(f)
+                else:
+                    self.curinga[campo].append(f)
+
+    def __len__(self):
+        return len(self.fluxos)
+
+    def com_prioridade(self, prioridade):
+        return self.por_prioridade.get(prioridade, [])
+
+    def com_tp_dst(self, porta, incluir_curinga=False):
+        encontrados = list(self.por_tp_dst.get(porta, []))
+        if incluir_curinga:
+            encontrados += self.curinga['tp_dst']
+        return encontrados
+
+    def cobrindo_ip(self, campo, ip, incluir_curinga=False):
+        """Fluxos cujo prefixo em ``campo`` (nw_src/nw_dst) contém o endereço ``ip``."""
+        endereco = int(ipaddress.ip_address(ip))
+        encontrados = []
+        for plen, redes in self.por_prefixo[campo].items():
+            encontrados += redes.get(_mascarar(endereco, plen), [])
+        if incluir_curinga:
+            encontrados += self.curinga[campo]
+        return encontrados
+
+    def dentro_de(self, campo, prefixo):
+        """Fluxos cujo prefixo em ``campo`` está contido em ``prefixo`` (ex.: 10.0.1.0/24)."""
+        rede, plen_consulta = _prefixo(prefixo)
+        encontrados = []
+        for plen, redes in self.por_prefixo[campo].items():
+            if plen < plen_consulta:
+                continue
+            if plen - plen_consulta <= 8:
+                # Poucas sub-redes possíveis: gera as chaves em vez de varrer o índice
+                passo = 1 << (32 - plen)
+                for i in range(1 << (plen - plen_consulta)):
+                    encontrados += redes.get(rede + i * passo, [])
+            else:
+                encontrados += [f for r, fs in redes.items()
+                                if _mascarar(r, plen_consulta) == rede for f in fs]
+        return encontrados
+
+    def casar_pacote(self, nw_src=None, nw_dst=None, tp_dst=None):
+        """Fluxos que casam com um pacote nessas dimensões, do mais prioritário ao menos."""
+        candidatos = None
+        if nw_src is not None:
+            candidatos = set(map(id, self.cobrindo_ip('nw_src', nw_src, True)))
+        if nw_dst is not None:
+            ids = set(map(id, self.cobrindo_ip('nw_dst', nw_dst, True)))
+            candidatos = ids if candidatos is None else candidatos & ids
+        if tp_dst is not None:
+            ids = set(map(id, self.com_tp_dst(tp_dst, True)))
+            candidatos = ids if candidatos is None else candidatos & ids
+        if candidatos is None:
+            return list(self.fluxos)
+        return [f for f in self.fluxos if id(f) in candidatos]
+
+    def detectar_sombreamento(self, apenas_drop=True):
+        """Retorna a lista de (tipo, fluxo, fluxo_que_cobre).
+
+        - 'sombreada': um fluxo de prioridade maior cobre todo o match e tem outra ação;
+        - 'redundante': um fluxo de prioridade maior cobre o match com a mesma ação, ou
+          um fluxo de prioridade menor com a mesma ação o cobre e nenhum fluxo com
+          ação diferente existe entre as duas prioridades.
+        """
+        grupos = {}
+        for f in self.fluxos:
+            formato = f.formato()
+            grupos.setdefault(formato, {}).setdefault(self._chave(f, formato), []).append(f)
+
+        # Prioridades (crescentes) dos fluxos de cada ação, para contar em O(log n)
+        # quantos fluxos de outra ação existem entre duas prioridades
+        prioridades_por_acao = {}
+        for f in self.fluxos:
+            prioridades_por_acao.setdefault(f.acoes, []).append(f.prioridade)
+        for lista in prioridades_por_acao.values():
+            lista.sort()
+
+        achados = []
+        formatos = {id(f): f.formato() for f in self.fluxos}
+        for f in self.fluxos:
+            if apenas_drop and not f.drop:
+                continue
+            formato_f = formatos[id(f)]
+            maior, menor_mesma_acao = None, None
+            for formato, buckets in grupos.items():
+                if not self._mais_geral(formato, formato_f):
+                    continue
+                for g in buckets.get(self._chave(f, formato), ()):
+                    if g is f:
+                        continue
+                    if g.prioridade > f.prioridade:
+                        if maior is None or g.prioridade > maior.prioridade:
+                            maior = g
+                    elif g.prioridade < f.prioridade and g.acoes == f.acoes:
+                        if menor_mesma_acao is None or g.prioridade > menor_mesma_acao.prioridade:
+                            menor_mesma_acao = g
+            if maior is not None:
+                tipo = 'redundante' if maior.acoes == f.acoes else 'sombreada'
+                achados.append((tipo, f, maior))
+            elif menor_mesma_acao is not None and not self._outra_acao_entre(
+                    prioridades_por_acao, f.acoes, menor_mesma_acao.prioridade, f.prioridade):
+                achados.append(('redundante', f, menor_mesma_acao))
+        return achados
+
+    @staticmethod
+    def _chave(f, formato):
+        """Chave de f projetada no formato (mais geral) ``formato``."""
+        _, campos, plens = formato
+        valores = tuple(f.match[c] for c in campos)
+        redes = tuple(None if plen is None else _mascarar(f.prefixos[c][0], plen)
+                      for c, plen in zip(_CAMPOS_PREFIXO, plens))
+        return valores, redes
+
+    @staticmethod
+    def _mais_geral(formato_g, formato_f):
+        """Indica se um match com formato_g pode cobrir um match com formato_f."""
+        tabela_g, campos_g, plens_g = formato_g
+        tabela_f, campos_f, plens_f = formato_f
+        if tabela_g != tabela_f or not set(campos_g) <= set(campos_f):
+            return False
+        for plen_g, plen_f in zip(plens_g, plens_f):
+            if plen_g is not None and (plen_f is None or plen_g > plen_f):
+                return False
+        return True
+
+    @staticmethod
+    def _outra_acao_entre(prioridades_por_acao, acao, baixa, alta):
+        for outra, prioridades in prioridades_por_acao.items():
+            if outra != acao and bisect_left(prioridades, alta) - bisect_right(prioridades, baixa) > 0:
+                return True
+        return False
+
+
+def resumo_tabela(fluxos):
+    """Texto curto com totais por prioridade, regras de drop e sombreamentos."""
+    tabela = TabelaFluxos(fluxos)
+    drops = sum(1 for f in tabela.fluxos if f.drop)
+    prioridades = ', '.join(f'{p}: {len(fs)}' for p, fs in sorted(tabela.por_prioridade.items(), reverse=True))
+    linhas = [f"{len(tabela)} fluxos ({drops} de drop) | por prioridade: {prioridades or '-'}"]
+    for tipo, f, g in tabela.detectar_sombreamento():
+        linhas.append(f"  ⚠️  {tipo}: [{f.prioridade}] {f.linha_match()} coberta por "
+                      f"[{g.prioridade}] {g.linha_match()} ({g.acoes})")
+    return '\n'.join(linhas)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Analisa a saída do ovs-ofctl dump-flows.")
+    ap.add_argument('origem', help="Arquivo com o dump salvo, ou nome do switch com --switch")
+    ap.add_argument('--switch', action='store_true', help="Lê o dump direto do switch (ex: s1)")
+    ap.add_argument('--prioridade', type=int)
+    ap.add_argument('--nw-src')
+    ap.add_argument('--nw-dst')
+    ap.add_argument('--tp-dst', type=int)
+    ap.add_argument('--sombreamento', action='store_true',
+                    help="Lista regras de drop sombreadas ou redundantes")
+    args = ap.parse_args()
+
+    fluxos = dump_switch(args.origem) if args.switch else carregar_dump(args.origem)
+    tabela = TabelaFluxos(fluxos)
+
+    if args.prioridade is not None:
+        resultado = tabela.com_prioridade(args.prioridade)
+    elif args.nw_src or args.nw_dst or args.tp_dst is not None:
+        resultado = tabela.casar_pacote(args.nw_src, args.nw_dst, args.tp_dst)
+    else:
+        resultado = None
+
+    if resultado is not None:
+        for f in resultado:
+            print(f"[{f.prioridade:>5}] {f.linha_match():<60} -> {f.acoes} "
+                  f"({f.n_pacotes} pkts, {f.n_bytes} bytes)")
+        print(f"{len(resultado)} de {len(tabela)} fluxos.")
+    if args.sombreamento or resultado is None:
+        print(resumo_tabela(fluxos))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""Parser rápido (fast path) do cabeçalho Ethernet para o controlador Ryu.
+
+Lê apenas os 14 primeiros bytes do quadro através de um memoryview, sem
+decodificar as camadas superiores. Os MACs são devolvidos na forma compacta
+de 6 bytes (``bytes``), que é hashable e serve direto como chave de dicionário.
+"""
+import struct
+
+ETH_HEADER_LEN = 14
+
+ETH_TYPE_IP = 0x0800
+ETH_TYPE_ARP = 0x0806
+ETH_TYPE_8021Q = 0x8100
+ETH_TYPE_IPV6 = 0x86dd
+
+_ETHERTYPE = struct.Struct('!H')
+
+
+def parse_ethernet(data):
+    """Retorna (dst, src, ethertype) do quadro, ou None se for curto demais."""
+    view = memoryview(data)
+    if len(view) < ETH_HEADER_LEN:
+        return None
+    cab = view[:ETH_HEADER_LEN]
+    return bytes(cab[0:6]), bytes(cab[6:12]), _ETHERTYPE.unpack_from(cab, 12)[0]
+
+
+def mac_texto(mac):
+    """Converte o MAC compacto (6 bytes) para o formato 'aa:bb:cc:dd:ee:ff'."""
+    return mac.hex(':')
+
+
+def mac_binario(texto):
+    """Converte 'aa:bb:cc:dd:ee:ff' para a forma compacta de 6 bytes."""
+    return bytes.fromhex(texto.replace(':', ''))
+
+
+def is_multicast(mac):
+    """Indica se o MAC (compacto) é multicast/broadcast (bit I/G ligado)."""
+    return bool(mac[0] & 0x01)
@@ -0,0 +1,233 @@
+"""Perfis de enlace (banda, atraso, jitter, perda e fila) declarados em JSON.
+
+Os enlaces da RobustTopo e da TopologiaParametrica são ``TCLink``/``LinkLote``
+(interfaces ``TCIntf``), mas eram criados sem parâmetros: banda ilimitada e
+atraso zero. Um arquivo de perfis descreve, por perfil, os parâmetros de
+cada classe de enlace e, opcionalmente, de enlaces específicos::
+
+    {
+      "padrao": "ilimitado",
+      "perfis": {
+        "ilimitado": {},
+        "uplink-10m": {
+          "todos": {"max_queue_size": 1000},
+          "classes": {"acesso": {"bw": 100},
+                      "uplink": {"bw": 10, "delay": "5ms", "jitter": "1ms", "loss": 0.1}},
+          "enlaces": {"h1-s1": {"bw": 1}}
+        }
+      }
+    }
+
+Classes: ``acesso`` (host-switch), ``uplink`` (gateway r1-switch) e
+``tronco`` (switch-switch). Os parâmetros se sobrepõem na ordem
+``todos`` < classe < enlace; um enlace sem parâmetros volta ao padrão do
+kernel (sem qdisc). ``bw`` em Mbit/s, ``delay``/``jitter`` em ms (número) ou
+texto do tc (``'5ms'``), ``loss`` em %, ``max_queue_size`` em pacotes.
+
+``PerfisEnlace.aplicar`` troca o perfil na rede em execução, sem reconstruir
+a topologia: só as interfaces cujos parâmetros mudaram são reconfiguradas
+(``TCIntf.config``, nas duas pontas do enlace, como no ``TCLink``), com um
+nó por thread, já que os comandos de cada nó passam pelo mesmo shell.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mininet.log import info, error
+
+PERFIS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perfis_enlace.json')
+CLASSES = ('acesso', 'uplink', 'tronco')
+CAMPOS = ('bw', 'delay', 'jitter', 'loss', 'max_queue_size')
+
+
+class PerfilInvalido(ValueError):
+    pass
+
+
+def _tempo(valor, campo, origem):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool) and valor >= 0:
+        return f'{valor:g}ms'
+    if isinstance(valor, str) and valor.strip() and valor.strip()[0].isdigit():
+        return valor.strip()
+    raise PerfilInvalido(f"{origem}: '{campo}' deve ser um número de ms ou texto do tc (ex.: '5ms'), não {valor!r}.")
+
+
+def normalizar_parametros(parametros, origem='perfil'):
+    """Valida os parâmetros de um enlace e os converte para os argumentos do ``TCIntf.config``."""
+    if not isinstance(parametros, dict):
+        raise PerfilInvalido(f"{origem}: esperado um objeto com {', '.join(CAMPOS)}.")
+    desconhecidos = set(parametros) - set(CAMPOS)
+    if desconhecidos:
+        raise PerfilInvalido(f"{origem}: parâmetro(s) desconhecido(s): {', '.join(sorted(desconhecidos))}.")
+    normalizados = {}
+    for campo, valor in parametros.items():
+        if valor is None:
+            continue
+        if campo in ('delay', 'jitter'):
+            normalizados[campo] = _tempo(valor, campo, origem)
+        elif campo == 'max_queue_size':
+            if not isinstance(valor, int) or isinstance(valor, bool) or valor < 1:
+                raise PerfilInvalido(f"{origem}: 'max_queue_size' deve ser um inteiro positivo.")
+            normalizados[campo] = valor
+        else:
+            if not isinstance(valor, (int, float)) or isinstance(valor, bool):
+                raise PerfilInvalido(f"{origem}: '{campo}' deve ser numérico.")
+            if campo == 'bw' and not 0 < valor <= 1000:
+                raise PerfilInvalido(f"{origem}: 'bw' deve estar em (0, 1000] Mbit/s.")
+            if campo == 'loss' and not 0 <= valor <= 100:
+                raise PerfilInvalido(f"{origem}: 'loss' deve estar entre 0 e 100 (%).")
+            normalizados[campo] = valor
+    if 'jitter' in normalizados and 'delay' not in normalizados:
+        # O netem só aplica jitter sobre um atraso: os dois ficam no mesmo nível
+        raise PerfilInvalido(f"{origem}: 'jitter' exige 'delay' nos mesmos parâmetros.")
+    return normalizados
+
+
+def validar_perfil(nome, perfil):
+    if not isinstance(perfil, dict):
+        raise PerfilInvalido(f"Perfil '{nome}': esperado um objeto.")
+    desconhecidas = set(perfil) - {'todos', 'classes', 'enlaces', 'descricao'}
+    if desconhecidas:
+        raise PerfilInvalido(f"Perfil '{nome}': chave(s) desconhecida(s): {', '.join(sorted(desconhecidas))}.")
+    classes = perfil.get('classes', {})
+    if set(classes) - set(CLASSES):
+        raise PerfilInvalido(f"Perfil '{nome}': classes válidas são {', '.join(CLASSES)}.")
+    enlaces = {}
+    for chave, parametros in perfil.get('enlaces', {}).items():
+        pontas = chave.split('-')
+        if len(pontas) != 2 or not all(pontas):
+            raise PerfilInvalido(f"Perfil '{nome}': enlace '{chave}' deve ter a forma 'no1-no2'.")
+        enlaces[frozenset(pontas)] = normalizar_parametros(parametros, f"Perfil '{nome}', enlace '{chave}'")
+    return {
+        'descricao': perfil.get('descricao', ''),
+        'todos': normalizar_parametros(perfil.get('todos', {}), f"Perfil '{nome}', todos"),
+        'classes': {classe: normalizar_parametros(p, f"Perfil '{nome}', classe '{classe}'")
+                    for classe, p in classes.items()},
+        'enlaces': enlaces,
+    }
+
+
+def carregar_perfis(caminho=PERFIS_PADRAO):
+    """Lê o arquivo de perfis; retorna (perfis validados, nome do perfil padrão ou None)."""
+    try:
+        with open(caminho) as f:
+            dados = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise PerfilInvalido(f"Não foi possível ler '{caminho}': {e}") from None
+    if not isinstance(dados, dict) or not isinstance(dados.get('perfis'), dict) or not dados['perfis']:
+        raise PerfilInvalido(f"'{caminho}' deve ter um objeto 'perfis' não vazio.")
+    perfis = {nome: validar_perfil(nome, perfil) for nome, perfil in dados['perfis'].items()}
+    padrao = dados.get('padrao')
+    if padrao is not None and padrao not in perfis:
+        raise PerfilInvalido(f"Perfil padrão '{padrao}' não está em 'perfis'.")
+    return perfis, padrao
+
+
+def classe_do_enlace(link, switches, gateway='r1'):
+    nos = {link.intf1.node.name, link.intf2.node.name}
+    if gateway in nos:
+        return 'uplink'
+    if nos <= switches:
+        return 'tronco'
+    return 'acesso'
+
+
+def parametros_do_enlace(perfil, link, switches, gateway='r1'):
+    parametros = dict(perfil['todos'])
+    parametros.update(perfil['classes'].get(classe_do_enlace(link, switches, gateway), {}))
+    parametros.update(perfil['enlaces'].get(frozenset((link.intf1.node.name, link.intf2.node.name)), {}))
+    return parametros
+
+
+def _configurar_intf(intf, parametros):
+    if parametros:
+        # TCIntf.config remove a qdisc anterior antes de montar a nova
+        intf.config(**parametros)
+    else:
+        intf.tc('%s qdisc del dev %s root')
+
+
+class PerfisEnlace:
+    """Perfis carregados de um arquivo e aplicados à rede em execução."""
+
+    def __init__(self, net, caminho=PERFIS_PADRAO, gateway='r1', trabalhadores=32):
+        self.net = net
+        self.gateway = gateway
+        self.trabalhadores = trabalhadores
+        self.atual = None
+        # nome da interface -> parâmetros aplicados ({} = padrão do kernel)
+        self.aplicados = {}
+        self.carregar(caminho)
+
+    def carregar(self, caminho):
+        self.perfis, self.padrao = carregar_perfis(caminho)
+        self.caminho = caminho
+        if self.atual not in self.perfis:
+            # As interfaces mantêm os parâmetros aplicados (``aplicados``), mas
+            # eles não correspondem mais a nenhum perfil do arquivo novo
+            self.atual = None
+
+    def aplicar(self, nome):
+        """Aplica o perfil ``nome``; retorna (interfaces reconfiguradas, segundos)."""
+        if nome not in self.perfis:
+            raise PerfilInvalido(f"Perfil '{nome}' não existe em '{self.caminho}'.")
+        perfil = self.perfis[nome]
+        switches = {sw.name for sw in self.net.switches}
+        por_no = {}
+        for link in self.net.links:
+            parametros = parametros_do_enlace(perfil, link, switches, self.gateway)
+            for intf in (link.intf1, link.intf2):
+                if not hasattr(intf, 'tc'):
+                    continue  # interface sem suporte a tc (Link comum)
+                if self.aplicados.get(intf.name, {}) != parametros:
+                    por_no.setdefault(intf.node, []).append((intf, parametros))
+
+        def configurar_no(itens):
+            for intf, parametros in itens:
+                _configurar_intf(intf, parametros)
+                self.aplicados[intf.name] = parametros
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.trabalhadores) as executor:
+            list(executor.map(configurar_no, por_no.values()))
+        self.atual = nome
+        return sum(len(itens) for itens in por_no.values()), time.perf_counter() - inicio
+
+    def resumo(self, nome=None):
+        nome = nome or self.atual
+        perfil = self.perfis[nome]
+        linhas = [f"Perfil '{nome}'" + (f": {perfil['descricao']}" if perfil['descricao'] else '')]
+        if perfil['todos']:
+            linhas.append(f"  todos:   {_formatar(perfil['todos'])}")
+        for classe in CLASSES:
+            if classe in perfil['classes']:
+                linhas.append(f"  {classe + ':':<8} {_formatar(perfil['classes'][classe])}")
+        for pontas, parametros in perfil['enlaces'].items():
+            linhas.append(f"  {'-'.join(sorted(pontas))}: {_formatar(parametros)}")
+        if len(linhas) == 1:
+            linhas.append('  sem limitação (padrão do kernel)')
+        return '\n'.join(linhas)
+
+
+def _formatar(parametros):
+    unidades = {'bw': ' Mbit/s', 'loss': '%', 'max_queue_size': ' pkts'}
+    return ', '.join(f'{campo}={valor}{unidades.get(campo, "")}' for campo, valor in parametros.items()) or '-'
+
+
+def comando_perfil(perfis, args):
+    """Implementação do comando ``perfil`` da CLI: lista, carrega ou aplica perfis."""
+    partes = args.split()
+    try:
+        if not partes:
+            info(f"\nPerfis em '{perfis.caminho}' (atual: {perfis.atual or 'nenhum'}):\n")
+            for nome in perfis.perfis:
+                info(('* ' if nome == perfis.atual else '  ') + perfis.resumo(nome) + '\n')
+        elif partes[0] == 'carregar':
+            perfis.carregar(partes[1] if len(partes) > 1 else perfis.caminho)
+            info(f"✅ {len(perfis.perfis)} perfil(is) carregado(s) de '{perfis.caminho}'.\n")
+        else:
+            alteradas, duracao = perfis.aplicar(partes[0])
+            info(f"✅ {perfis.resumo()}\n   {alteradas} interface(s) reconfigurada(s) em {duracao * 1000:.0f} ms.\n")
+    except PerfilInvalido as e:
+        error(f"❌ {e}\n")
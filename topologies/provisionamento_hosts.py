@@ -0,0 +1,223 @@
+"""Provisionamento de hosts em lote na topologia em execução.
+
+O ``addnode`` de topologia_gateway.py criava um host por chamada com
+``net.addHost``/``net.addLink``, mas não ligava a nova interface ao OVS já
+em execução: o host ficava sem conectividade. ``provisionar_hosts`` adiciona
+N hosts de uma vez a partir de uma especificação (padrão de nome, sub-rede,
+switch):
+
+- os IPs livres da sub-rede são alocados em ordem, pulando os já usados por
+  outros hosts e pelo gateway; o gateway (rota padrão) é o IP do r1 naquela
+  sub-rede, como no plano do r1;
+- os shells (namespaces) dos hosts são criados em paralelo;
+- todos os pares veth são criados em um único ``ip -batch``;
+- as portas entram no switch em execução em um único ``ovs-vsctl``, com
+  ``ofport_request`` igual à porta que o Mininet atribuiu;
+- IP, MAC e rota padrão são configurados em paralelo, um host por thread.
+
+O tempo de cada fase e o de cada host (criação e configuração) são relatados.
+"""
+import ipaddress
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mininet.log import info, error
+
+from topologia_parametrica import LinkLote, executar_ip_batch, mac_de_ip
+
+
+class EspecificacaoInvalida(ValueError):
+    pass
+
+
+def gateway_da_sub_rede(net, rede, gateway='r1'):
+    """IP do gateway na sub-rede (interface do r1 nela) ou, sem r1, o último endereço útil."""
+    rede = ipaddress.ip_network(rede)
+    if gateway in net:
+        for intf in net.get(gateway).intfList():
+            if intf.IP() and ipaddress.ip_address(intf.IP()) in rede:
+                return intf.IP()
+    return str(rede.broadcast_address - 1)
+
+
+def _ips_em_uso(net):
+    usados = set()
+    for no in net.hosts:
+        for intf in no.intfList():
+            if intf.IP():
+                usados.add(intf.IP())
+    return usados
+
+
+def alocar_ips(net, rede, quantidade, gateway_ip):
+    rede = ipaddress.ip_network(rede)
+    usados = _ips_em_uso(net) | {gateway_ip}
+    livres = []
+    for ip in rede.hosts():
+        if str(ip) not in usados:
+            livres.append(str(ip))
+            if len(livres) == quantidade:
+                return livres
+    raise EspecificacaoInvalida(f"{rede} só tem {len(livres)} endereço(s) livre(s); pedidos {quantidade}.")
+
+
+def nomes_hosts(net, padrao, quantidade, inicio=None):
+    """Gera ``quantidade`` nomes livres a partir de ``padrao`` (ex.: 'h{}' -> h14, h15, ...)."""
+    if '{}' not in padrao:
+        raise EspecificacaoInvalida(f"O padrão de nome precisa conter '{{}}': {padrao!r}")
+    n = inicio if inicio is not None else 1
+    nomes = []
+    while len(nomes) < quantidade:
+        nome = padrao.format(n)
+        if nome not in net:
+            nomes.append(nome)
+        n += 1
+    return nomes
+
+
+class ProvisionamentoHosts:
+    """Resultado de um lote: hosts criados e tempos por fase e por host."""
+
+    def __init__(self):
+        self.hosts = []
+        self.fases = []
+        # nome -> {'ip', 'criacao', 'configuracao'} em segundos
+        self.tempos = {}
+
+    def fase(self, nome, inicio):
+        self.fases.append((nome, time.perf_counter() - inicio))
+
+    def relatorio(self, detalhado=False):
+        total = sum(d for _, d in self.fases)
+        linhas = [f'\n=== \033[94mProvisionamento de {len(self.hosts)} host(s)\033[0m ===']
+        linhas += [f'  {nome:<28} {duracao:7.3f}s' for nome, duracao in self.fases]
+        linhas.append(f'  {"total":<28} {total:7.3f}s ({total / max(1, len(self.hosts)) * 1000:.1f} ms/host)')
+        por_host = sorted(self.tempos.items(), key=lambda item: item[1]['criacao'] + item[1]['configuracao'],
+                          reverse=True)
+        linhas.append(f'  {"host":<10} {"IP":<16} {"criação":>9} {"config.":>9}')
+        for nome, t in (por_host if detalhado else por_host[:5]):
+            linhas.append(f'  {nome:<10} {t["ip"]:<16} {t["criacao"] * 1000:7.1f}ms {t["configuracao"] * 1000:7.1f}ms')
+        if not detalhado and len(por_host) > 5:
+            linhas.append(f'  ... (os 5 mais lentos de {len(por_host)})')
+        info('\n'.join(linhas) + '\n')
+
+
+def _anexar_ao_switch(switch, portas):
+    """Adiciona as interfaces ao bridge OVS em um único ovs-vsctl."""
+    comando = ['ovs-vsctl']
+    for intf, porta in portas:
+        comando += ['--', 'add-port', switch.name, intf, '--', 'set', 'Interface', intf, f'ofport_request={porta}']
+    resultado = subprocess.run(comando, capture_output=True, text=True)
+    if resultado.returncode != 0:
+        raise RuntimeError(f"ovs-vsctl falhou: {resultado.stderr.strip()}")
+
+
+def provisionar_hosts(net, quantidade, rede, switch, padrao='h{}', inicio=None, nomes=None, ips=None,
+                      trabalhadores=32):
+    """Cria, conecta ao switch em execução e configura ``quantidade`` hosts na sub-rede ``rede``.
+
+    ``nomes``/``ips`` fixam nomes e endereços em vez de gerá-los pelo padrão e
+    pela alocação sequencial.
+    """
+    if quantidade < 1:
+        raise EspecificacaoInvalida("A quantidade de hosts deve ser positiva.")
+    if switch not in net:
+        raise EspecificacaoInvalida(f"Switch '{switch}' não encontrado na rede.")
+    switch = net.get(switch)
+    rede = ipaddress.ip_network(rede, strict=False)
+    gateway_ip = gateway_da_sub_rede(net, rede)
+    if nomes is None:
+        nomes = nomes_hosts(net, padrao, quantidade, inicio)
+    elif len(nomes) != quantidade or any(nome in net for nome in nomes):
+        raise EspecificacaoInvalida(f"Nomes inválidos ou já existentes na rede: {', '.join(nomes)}")
+    if ips is None:
+        ips = alocar_ips(net, rede, quantidade, gateway_ip)
+    else:
+        em_uso = _ips_em_uso(net) | {gateway_ip}
+        for ip in ips:
+            if ipaddress.ip_address(ip) not in rede or ip in em_uso:
+                raise EspecificacaoInvalida(f"IP {ip} fora de {rede} ou já em uso.")
+        if len(ips) != quantidade:
+            raise EspecificacaoInvalida("A quantidade de IPs não corresponde à de hosts.")
+    resultado = ProvisionamentoHosts()
+
+    def criar(par):
+        nome, ip = par
+        t0 = time.perf_counter()
+        host = net.host(nome, ip=f'{ip}/{rede.prefixlen}', mac=mac_de_ip(ip), defaultRoute=f'via {gateway_ip}')
+        resultado.tempos[nome] = {'ip': ip, 'criacao': time.perf_counter() - t0, 'configuracao': 0.0}
+        return host
+
+    inicio_fase = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        hosts = list(executor.map(criar, zip(nomes, ips)))
+    for host in hosts:
+        net.hosts.append(host)
+        net.nameToNode[host.name] = host
+    resultado.hosts = hosts
+    resultado.fase('namespaces (paralelo)', inicio_fase)
+
+    inicio_fase = time.perf_counter()
+    enlaces, comandos, portas = [], [], []
+    # newPort() só avança quando a interface é registrada: numera o lote a partir dela
+    primeira_porta = switch.newPort()
+    for porta, host in enumerate(hosts, primeira_porta):
+        params = {'port1': 0, 'port2': porta, 'intfName1': f'{host.name}-eth0',
+                  'intfName2': f'{switch.name}-eth{porta}', 'addr1': host.params['mac'], 'addr2': net.randMac()}
+        comandos.append(f"link add name {params['intfName1']} address {params['addr1']} netns {host.pid} "
+                        f"type veth peer name {params['intfName2']} address {params['addr2']} netns {switch.pid}")
+        enlaces.append((host, params))
+        portas.append((params['intfName2'], porta))
+    executar_ip_batch(comandos)
+    for host, params in enlaces:
+        net.links.append(LinkLote(host, switch, **params))
+    executar_ip_batch([f'link set {intf} up' for intf, _ in portas])
+    resultado.fase('pares veth (ip -batch)', inicio_fase)
+
+    inicio_fase = time.perf_counter()
+    _anexar_ao_switch(switch, portas)
+    resultado.fase(f'portas no {switch.name} (ovs-vsctl)', inicio_fase)
+
+    def configurar(host):
+        t0 = time.perf_counter()
+        host.configDefault()
+        host.cmd(f'ip link set {host.defaultIntf()} up')
+        resultado.tempos[host.name]['configuracao'] = time.perf_counter() - t0
+
+    inicio_fase = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        list(executor.map(configurar, hosts))
+    resultado.fase('IP/MAC/rota (paralelo)', inicio_fase)
+    return resultado
+
+
+def interpretar_especificacao(args):
+    """``<quantidade> <sub-rede> <switch> [padrão] [início]`` -> kwargs de ``provisionar_hosts``."""
+    partes = args.split()
+    if len(partes) < 3:
+        raise EspecificacaoInvalida("Uso: addhosts <quantidade> <sub-rede> <switch> [padrão] [início]")
+    try:
+        especificacao = {'quantidade': int(partes[0]), 'rede': partes[1], 'switch': partes[2]}
+        if len(partes) > 3:
+            especificacao['padrao'] = partes[3]
+        if len(partes) > 4:
+            especificacao['inicio'] = int(partes[4])
+        ipaddress.ip_network(especificacao['rede'], strict=False)
+    except ValueError as e:
+        raise EspecificacaoInvalida(f"Especificação inválida: {e}") from None
+    return especificacao
+
+
+def comando_addhosts(net, args):
+    """Implementação do comando ``addhosts`` da CLI."""
+    detalhado = ' -v' in f' {args}'
+    args = ' '.join(p for p in args.split() if p != '-v')
+    try:
+        resultado = provisionar_hosts(net, **interpretar_especificacao(args))
+    except (EspecificacaoInvalida, RuntimeError) as e:
+        error(f"❌ {e}\n")
+        return None
+    resultado.relatorio(detalhado)
+    info(f"✅ {len(resultado.hosts)} host(s) adicionados: {resultado.hosts[0].name} .. {resultado.hosts[-1].name}\n")
+    return resultado
@@ -0,0 +1,125 @@
+"""Proxy ARP do controlador e cache de localização dos hosts.
+
+Aprende as associações IP -> MAC -> (dpid, porta) a partir dos pacotes ARP
+observados (pedidos, respostas e ARPs gratuitos) e permite que o controlador
+responda diretamente aos pedidos ARP com um PacketOut, em vez de inundá-los
+por todos os switches.
+
+Só pacotes ARP alimentam o cache: o IP de origem de um pacote IPv4 roteado
+pelo r1 chega com o MAC do gateway, e aprender a partir dele envenenaria as
+associações. Cada entrada expira após ``tempo_vida`` segundos sem ser vista e
+o cache é limitado a ``capacidade`` entradas (LRU). No modo shardeado cada
+worker mantém o seu próprio cache, aprendido do tráfego dos seus switches.
+"""
+import time
+from collections import OrderedDict
+
+
+class ProxyARP:
+    def __init__(self, capacidade=8192, tempo_vida=120, relogio=time.monotonic):
+        self.capacidade = capacidade
+        self.tempo_vida = tempo_vida
+        self.relogio = relogio
+        # ip -> [mac, dpid, porta, visto_em], do mais antigo ao mais recente
+        self._associacoes = OrderedDict()
+        # mac -> {ips}, para invalidar quando o MAC sai da tabela MAC
+        self._ips_por_mac = {}
+        self.respostas = 0
+        self.inundacoes = 0
+        self.conflitos = 0
+        self.expiracoes = 0
+
+    def aprender(self, ip, mac, dpid, porta):
+        if ip == '0.0.0.0':
+            # Sonda ARP (RFC 5227): o host ainda não tem endereço
+            return
+        entrada = self._associacoes.get(ip)
+        agora = self.relogio()
+        if entrada is not None:
+            self._associacoes.move_to_end(ip)
+            if entrada[0] == mac:
+                # Mantém a localização da primeira observação: o mesmo ARP
+                # inundado chega aos outros switches pelas portas de uplink
+                entrada[3] = agora
+                return
+            self.conflitos += 1
+            self._desassociar_mac(entrada[0], ip)
+            self._ips_por_mac.setdefault(mac, set()).add(ip)
+            entrada[:] = [mac, dpid, porta, agora]
+            return
+
+        while len(self._associacoes) >= self.capacidade:
+            ip_antigo, (mac_antigo, _, _, _) = self._associacoes.popitem(last=False)
+            self._desassociar_mac(mac_antigo, ip_antigo)
+        self._associacoes[ip] = [mac, dpid, porta, agora]
+        self._ips_por_mac.setdefault(mac, set()).add(ip)
+
+    def _desassociar_mac(self, mac, ip):
+        ips = self._ips_por_mac.get(mac)
+        if ips is not None:
+            ips.discard(ip)
+            if not ips:
+                del self._ips_por_mac[mac]
+
+    def _valida(self, entrada):
+        return not self.tempo_vida or self.relogio() - entrada[3] <= self.tempo_vida
+
+    def consultar(self, ip):
+        """Retorna o MAC associado a ``ip`` ou None se desconhecido/expirado."""
+        entrada = self._associacoes.get(ip)
+        if entrada is None or not self._valida(entrada):
+            return None
+        return entrada[0]
+
+    def localizar(self, ip):
+        """Retorna (mac, dpid, porta) do host com o IP informado, ou None."""
+        entrada = self._associacoes.get(ip)
+        if entrada is None or not self._valida(entrada):
+            return None
+        return entrada[0], entrada[1], entrada[2]
+
+    def invalidar_mac(self, mac, dpid=None):
+        """Remove as associações do MAC (ex.: expirado ou despejado da tabela MAC).
+
+        Com ``dpid``, só remove as associações localizadas nesse datapath.
+        """
+        for ip in list(self._ips_por_mac.get(mac, ())):
+            entrada = self._associacoes.get(ip)
+            if entrada is not None and (dpid is None or entrada[1] == dpid):
+                del self._associacoes[ip]
+                self._desassociar_mac(mac, ip)
+
+    def remover_datapath(self, dpid):
+        for ip in [ip for ip, e in self._associacoes.items() if e[1] == dpid]:
+            mac = self._associacoes.pop(ip)[0]
+            self._desassociar_mac(mac, ip)
+
+    def envelhecer(self):
+        """Remove as associações expiradas; retorna quantas foram removidas."""
+        if not self.tempo_vida:
+            return 0
+        limite = self.relogio() - self.tempo_vida
+        removidas = 0
+        while self._associacoes:
+            ip, (mac, _, _, visto_em) = next(iter(self._associacoes.items()))
+            if visto_em > limite:
+                break
+            del self._associacoes[ip]
+            self._desassociar_mac(mac, ip)
+            removidas += 1
+        self.expiracoes += removidas
+        return removidas
+
+    def __len__(self):
+        return len(self._associacoes)
+
+    def estatisticas(self):
+        return {
+            'associacoes': len(self._associacoes),
+            # Cada resposta do proxy evita uma inundação do pedido ARP e os
+            # PacketIns que ela geraria nos demais switches
+            'respostas_proxy': self.respostas,
+            'pedidos_inundados': self.inundacoes,
+            'conflitos': self.conflitos,
+            'expiracoes': self.expiracoes,
+        }
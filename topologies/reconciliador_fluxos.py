@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Daemon de reconciliação contínua dos fluxos gerenciados.
+
+Trata um arquivo de estado desejado como fonte da verdade e mantém os
+switches em conformidade com ele: a cada ``intervalo`` segundos consulta
+os fluxos gerenciados de cada switch (dump filtrado pelo cookie, ver
+gerenciar_fluxos.py) e aplica apenas o delta em um único ``ovs-ofctl
+--bundle add-flows`` por switch. Assim, fluxos apagados por um
+``del-flows``/reconexão do switch são restaurados sem reescrever o resto.
+
+O arquivo usa o esquema de flows.json (uma lista de regras) ou um objeto
+que o estende:
+
+    {
+      "switches": ["s1", "s2"],    # switches gerenciados mesmo sem regras
+      "intervalo": 5,              # período de verificação (s), opcional
+      "flows": [ {...}, ... ]      # regras no esquema de flows.json
+    }
+
+Mudanças no arquivo são detectadas pelo mtime e coalescidas: o arquivo só é
+recarregado depois de ficar ``debounce`` segundos sem alterações. Falhas em
+um switch (ex.: switch fora do ar) aplicam backoff exponencial só a ele.
+SIGHUP força a releitura do arquivo; SIGINT/SIGTERM encerram o daemon.
+
+Uso:
+    python3 reconciliador_fluxos.py flows.json --intervalo 5
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from gerenciar_fluxos import RegrasInvalidas, aplicar_lote, calcular_delta, carregar_regras, cookies_instalados
+
+
+def _log(mensagem):
+    print(f"[{time.strftime('%H:%M:%S')}] {mensagem}", flush=True)
+
+
+class Reconciliador:
+    def __init__(self, caminho, intervalo=5.0, debounce=1.0, backoff_max=60.0,
+                 bundle=True, relogio=time.monotonic, dormir=time.sleep):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.debounce = debounce
+        self.backoff_max = backoff_max
+        self.bundle = bundle
+        self.relogio = relogio
+        self.dormir = dormir
+
+        self.desejado = {}
+        self._mtime = None
+        self._mtime_pendente = None
+        self._mudou_em = None
+        self._recarregar = True
+        self._executando = True
+        # switch -> (falhas consecutivas, próximo instante permitido)
+        self._backoff = {}
+        self.ciclos = 0
+        self.correcoes = 0
+
+    def carregar(self):
+        """Relê o arquivo de estado desejado; mantém o estado anterior se for inválido."""
+        try:
+            mtime = os.stat(self.caminho).st_mtime_ns
+            with open(self.caminho) as f:
+                conteudo = json.load(f)
+            desejado = carregar_regras(self.caminho)
+            intervalo = self.intervalo
+            if isinstance(conteudo, dict):
+                switches = conteudo.get('switches', [])
+                if not isinstance(switches, list) or not all(isinstance(s, str) and s for s in switches):
+                    raise RegrasInvalidas("'switches' deve ser uma lista de nomes de switches.")
+                for switch in switches:
+                    desejado.setdefault(switch, {})
+                if 'intervalo' in conteudo:
+                    intervalo = conteudo['intervalo']
+                    if isinstance(intervalo, bool) or not isinstance(intervalo, (int, float)) or intervalo <= 0:
+                        raise RegrasInvalidas(f"'intervalo' deve ser um número positivo, não {intervalo!r}.")
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            _log(f"❌ Arquivo '{self.caminho}' inválido, mantendo o estado anterior: {e}")
+            return False
+
+        self.intervalo = float(intervalo)
+        # Switches removidos do arquivo continuam sendo reconciliados (para vazio)
+        for switch in self.desejado:
+            desejado.setdefault(switch, {})
+        self.desejado = desejado
+        self._mtime = mtime
+        self._mtime_pendente = None
+        # Força a verificação imediata de todos os switches
+        self._backoff.clear()
+        total = sum(len(r) for r in desejado.values())
+        _log(f"📄 Estado desejado carregado: {total} regras em {len(desejado)} switch(es)")
+        return True
+
+    def _verificar_arquivo(self):
+        """Detecta mudanças no arquivo e só recarrega após o período de debounce."""
+        try:
+            mtime = os.stat(self.caminho).st_mtime_ns
+        except OSError:
+            return False
+        agora = self.relogio()
+        if mtime != self._mtime and mtime != self._mtime_pendente:
+            # Nova alteração: reinicia a janela de debounce (coalesce rajadas de escrita)
+            self._mtime_pendente = mtime
+            self._mudou_em = agora
+        if self._mtime_pendente is not None and agora - self._mudou_em >= self.debounce:
+            self._mtime = self._mtime_pendente
+            self._mtime_pendente = None
+            return True
+        return False
+
+    def reconciliar_switch(self, switch, regras):
+        """Aplica o delta de um switch; retorna o número de correções ou None em falha."""
+        agora = self.relogio()
+        falhas, proximo = self._backoff.get(switch, (0, 0.0))
+        if agora < proximo:
+            return None
+        try:
+            adicoes, remocoes = calcular_delta(regras, cookies_instalados(switch))
+            aplicar_lote(switch, adicoes, remocoes, self.bundle)
+        except (subprocess.CalledProcessError, OSError) as e:
+            falhas += 1
+            espera = min(self.backoff_max, self.intervalo * (2 ** (falhas - 1)))
+            self._backoff[switch] = (falhas, agora + espera)
+            detalhe = getattr(e, 'stderr', None) or e
+            _log(f"⚠️  {switch}: falha ao reconciliar ({str(detalhe).strip()}); nova tentativa em {espera:.0f}s")
+            return None
+
+        self._backoff.pop(switch, None)
+        if adicoes or remocoes:
+            _log(f"🔧 {switch}: +{len(adicoes)} adicionadas, -{len(remocoes)} removidas")
+        return len(adicoes) + len(remocoes)
+
+    def ciclo(self):
+        self.ciclos += 1
+        for switch, regras in sorted(self.desejado.items()):
+            corrigidas = self.reconciliar_switch(switch, regras)
+            if corrigidas:
+                self.correcoes += corrigidas
+
+    def parar(self, *_):
+        self._executando = False
+
+    def solicitar_recarga(self, *_):
+        self._recarregar = True
+
+    def executar(self):
+        _log(f"🟢 Reconciliador iniciado: '{self.caminho}', intervalo {self.intervalo}s")
+        proximo_ciclo = 0.0
+        while self._executando:
+            if self._verificar_arquivo() or self._recarregar:
+                self._recarregar = False
+                if self.carregar():
+                    proximo_ciclo = 0.0
+            agora = self.relogio()
+            if agora >= proximo_ciclo:
+                self.ciclo()
+                proximo_ciclo = agora + self.intervalo
+            # Acorda com frequência suficiente para perceber mudanças no arquivo
+            self.dormir(min(self.intervalo, max(0.1, self.debounce / 2)))
+        _log(f"🔻 Reconciliador encerrado após {self.ciclos} ciclos e {self.correcoes} correções.")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Mantém os switches em conformidade com um arquivo de fluxos.")
+    ap.add_argument('arquivo', nargs='?', default='flows.json')
+    ap.add_argument('--intervalo', type=float, default=5.0,
+                    help="Período (s) de verificação dos switches")
+    ap.add_argument('--debounce', type=float, default=1.0,
+                    help="Tempo (s) sem alterações no arquivo antes de recarregá-lo")
+    ap.add_argument('--backoff-max', type=float, default=60.0)
+    ap.add_argument('--sem-bundle', action='store_true')
+    args = ap.parse_args()
+
+    reconciliador = Reconciliador(args.arquivo, args.intervalo, args.debounce,
+                                  args.backoff_max, not args.sem_bundle)
+    signal.signal(signal.SIGINT, reconciliador.parar)
+    signal.signal(signal.SIGTERM, reconciliador.parar)
+    signal.signal(signal.SIGHUP, reconciliador.solicitar_recarga)
+    reconciliador.executar()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Modo shardeado do controlador: vários processos ryu-manager, um por worker.
+
+Cada worker é uma instância completa do MeuSwitch13 (controlador_shard.py,
+com o proxy ARP desligado) escutando em uma porta OpenFlow própria. Os
+switches são distribuídos entre os workers por hash consistente do dpid, e
+cada switch é apontado para o seu worker com ``ovs-vsctl set-controller``.
+Como todo o estado aprendido do app (tabela MAC, cache de fluxos, baldes do
+limitador) é indexado por dpid, a partição por switch é exata: o
+comportamento de encaminhamento é o mesmo do processo único, e os PacketIns
+passam a ser tratados em paralelo, um núcleo por worker, sem IPC no caminho
+crítico. O proxy ARP fica desligado porque o seu cache é compartilhado entre
+os switches: um worker inundaria pedidos que o processo único responderia.
+Adicionar ou remover um worker só remapeia ~1/N dos switches.
+
+Uso:
+    python3 sharding_controlador.py --workers 4 --switches s1 s2
+"""
+import argparse
+import hashlib
+import os
+import signal
+import subprocess
+import sys
+import time
+from bisect import bisect
+
+APP_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'controlador_shard.py')
+
+
+def _hash(chave):
+    return int.from_bytes(hashlib.md5(str(chave).encode()).digest()[:8], 'big')
+
+
+class AnelConsistente:
+    """Anel de hash consistente com nós virtuais: dpid -> índice do worker."""
+
+    def __init__(self, workers, replicas=128):
+        if workers < 1:
+            raise ValueError("É necessário pelo menos 1 worker.")
+        self.workers = workers
+        pontos = sorted((_hash(f'worker-{w}-{r}'), w)
+                        for w in range(workers) for r in range(replicas))
+        self._chaves = [p for p, _ in pontos]
+        self._donos = [w for _, w in pontos]
+
+    def worker_de(self, dpid):
+        i = bisect(self._chaves, _hash(f'dpid-{int(dpid)}')) % len(self._chaves)
+        return self._donos[i]
+
+    def distribuir(self, dpids):
+        """Retorna {worker: [dpids]} para a lista de dpids informada."""
+        particao = {w: [] for w in range(self.workers)}
+        for dpid in dpids:
+            particao[self.worker_de(dpid)].append(dpid)
+        return particao
+
+
+def iniciar_workers(n, porta_of_base=6653, porta_wsapi_base=8080, app=APP_PADRAO, dir_log='/tmp'):
+    """Inicia ``n`` processos ryu-manager; retorna a lista de Popen (encerrar com ``parar_workers``)."""
+    processos = []
+    for i in range(n):
+        log = open(os.path.join(dir_log, f'ryu_shard{i}.log'), 'w')
+        cmd = ['ryu-manager', '--ofp-tcp-listen-port', str(porta_of_base + i),
+               '--wsapi-port', str(porta_wsapi_base + i), app]
+        processo = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, cwd=os.path.dirname(app))
+        processo.log = log
+        processos.append(processo)
+        print(f"🟢 Worker {i}: ryu-manager na porta OpenFlow {porta_of_base + i} "
+              f"(métricas em :{porta_wsapi_base + i}/metrics, log {log.name})")
+    return processos
+
+
+def parar_workers(processos):
+    """Encerra os workers (SIGTERM), espera cada um e fecha os arquivos de log."""
+    for p in processos:
+        if p.poll() is None:
+            p.send_signal(signal.SIGTERM)
+    for p in processos:
+        p.wait()
+        p.log.close()
+
+
+def dpid_do_switch(switch):
+    """Lê o datapath_id de uma bridge OVS (ex.: s1) como inteiro."""
+    saida = subprocess.run(['sudo', 'ovs-vsctl', 'get', 'Bridge', switch, 'datapath_id'],
+                           check=True, capture_output=True, text=True).stdout
+    return int(saida.strip().strip('"'), 16)
+
+
+def atribuir_switches(switches, anel, ip='127.0.0.1', porta_of_base=6653):
+    """Aponta cada switch OVS para o worker que o anel associa ao seu dpid."""
+    atribuicao = {}
+    for switch in switches:
+        worker = anel.worker_de(dpid_do_switch(switch))
+        alvo = f'tcp:{ip}:{porta_of_base + worker}'
+        subprocess.run(['sudo', 'ovs-vsctl', 'set-controller', switch, alvo],
+                       check=True, capture_output=True, text=True)
+        atribuicao[switch] = worker
+        print(f"🔀 {switch} -> worker {worker} ({alvo})")
+    return atribuicao
+
+
+def atribuir_switches_mininet(net, anel, ip='127.0.0.1', porta_of_base=6653):
+    """Mesmo que atribuir_switches, para os switches de uma rede Mininet ativa."""
+    atribuicao = {}
+    for sw in net.switches:
+        worker = anel.worker_de(int(sw.dpid, 16))
+        sw.cmd(f'ovs-vsctl set-controller {sw.name} tcp:{ip}:{porta_of_base + worker}')
+        atribuicao[sw.name] = worker
+    return atribuicao
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Executa o MeuSwitch13 shardeado por dpid.")
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('--switches', nargs='*', default=[],
+                    help="Bridges OVS a redistribuir entre os workers (ex: s1 s2)")
+    ap.add_argument('--ip', default='127.0.0.1')
+    ap.add_argument('--porta-base', type=int, default=6653)
+    ap.add_argument('--wsapi-base', type=int, default=8080)
+    ap.add_argument('--app', default=APP_PADRAO)
+    args = ap.parse_args()
+
+    anel = AnelConsistente(args.workers)
+    processos = iniciar_workers(args.workers, args.porta_base, args.wsapi_base, args.app)
+    try:
+        time.sleep(3)
+        mortos = [i for i, p in enumerate(processos) if p.poll() is not None]
+        if mortos:
+            print(f"ERRO: worker(s) {mortos} não iniciaram. Verifique /tmp/ryu_shard*.log")
+            return 1
+        if args.switches:
+            atribuir_switches(args.switches, anel, args.ip, args.porta_base)
+        print("Controlador shardeado em execução. Ctrl+C para encerrar.")
+        while all(p.poll() is None for p in processos):
+            time.sleep(1)
+        print("ERRO: um dos workers terminou inesperadamente.")
+        return 1
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        parar_workers(processos)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
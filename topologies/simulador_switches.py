@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""Simulador de switches OpenFlow 1.3 para teste de carga do controlador (estilo cbench).
+
+Abre uma sessão TCP por switch simulado com o controlador (ex.: ryu-manager
+Ryu_controlador.py em 127.0.0.1:6653) e fala o protocolo no nível do fio,
+com ``struct`` e ``asyncio``, sem Mininet/OVS nem o Ryu:
+
+- handshake: HELLO, FEATURES_REPLY, GET_CONFIG_REPLY, BARRIER_REPLY,
+  ROLE_REPLY e as respostas multipart de DESC, PORT_DESC, PORT_STATS e FLOW
+  (vazia); ECHO_REQUEST é respondido com o mesmo payload;
+- tráfego: PacketIns com ``in_port`` e quadro Ethernet de ``--macs`` MACs
+  por switch (cada MAC sempre atrás da mesma porta, para o controlador
+  aprender), a ``--taxa`` PacketIns/s por switch e com no máximo
+  ``--janela`` PacketIns sem resposta por switch. ``--janela 1 --taxa 0``
+  equivale ao modo de latência do cbench; ``--taxa 0`` com janela maior, ao
+  modo de vazão.
+
+Cada PacketIn leva um ``buffer_id`` único. O MeuSwitch13 devolve esse
+``buffer_id`` no FlowMod (destino conhecido) ou no PacketOut (inundação), o
+que dá a latência PacketIn -> resposta de ponta a ponta. A carga é repetida
+para cada quantidade de switches em ``--switches`` (ex.: 1 10 100 1000),
+com novas conexões e dpids, e cada etapa relata o tempo de handshake, a
+vazão sustentada e os percentis de latência.
+
+O MeuSwitch13 tem controle de tempestade (1000 PacketIns/s por datapath por
+padrão): acima disso os excedentes ficam sem resposta e aparecem como
+perdidos. Desative LIMITE_ATIVO para medir a capacidade bruta.
+
+Uso:
+    python3 simulador_switches.py --switches 1 10 100 1000 --duracao 10
+    python3 simulador_switches.py --switches 16 --janela 1 --taxa 0   # latência
+"""
+import argparse
+import asyncio
+import csv
+import random
+import resource
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+
+OFP_VERSAO = 0x04
+
+OFPT_HELLO = 0
+OFPT_ERROR = 1
+OFPT_ECHO_REQUEST = 2
+OFPT_ECHO_REPLY = 3
+OFPT_FEATURES_REQUEST = 5
+OFPT_FEATURES_REPLY = 6
+OFPT_GET_CONFIG_REQUEST = 7
+OFPT_GET_CONFIG_REPLY = 8
+OFPT_PACKET_IN = 10
+OFPT_PACKET_OUT = 13
+OFPT_FLOW_MOD = 14
+OFPT_MULTIPART_REQUEST = 18
+OFPT_MULTIPART_REPLY = 19
+OFPT_BARRIER_REQUEST = 20
+OFPT_BARRIER_REPLY = 21
+OFPT_ROLE_REQUEST = 24
+OFPT_ROLE_REPLY = 25
+
+OFPMP_DESC = 0
+OFPMP_FLOW = 1
+OFPMP_PORT_STATS = 4
+OFPMP_PORT_DESC = 13
+
+OFPET_BAD_REQUEST = 1
+OFPBRC_BAD_MULTIPART = 2
+OFP_NO_BUFFER = 0xffffffff
+OFPP_ANY = 0xffffffff
+
+_CABECALHO = struct.Struct('!BBHI')
+_HELLO = struct.Struct('!BBHIHHI')  # cabeçalho + elemento VERSIONBITMAP
+_FEATURES_REPLY = struct.Struct('!BBHIQIBB2xII')
+_GET_CONFIG_REPLY = struct.Struct('!BBHIHH')
+_ERRO = struct.Struct('!BBHIHH')
+_MULTIPART = struct.Struct('!BBHIHH4x')
+_DESC = struct.Struct('!256s256s256s32s256s')
+_PORTA = struct.Struct('!I4x6s2x16sIIIIIIII')
+_ESTATISTICAS_PORTA = struct.Struct('!I4x12QII')
+# cabeçalho, buffer_id, total_len, reason, table_id, cookie, match OXM só com in_port, pad
+_PACKET_IN = struct.Struct('!BBHIIHBBQHHII4x2x')
+_OXM_IN_PORT = 0x80000004
+_BUFFER_ID_FLOW_MOD = 32  # deslocamento do buffer_id no FlowMod
+_BUFFER_ID_PACKET_OUT = 8
+
+_PAYLOAD = bytes(46)
+PERIODO = 0.01
+
+
+def _mac(n):
+    return struct.pack('!HI', 0x0200, n)
+
+
+@lru_cache(maxsize=None)
+def _tabela_macs(quantidade):
+    # Compartilhada por todos os switches: milhares de sessões sem uma cópia cada
+    return tuple(_mac(n) for n in range(quantidade))
+
+
+class Etapa:
+    """Contadores de uma etapa (uma quantidade de switches)."""
+
+    def __init__(self, switches):
+        self.switches = switches
+        self.conectados = 0
+        self.falhas_conexao = 0
+        self.handshakes = array('d')
+        self.medindo = False
+        self.inicio_medicao = 0.0
+        self.fim_medicao = 0.0
+        self.enviados = 0
+        self.respostas = 0
+        self.flow_mods = 0
+        self.packet_outs = 0
+        self.perdidos = 0
+        self.erros = 0
+        self.latencias = array('d')
+
+    def iniciar_medicao(self):
+        self.medindo = True
+        self.inicio_medicao = time.perf_counter()
+        self.enviados = self.respostas = self.flow_mods = self.packet_outs = 0
+        self.perdidos = self.erros = 0
+        del self.latencias[:]
+
+    def encerrar_medicao(self):
+        self.medindo = False
+        self.fim_medicao = time.perf_counter()
+
+    def resumo(self):
+        duracao = max(self.fim_medicao - self.inicio_medicao, 1e-9)
+        latencias = sorted(self.latencias)
+        handshakes = sorted(self.handshakes)
+        return {
+            'switches': self.switches,
+            'conectados': self.conectados,
+            'handshake_p50_ms': percentil(handshakes, 50) * 1000,
+            'handshake_p99_ms': percentil(handshakes, 99) * 1000,
+            'packet_in_s': self.enviados / duracao,
+            'respostas_s': self.respostas / duracao,
+            'flow_mod_s': self.flow_mods / duracao,
+            'perdidos': self.perdidos,
+            'erros': self.erros,
+            'latencia_p50_ms': percentil(latencias, 50) * 1000,
+            'latencia_p90_ms': percentil(latencias, 90) * 1000,
+            'latencia_p99_ms': percentil(latencias, 99) * 1000,
+        }
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(p / 100.0 * len(ordenados)))]
+
+
+class SwitchSimulado(asyncio.Protocol):
+    def __init__(self, dpid, etapa, portas=16, macs=1000, janela=64, taxa=0.0, timeout=1.0, semente=0):
+        self.dpid = dpid
+        self.etapa = etapa
+        self.portas = portas
+        self.macs = _tabela_macs(macs)
+        self.janela = janela
+        self.taxa = taxa
+        self.timeout = timeout
+        self.rnd = random.Random(semente)
+        self.transporte = None
+        self.buffer = bytearray()
+        self.xid = 0
+        self.proximo_buffer = 0
+        self.credito = 0.0
+        # buffer_id -> instante de envio, em ordem de envio
+        self.pendentes = OrderedDict()
+        self.enviados_porta = [0] * (portas + 1)
+        self.octetos_porta = [0] * (portas + 1)
+        self.inicio = time.perf_counter()
+        self.pronto = asyncio.get_running_loop().create_future()
+        self.fechado = False
+        self.tratadores = {
+            OFPT_HELLO: self._hello,
+            OFPT_ERROR: self._erro,
+            OFPT_ECHO_REQUEST: self._echo,
+            OFPT_FEATURES_REQUEST: self._features,
+            OFPT_GET_CONFIG_REQUEST: self._get_config,
+            OFPT_MULTIPART_REQUEST: self._multipart,
+            OFPT_BARRIER_REQUEST: self._barrier,
+            OFPT_ROLE_REQUEST: self._role,
+            OFPT_FLOW_MOD: self._flow_mod,
+            OFPT_PACKET_OUT: self._packet_out,
+        }
+
+    # --- Conexão ---
+    def connection_made(self, transporte):
+        self.transporte = transporte
+        self.transporte.write(_HELLO.pack(OFP_VERSAO, OFPT_HELLO, _HELLO.size, self._novo_xid(),
+                                          1, 8, 1 << OFP_VERSAO))
+
+    def connection_lost(self, exc):
+        self.fechado = True
+        if not self.pronto.done():
+            self.pronto.set_exception(ConnectionError(exc or "conexão encerrada pelo controlador"))
+
+    def fechar(self):
+        if self.transporte is not None:
+            self.transporte.close()
+
+    def _novo_xid(self):
+        self.xid = (self.xid + 1) & 0xffffffff
+        return self.xid
+
+    def _marcar_pronto(self):
+        if not self.pronto.done():
+            self.etapa.handshakes.append(time.perf_counter() - self.inicio)
+            self.pronto.set_result(self)
+
+    def data_received(self, dados):
+        buffer = self.buffer
+        buffer += dados
+        pos = 0
+        while len(buffer) - pos >= _CABECALHO.size:
+            _, tipo, tamanho, xid = _CABECALHO.unpack_from(buffer, pos)
+            if tamanho < _CABECALHO.size:
+                self.fechar()
+                return
+            if len(buffer) - pos < tamanho:
+                break
+            tratador = self.tratadores.get(tipo)
+            if tratador is not None:
+                tratador(xid, bytes(buffer[pos:pos + tamanho]))
+            pos += tamanho
+        del buffer[:pos]
+
+    # --- Handshake e mensagens de controle ---
+    def _hello(self, xid, msg):
+        pass
+
+    def _erro(self, xid, msg):
+        self.etapa.erros += 1
+
+    def _echo(self, xid, msg):
+        self.transporte.write(struct.pack('!BBHI', OFP_VERSAO, OFPT_ECHO_REPLY, len(msg), xid) + bytes(msg[8:]))
+
+    def _features(self, xid, msg):
+        self.transporte.write(_FEATURES_REPLY.pack(OFP_VERSAO, OFPT_FEATURES_REPLY, _FEATURES_REPLY.size, xid,
+                                                   self.dpid, 256, 254, 0, 0x07, 0))
+        # Controladores que não pedem PORT_DESC começam a receber PacketIns após 1s
+        asyncio.get_running_loop().call_later(1.0, self._marcar_pronto)
+
+    def _get_config(self, xid, msg):
+        self.transporte.write(_GET_CONFIG_REPLY.pack(OFP_VERSAO, OFPT_GET_CONFIG_REPLY,
+                                                     _GET_CONFIG_REPLY.size, xid, 0, 0xffff))
+
+    def _barrier(self, xid, msg):
+        self.transporte.write(_CABECALHO.pack(OFP_VERSAO, OFPT_BARRIER_REPLY, _CABECALHO.size, xid))
+
+    def _role(self, xid, msg):
+        corpo = bytes(msg[8:])
+        self.transporte.write(struct.pack('!BBHI', OFP_VERSAO, OFPT_ROLE_REPLY, 8 + len(corpo), xid) + corpo)
+
+    def _multipart(self, xid, msg):
+        tipo = struct.unpack_from('!H', msg, 8)[0]
+        if tipo == OFPMP_DESC:
+            corpo = _DESC.pack(b'TCC', b'simulador_switches', b'OpenFlow 1.3', str(self.dpid).encode(),
+                               f'switch simulado {self.dpid}'.encode())
+        elif tipo == OFPMP_PORT_DESC:
+            corpo = b''.join(_PORTA.pack(p, struct.pack('!HI', 0x0a00 | (self.dpid & 0xff), p),
+                                         f'sim{self.dpid}-eth{p}'.encode()[:15], 0, 4, 0, 0, 0, 0,
+                                         10000000, 10000000)
+                             for p in range(1, self.portas + 1))
+            # O Ryu passa o datapath para MAIN_DISPATCHER ao receber esta resposta
+            asyncio.get_running_loop().call_soon(self._marcar_pronto)
+        elif tipo == OFPMP_PORT_STATS:
+            porta = struct.unpack_from('!I', msg, 16)[0]
+            portas = range(1, self.portas + 1) if porta == OFPP_ANY else [porta]
+            agora = time.perf_counter() - self.inicio
+            # Os PacketIns simulam quadros recebidos pelo switch em cada porta
+            corpo = b''.join(_ESTATISTICAS_PORTA.pack(p, self.enviados_porta[p], 0, self.octetos_porta[p],
+                                                      0, 0, 0, 0, 0, 0, 0, 0, 0, int(agora), int(agora % 1 * 1e9))
+                             for p in portas if 0 < p <= self.portas)
+        elif tipo == OFPMP_FLOW:
+            corpo = b''
+        else:
+            dados = bytes(msg[:64])
+            self.transporte.write(_ERRO.pack(OFP_VERSAO, OFPT_ERROR, _ERRO.size + len(dados), xid,
+                                             OFPET_BAD_REQUEST, OFPBRC_BAD_MULTIPART) + dados)
+            return
+        self.transporte.write(_MULTIPART.pack(OFP_VERSAO, OFPT_MULTIPART_REPLY, _MULTIPART.size + len(corpo),
+                                              xid, tipo, 0) + corpo)
+
+    # --- Respostas aos PacketIns ---
+    def _resposta(self, buffer_id):
+        enviado = self.pendentes.pop(buffer_id, None)
+        if enviado is None:
+            return False
+        etapa = self.etapa
+        if etapa.medindo and enviado >= etapa.inicio_medicao:
+            etapa.respostas += 1
+            etapa.latencias.append(time.perf_counter() - enviado)
+        if self.taxa <= 0:
+            # Modo de vazão/latência: cada resposta libera o próximo PacketIn
+            self.enviar_packet_ins(1)
+        return True
+
+    def _flow_mod(self, xid, msg):
+        if len(msg) >= _BUFFER_ID_FLOW_MOD + 4:
+            if self._resposta(struct.unpack_from('!I', msg, _BUFFER_ID_FLOW_MOD)[0]) and self.etapa.medindo:
+                self.etapa.flow_mods += 1
+
+    def _packet_out(self, xid, msg):
+        if len(msg) >= _BUFFER_ID_PACKET_OUT + 4:
+            if self._resposta(struct.unpack_from('!I', msg, _BUFFER_ID_PACKET_OUT)[0]) and self.etapa.medindo:
+                self.etapa.packet_outs += 1
+
+    # --- Geração de PacketIns ---
+    def enviar_packet_ins(self, quantidade):
+        if self.fechado or not self.pronto.done() or quantidade <= 0:
+            return
+        if self.janela:
+            quantidade = min(quantidade, self.janela - len(self.pendentes))
+        mensagens = []
+        agora = time.perf_counter()
+        rnd, macs, portas = self.rnd.randrange, self.macs, self.portas
+        for _ in range(quantidade):
+            origem = rnd(len(macs))
+            destino = rnd(len(macs))
+            in_port = 1 + origem % portas
+            buffer_id = self.proximo_buffer
+            self.proximo_buffer = (buffer_id + 1) % OFP_NO_BUFFER
+            quadro = macs[destino] + macs[origem] + b'\x08\x00' + _PAYLOAD
+            mensagens.append(_PACKET_IN.pack(OFP_VERSAO, OFPT_PACKET_IN, _PACKET_IN.size + len(quadro),
+                                             self._novo_xid(), buffer_id, len(quadro), 0, 0, 0,
+                                             1, 12, _OXM_IN_PORT, in_port) + quadro)
+            self.pendentes[buffer_id] = agora
+            self.enviados_porta[in_port] += 1
+            self.octetos_porta[in_port] += len(quadro)
+        if mensagens:
+            self.transporte.write(b''.join(mensagens))
+            if self.etapa.medindo:
+                self.etapa.enviados += len(mensagens)
+
+    def tique(self, dt):
+        """Chamado a cada PERIODO: expira pendentes e envia o crédito da taxa."""
+        limite = time.perf_counter() - self.timeout
+        while self.pendentes:
+            buffer_id, enviado = next(iter(self.pendentes.items()))
+            if enviado > limite:
+                break
+            del self.pendentes[buffer_id]
+            if self.etapa.medindo and enviado >= self.etapa.inicio_medicao:
+                self.etapa.perdidos += 1
+        if self.taxa > 0:
+            # Crédito limitado a 100 ms de taxa para não gerar rajadas após pausas
+            self.credito = min(self.credito + self.taxa * dt, self.taxa * 0.1 + 1)
+            quantidade = int(self.credito)
+            self.credito -= quantidade
+            self.enviar_packet_ins(quantidade)
+        else:
+            self.enviar_packet_ins(self.janela - len(self.pendentes))
+
+
+async def conectar_switches(etapa, host, porta, dpid_base, opcoes, simultaneas=200, timeout=30.0):
+    loop = asyncio.get_running_loop()
+    limite = asyncio.Semaphore(simultaneas)
+
+    async def conectar(i):
+        dpid = dpid_base + i
+        async with limite:
+            try:
+                _, switch = await loop.create_connection(
+                    lambda: SwitchSimulado(dpid, etapa, semente=dpid, **opcoes), host, porta)
+                await asyncio.wait_for(switch.pronto, timeout)
+            except (OSError, ConnectionError, asyncio.TimeoutError):
+                etapa.falhas_conexao += 1
+                return None
+        etapa.conectados += 1
+        return switch
+
+    switches = await asyncio.gather(*(conectar(i) for i in range(1, etapa.switches + 1)))
+    return [s for s in switches if s is not None]
+
+
+async def executar_etapa(n, indice, args):
+    etapa = Etapa(n)
+    opcoes = dict(portas=args.portas, macs=args.macs, janela=args.janela, taxa=args.taxa,
+                  timeout=args.timeout_resposta)
+    inicio = time.perf_counter()
+    # dpids distintos por etapa: a desconexão da etapa anterior não afeta a atual no controlador
+    switches = await conectar_switches(etapa, args.controlador, args.porta, (indice + 1) << 32, opcoes,
+                                       args.conexoes_simultaneas, args.timeout_conexao)
+    tempo_conexao = time.perf_counter() - inicio
+    if not switches:
+        print(f"❌ {n} switch(es): nenhuma conexão completou o handshake.")
+        return None
+
+    async def gerar(ate):
+        anterior = time.perf_counter()
+        while time.perf_counter() < ate:
+            await asyncio.sleep(PERIODO)
+            agora = time.perf_counter()
+            for switch in switches:
+                switch.tique(agora - anterior)
+            anterior = agora
+
+    await gerar(time.perf_counter() + args.aquecimento)
+    etapa.iniciar_medicao()
+    await gerar(time.perf_counter() + args.duracao)
+    etapa.encerrar_medicao()
+    for switch in switches:
+        switch.fechar()
+    await asyncio.sleep(0.5)
+
+    resumo = etapa.resumo()
+    resumo['tempo_conexao_s'] = tempo_conexao
+    return resumo
+
+
+def imprimir(resumos):
+    print(f"\n{'switches':>8} {'conect.':>8} {'handsh.p50':>10} {'PacketIn/s':>11} {'resp./s':>10} "
+          f"{'FlowMod/s':>10} {'perdidos':>9} {'lat.p50':>8} {'lat.p90':>8} {'lat.p99':>8}  (ms)")
+    for r in resumos:
+        print(f"{r['switches']:>8} {r['conectados']:>8} {r['handshake_p50_ms']:>10.2f} {r['packet_in_s']:>11,.0f} "
+              f"{r['respostas_s']:>10,.0f} {r['flow_mod_s']:>10,.0f} {r['perdidos']:>9} "
+              f"{r['latencia_p50_ms']:>8.2f} {r['latencia_p90_ms']:>8.2f} {r['latencia_p99_ms']:>8.2f}")
+
+
+async def executar(args):
+    resumos = []
+    for indice, n in enumerate(args.switches):
+        print(f"=== {n} switch(es) simulado(s) -> {args.controlador}:{args.porta} ===")
+        resumo = await executar_etapa(n, indice, args)
+        if resumo is not None:
+            print(f"  {resumo['conectados']}/{n} conectados em {resumo['tempo_conexao_s']:.2f}s; "
+                  f"{resumo['respostas_s']:,.0f} respostas/s, latência p50 {resumo['latencia_p50_ms']:.2f} ms")
+            resumos.append(resumo)
+    return resumos
+
+
+def _ajustar_limite_arquivos(necessarios):
+    suave, rigido = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if suave < necessarios:
+        novo = necessarios if rigido == resource.RLIM_INFINITY else min(necessarios, rigido)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (novo, rigido))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Simulador de switches OpenFlow 1.3 para carga no controlador.")
+    ap.add_argument('--controlador', default='127.0.0.1')
+    ap.add_argument('--porta', type=int, default=6653)
+    ap.add_argument('--switches', type=int, nargs='+', default=[1, 10, 100])
+    ap.add_argument('--portas', type=int, default=16, help="Portas por switch")
+    ap.add_argument('--macs', type=int, default=1000, help="MACs distintos por switch")
+    ap.add_argument('--taxa', type=float, default=100.0,
+                    help="PacketIns/s por switch (0 = envia um novo a cada resposta)")
+    ap.add_argument('--janela', type=int, default=64,
+                    help="Máximo de PacketIns sem resposta por switch (0 = sem limite)")
+    ap.add_argument('--duracao', type=float, default=10.0)
+    ap.add_argument('--aquecimento', type=float, default=2.0)
+    ap.add_argument('--timeout-resposta', type=float, default=1.0)
+    ap.add_argument('--timeout-conexao', type=float, default=30.0)
+    ap.add_argument('--conexoes-simultaneas', type=int, default=200)
+    ap.add_argument('--csv', help="Grava o resumo de cada etapa em CSV")
+    args = ap.parse_args()
+    if args.taxa <= 0 and args.janela <= 0:
+        ap.error("--taxa 0 exige --janela > 0")
+
+    _ajustar_limite_arquivos(max(args.switches) + 256)
+    try:
+        resumos = asyncio.run(executar(args))
+    except KeyboardInterrupt:
+        return 1
+    imprimir(resumos)
+    if args.csv and resumos:
+        with open(args.csv, 'w', newline='') as f:
+            escritor = csv.DictWriter(f, fieldnames=list(resumos[0]))
+            escritor.writeheader()
+            escritor.writerows(resumos)
+        print(f"\nResumo gravado em '{args.csv}'.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
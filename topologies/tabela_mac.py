@@ -0,0 +1,114 @@
+"""Tabela de aprendizado MAC limitada, com despejo LRU e envelhecimento.
+
+Substitui o antigo ``mac_to_port`` (dict de dicts sem limite) do MeuSwitch13.
+Cada datapath tem no máximo ``capacidade`` entradas; ao estourar o limite a
+entrada aprendida há mais tempo é despejada. Entradas que não são vistas como
+origem por ``tempo_vida`` segundos expiram em ``envelhecer()``.
+
+As operações que removem ou alteram uma entrada (despejo, expiração, mudança
+de porta) devolvem a lista de ``(dpid, mac, porta_antiga)`` afetados, para que
+o controlador invalide os fluxos instalados em direção a esses MACs.
+"""
+import sys
+import time
+from collections import OrderedDict
+
+
+class TabelaMAC:
+    def __init__(self, capacidade=4096, tempo_vida=300, relogio=time.monotonic):
+        if capacidade < 1:
+            raise ValueError("A capacidade da tabela MAC deve ser >= 1.")
+        self.capacidade = capacidade
+        self.tempo_vida = tempo_vida
+        self.relogio = relogio
+        # dpid -> OrderedDict(mac -> [porta, visto_em]), do mais antigo ao mais recente
+        self._tabelas = {}
+        self.despejos = 0
+        self.expiracoes = 0
+        self.movimentos = 0
+
+    def aprender(self, dpid, mac, porta):
+        """Registra ``mac`` atrás de ``porta``; retorna as entradas invalidadas."""
+        tabela = self._tabelas.get(dpid)
+        if tabela is None:
+            tabela = self._tabelas[dpid] = OrderedDict()
+
+        agora = self.relogio()
+        entrada = tabela.get(mac)
+        if entrada is not None:
+            tabela.move_to_end(mac)
+            entrada[1] = agora
+            if entrada[0] == porta:
+                return []
+            # Host mudou de porta: os fluxos antigos apontam para o lugar errado
+            porta_antiga = entrada[0]
+            entrada[0] = porta
+            self.movimentos += 1
+            return [(dpid, mac, porta_antiga)]
+
+        invalidadas = []
+        while len(tabela) >= self.capacidade:
+            mac_antigo, (porta_antiga, _) = tabela.popitem(last=False)
+            self.despejos += 1
+            invalidadas.append((dpid, mac_antigo, porta_antiga))
+        tabela[mac] = [porta, agora]
+        return invalidadas
+
+    def consultar(self, dpid, mac):
+        """Retorna a porta associada a ``mac`` ou None se desconhecido/expirado."""
+        tabela = self._tabelas.get(dpid)
+        if tabela is None:
+            return None
+        entrada = tabela.get(mac)
+        if entrada is None:
+            return None
+        if self.tempo_vida and self.relogio() - entrada[1] > self.tempo_vida:
+            return None
+        return entrada[0]
+
+    def envelhecer(self):
+        """Remove as entradas expiradas de todos os datapaths."""
+        if not self.tempo_vida:
+            return []
+        limite = self.relogio() - self.tempo_vida
+        expiradas = []
+        for dpid, tabela in self._tabelas.items():
+            # A ordem LRU coincide com a ordem de "visto_em": basta olhar o início
+            while tabela:
+                mac, (porta, visto_em) = next(iter(tabela.items()))
+                if visto_em > limite:
+                    break
+                del tabela[mac]
+                expiradas.append((dpid, mac, porta))
+        self.expiracoes += len(expiradas)
+        return expiradas
+
+    def remover_datapath(self, dpid):
+        """Descarta todas as entradas de um datapath (ex.: switch desconectado)."""
+        self._tabelas.pop(dpid, None)
+
+    def __len__(self):
+        return sum(len(t) for t in self._tabelas.values())
+
+    def tamanho(self, dpid):
+        tabela = self._tabelas.get(dpid)
+        return len(tabela) if tabela is not None else 0
+
+    def memoria_bytes(self):
+        """Estimativa do uso de memória da tabela (estruturas + chaves + valores)."""
+        total = sys.getsizeof(self._tabelas)
+        for tabela in self._tabelas.values():
+            total += sys.getsizeof(tabela)
+            for mac, entrada in tabela.items():
+                total += sys.getsizeof(mac) + sys.getsizeof(entrada)
+        return total
+
+    def estatisticas(self):
+        return {
+            'entradas': len(self),
+            'entradas_por_datapath': {dpid: len(t) for dpid, t in self._tabelas.items()},
+            'memoria_bytes': self.memoria_bytes(),
+            'despejos': self.despejos,
+            'expiracoes': self.expiracoes,
+            'movimentos': self.movimentos,
+        }
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 from mininet.topo import Topo
 from mininet.net import Mininet
-from mininet.node import RemoteController, OVSKernelSwitch, Node
+from mininet.node import RemoteController, OVSKernelSwitch
 from mininet.link import TCLink
 from mininet.log import setLogLevel, info, error
 from mininet.cli import CLI
@@ -10,19 +10,15 @@ import subprocess
 import os
 import json
 
-class EnhancedDockerHost(Node):
-    def __init__(self, name, dimage='alpine', **kwargs):
-        super().__init__(name, **kwargs)   
-        self.dimage = dimage
-
-    def start(self):
-        super().start()
-        self.cmd(
-            '(apk update && apk add --no-cache iptables curl tcpdump conntrack-tools traceroute iproute2) || ' # Adicionado iproute2
-            '(apt-get update && apt-get install -y iptables curl tcpdump conntrack traceroute iproute2) || ' # Adicionado iproute2
-            f'echo "\\033[91m[⚠️  Falha]\\033[0m Não foi possível instalar pacotes no gateway \\033[93m{self.name}\\033[0m."'
-        )
-        info(f'\n🟢 Gateway \033[92m{self.name}\033[0m inicializado com pacotes essenciais instalados.')
+from contabilidade_nflog import iniciar_coletor_r1
+from firewall_r1 import FirewallR1, RegraInvalida
+from gateway_nfv import (AMOSTRAGEM_PADRAO, MODOS_LOG, Cronometro, EnhancedDockerHost,
+                         alternar_log, configurar_r1, relatorio_r1)
+from inventario_hosts import HOSTS_S1, HOSTS_S2, MAC_R1_ETH1, inventario_de_rede, salvar_inventario
+from medicao_streaming import EstatisticasStreaming, ServidoresIperf, stream_iperf, stream_ping
+from motor_testes import executar_matriz
+from perfis_enlace import PerfilInvalido, PerfisEnlace, comando_perfil
+from parser_fluxos import parse_dump, resumo_tabela
 
 
 class RobustTopo(Topo):
@@ -30,17 +26,9 @@ class RobustTopo(Topo):
         s1 = self.addSwitch('s1', cls=OVSKernelSwitch, protocols='OpenFlow13')
         s2 = self.addSwitch('s2', cls=OVSKernelSwitch, protocols='OpenFlow13')
 
-        hosts_s1 = [
-            ('h1', '10.0.1.1'), ('h2', '10.0.1.2'), ('h6', '10.0.1.3'),
-            ('h10', '10.0.1.4'), ('h11', '10.0.1.5'), ('h12', '10.0.1.6'),
-            ('h9', '10.0.1.7'),
-            ('h13', '10.0.1.13') # Adicionado h13 na topologia inicial para facilitar o provisionamento
-        ]
-
-        hosts_s2 = [
-            ('h3', '10.0.2.1'), ('h4', '10.0.2.2'), ('h5', '10.0.2.3'),
-            ('h7', '10.0.2.4'), ('h8', '10.0.2.5')
-        ]
+        # Listas compartilhadas com o inventário estático do modo proativo do controlador
+        hosts_s1 = HOSTS_S1
+        hosts_s2 = HOSTS_S2
 
         for name, ip in hosts_s1:
             self.addHost(name, ip=f'{ip}/24', defaultRoute='via 10.0.1.254')
@@ -52,56 +40,28 @@ class RobustTopo(Topo):
 
         r1 = self.addHost('r1', cls=EnhancedDockerHost)
         self.addLink(r1, s1, intfName1='r1-eth0', params1={'ip': '10.0.1.254/24'})
-        self.addLink(r1, s2, intfName1='r1-eth1', params1={'ip': '10.0.2.254/24'})
+        self.addLink(r1, s2, intfName1='r1-eth1', params1={'ip': '10.0.2.254/24', 'mac': MAC_R1_ETH1})
         info('\n🛡️  Gateway \033[92mr1\033[0m conectado com sucesso aos switches \033[94ms1\033[0m e \033[94ms2\033[0m.')
 
 
 def configure_nfv(net):
     r1 = net.get('r1')
 
-    r1.cmd('ip link set dev r1-eth0 up')
-    r1.cmd('ip link set dev r1-eth1 up')
-    r1.cmd('ip addr add 10.0.1.254/24 dev r1-eth0')
-    r1.cmd('ip addr add 10.0.2.254/24 dev r1-eth1')
-
-    r1.cmd('echo "net.ipv4.ip_forward=1" > /etc/sysctl.d/99-ipforward.conf')
-    r1.cmd('sysctl -p /etc/sysctl.d/99-ipforward.conf')
-
-    r1.cmd('iptables -t nat -F') # Limpa todas as regras NAT existentes
-    r1.cmd('iptables -t nat -A POSTROUTING -o r1-eth1 -j MASQUERADE')
-    r1.cmd('iptables -t nat -A POSTROUTING -o r1-eth1 -j LOG --log-prefix "NAT: "')
+    # Endereços, sysctl, NAT, LOGGING e FORWARD (conntrack + FW_BLOQUEIO com os
+    # conjuntos ipset vazios) aplicados em um único script no r1
+    firewall = FirewallR1()
+    erro = configurar_r1(r1, forward=firewall.regras_forward(), script_ipset=firewall.script_ipset())
+    if erro:
+        error(f"❌ Erro ao configurar o gateway r1: {erro}")
 
-    # Limpa todas as regras de FILTER (FORWAR, INPUT, OUTPUT) para começar limpo
-    r1.cmd('iptables -F')
-    r1.cmd('iptables -X') # Remove cadeias personalizadas
-    r1.cmd('iptables -P INPUT ACCEPT') # Define políticas padrão para ACCEPT antes de limpar FORWARD
-    r1.cmd('iptables -P OUTPUT ACCEPT')
-    r1.cmd('iptables -P FORWARD DROP') # Policy DROP para FORWARD como padrão de segurança
-
-    # Cria e aplica a cadeia LOGGING (se não existir)
-    r1.cmd('iptables -N LOGGING 2>/dev/null || true') # || true para evitar erro se já existir
-    r1.cmd('iptables -F LOGGING') # Limpa a cadeia LOGGING
-
-    r1.cmd('iptables -A FORWARD -i r1-eth0 -o r1-eth1 -m conntrack --ctstate NEW -j ACCEPT')
-    r1.cmd('iptables -A FORWARD -i r1-eth1 -o r1-eth0 -m conntrack --ctstate ESTABLISHED,RELATED -j ACCEPT')
-    
-    r1.cmd('iptables -A FORWARD -j LOGGING') # Adiciona a regra de logging ao FORWARD
-    r1.cmd('iptables -A LOGGING -j LOG --log-prefix "FORWARD: " --log-level 4')
-    r1.cmd('iptables -A LOGGING -j ACCEPT') # Permite o tráfego após o log na cadeia LOGGING
+    info("\n✅ Gateway NFV '\033[92mr1\033[0m' configurado com sucesso! Rede segura e rastreável.")
+    info(relatorio_r1(r1))
 
-    r1.cmd('echo 1 > /proc/sys/net/ipv4/conf/all/log_martians')
+def custom_cli(net, perfis=None):
+    firewall = FirewallR1()
+    contabilidade = {'coletor': None, 'modo': 'contabil', 'amostragem': AMOSTRAGEM_PADRAO}
+    servidores_iperf = ServidoresIperf()
 
-    info("\n✅ Gateway NFV '\033[92mr1\033[0m' configurado com sucesso! Rede segura e rastreável.")
-    info("\n=== \033[94mConfiguração de Rede\033[0m ===")
-    info(r1.cmd('ip addr show'))
-    info("\n=== \033[94mTabela de Roteamento\033[0m ===")
-    info(r1.cmd('ip route show'))
-    info("\n=== \033[94mRegras NAT\033[0m ===")
-    info(r1.cmd('iptables -t nat -L -v -n'))
-    info("\n=== \033[94mRegras de Firewall (Padrão)\033[0m ===")
-    info(r1.cmd('iptables -L -v -n'))
-
-def custom_cli(net):
     # --- Comandos Existentes ---
     def addflow():
         sw = input("Switch destino (ex: s1): ").strip()
@@ -132,6 +92,7 @@ def custom_cli(net):
         try:
             output = subprocess.check_output(['sudo', 'ovs-ofctl', '-O', 'OpenFlow13', 'dump-flows', sw]).decode()
             info(f"📋 Fluxos ativos em {sw}:\n{output}")
+            info(f"\n{resumo_tabela(parse_dump(output))}\n")
         except subprocess.CalledProcessError as e:
             error(f"❌ Erro ao mostrar fluxos: {e.stderr}")
 
@@ -149,10 +110,16 @@ def custom_cli(net):
             error("Host(s) não encontrado(s).")
             return
         
-        info(f"Iniciando ping de {src_host.name} para {dst_host.name} ({dst_host.IP()})...")
-        cmd = f"ping -c {count} {dst_host.IP()}"
-        output = src_host.cmd(cmd)
-        info(f"\n--- Resultados do Ping ({src_host.name} para {dst_host.name}) ---\n{output}")
+        info(f"Iniciando ping de {src_host.name} para {dst_host.name} ({dst_host.IP()})...\n")
+        estatisticas = EstatisticasStreaming()
+        perdidos = []
+        for amostra in stream_ping(src_host, dst_host.IP(), int(count), perdidos=perdidos):
+            estatisticas.adicionar(amostra.rtt_ms)
+            info(f"  seq={amostra.seq} ttl={amostra.ttl} rtt={amostra.rtt_ms:.3f} ms  [{estatisticas}]\n")
+        enviados = estatisticas.n + len(perdidos)
+        perda = 100.0 * len(perdidos) / enviados if enviados else 100.0
+        info(f"\n--- Resultados do Ping ({src_host.name} para {dst_host.name}) ---\n"
+             f"RTT (ms): {estatisticas}  perda={perda:.1f}%\n")
 
     def run_iperf_test():
         info("\n=== Teste de iPerf3 ===")
@@ -167,17 +134,76 @@ def custom_cli(net):
             error("Host(s) não encontrado(s).")
             return
         
-        info(f"Configurando servidor iPerf3 em {server_host.name}...")
-        server_host.cmd('iperf3 -s &') # Inicia iPerf3 server em background
+        # O servidor iPerf3 fica ativo entre os testes (encerrado ao sair da CLI)
+        if servidores_iperf.garantir(server_host):
+            info(f"Servidor iPerf3 iniciado em {server_host.name}.\n")
 
-        info(f"Iniciando cliente iPerf3 de {client_host.name} para {server_host.name} ({server_host.IP()})...")
-        client_cmd = f"iperf3 -c {server_host.IP()} -t {duration}"
-        client_output = client_host.cmd(client_cmd)
-        
-        info(f"\n--- Resultados do iPerf3 ({client_host.name} para {server_host.name}) ---\n{client_output}")
-        
-        info(f"Parando servidor iPerf3 em {server_host.name}...")
-        server_host.cmd('pkill iperf3') # Mata o processo iPerf3 server
+        info(f"Iniciando cliente iPerf3 de {client_host.name} para {server_host.name} ({server_host.IP()})...\n")
+        estatisticas = EstatisticasStreaming()
+        try:
+            for amostra in stream_iperf(client_host, server_host.IP(), int(duration), servidores_iperf.porta):
+                estatisticas.adicionar(amostra.mbps)
+                info(f"  {amostra.inicio:5.1f}-{amostra.fim:5.1f}s  {amostra.mbps:10.2f} Mbps  [{estatisticas}]\n")
+        except RuntimeError as e:
+            error(f"❌ Erro no iPerf3: {e}\n")
+            return
+
+        info(f"\n--- Resultados do iPerf3 ({client_host.name} para {server_host.name}) ---\n"
+             f"Banda (Mbps): {estatisticas}\n")
+
+    def run_matrix_test(args):
+        partes = args.split()
+        tipos = tuple(t for t in partes if t in ('ping', 'iperf')) or ('ping', 'iperf')
+        caminho = next((p for p in partes if p.endswith('.csv')), '/tmp/resultados_teste.csv')
+        banco = next((p for p in partes if p.endswith('.db')), None)
+        info(f"\n=== Matriz de Testes ({', '.join(tipos)}) ===\n")
+        executar_matriz(net, tipos, caminho, banco=banco, servidores=servidores_iperf)
+
+    # --- Perfis de Enlace (banda, atraso, jitter, perda, fila) ---
+    def link_profile(args):
+        if perfis is None:
+            error("Nenhum arquivo de perfis de enlace carregado.")
+            return
+        comando_perfil(perfis, args)
+
+    def run_profile_sweep(args):
+        if perfis is None:
+            error("Nenhum arquivo de perfis de enlace carregado.")
+            return
+        partes = args.split()
+        tipos = tuple(t for t in partes if t in ('ping', 'iperf')) or ('ping', 'iperf')
+        pedidos = [p for p in partes if p not in ('ping', 'iperf') and not p.endswith(('.csv', '.db'))]
+        desconhecidos = [p for p in pedidos if p not in perfis.perfis]
+        if desconhecidos:
+            error(f"Perfil(is) inexistente(s) em '{perfis.caminho}': {', '.join(desconhecidos)}. "
+                  f"Disponíveis: {', '.join(perfis.perfis)}.")
+            return
+        nomes = pedidos or list(perfis.perfis)
+        base = next((p for p in partes if p.endswith('.csv')), '/tmp/resultados_teste.csv')[:-len('.csv')]
+        banco = next((p for p in partes if p.endswith('.db')), None)
+        anterior = perfis.atual
+        resumo = {}
+        try:
+            for nome in nomes:
+                alteradas, duracao = perfis.aplicar(nome)
+                info(f"\n=== Perfil '{nome}' ({alteradas} interfaces em {duracao * 1000:.0f} ms) ===\n")
+                info(perfis.resumo(nome) + '\n')
+                testes = executar_matriz(net, tipos, f'{base}_{nome}.csv', banco=banco,
+                                         metadados={'perfil': nome, 'arquivo_perfis': perfis.caminho},
+                                         servidores=servidores_iperf)
+                valores = {}
+                for teste in testes:
+                    for metrica, valor in (teste.resultado or {}).items():
+                        valores.setdefault(metrica, []).append(valor)
+                resumo[nome] = {metrica: sum(v) / len(v) for metrica, v in valores.items()}
+        finally:
+            # O arquivo pode ter sido recarregado sem o perfil anterior
+            if anterior in perfis.perfis and perfis.atual != anterior:
+                perfis.aplicar(anterior)
+        metricas = sorted({m for r in resumo.values() for m in r})
+        info(f"\n=== Varredura de perfis (médias) ===\n{'perfil':<20}" + ''.join(f'{m:>16}' for m in metricas) + '\n')
+        for nome, medias in resumo.items():
+            info(f'{nome:<20}' + ''.join(f'{medias[m]:>16.3f}' if m in medias else f'{"-":>16}' for m in metricas) + '\n')
 
     # --- Firewall Dinâmico no R1 (NFV) ---
     def r1_add_fw_rule():
@@ -194,31 +220,54 @@ def custom_cli(net):
         print("4 - Bloquear Porta UDP de Destino (DROP UDP_DST_PORT)")
         rule_type = input("Opção: ").strip()
 
-        rule_cmd = ""
-        if rule_type == '1':
-            src_ip = input("IP de Origem a bloquear (ex: 10.0.1.1): ").strip()
-            rule_cmd = f"iptables -A FORWARD -s {src_ip} -j DROP"
-        elif rule_type == '2':
-            dst_ip = input("IP de Destino a bloquear (ex: 10.0.2.1): ").strip()
-            rule_cmd = f"iptables -A FORWARD -d {dst_ip} -j DROP"
-        elif rule_type == '3':
-            dst_ip = input("IP de Destino (opcional, 'any' para qualquer): ").strip() or '0.0.0.0/0'
-            dst_port = input("Porta TCP de Destino a bloquear (ex: 80): ").strip()
-            rule_cmd = f"iptables -A FORWARD -p tcp --dport {dst_port} -d {dst_ip} -j DROP"
-        elif rule_type == '4':
-            dst_ip = input("IP de Destino (opcional, 'any' para qualquer): ").strip() or '0.0.0.0/0'
-            dst_port = input("Porta UDP de Destino a bloquear (ex: 53): ").strip()
-            rule_cmd = f"iptables -A FORWARD -p udp --dport {dst_port} -d {dst_ip} -j DROP"
-        else:
-            error("Opção inválida.")
+        try:
+            if rule_type == '1':
+                src_ip = input("IP de Origem a bloquear (ex: 10.0.1.1): ").strip()
+                conjunto = firewall.adicionar('src_ip', ip=src_ip)
+            elif rule_type == '2':
+                dst_ip = input("IP de Destino a bloquear (ex: 10.0.2.1): ").strip()
+                conjunto = firewall.adicionar('dst_ip', ip=dst_ip)
+            elif rule_type == '3':
+                dst_ip = input("IP de Destino (opcional, 'any' para qualquer): ").strip() or '0.0.0.0/0'
+                dst_port = input("Porta TCP de Destino a bloquear (ex: 80): ").strip()
+                conjunto = firewall.adicionar('tcp_port', ip=dst_ip, porta=dst_port)
+            elif rule_type == '4':
+                dst_ip = input("IP de Destino (opcional, 'any' para qualquer): ").strip() or '0.0.0.0/0'
+                dst_port = input("Porta UDP de Destino a bloquear (ex: 53): ").strip()
+                conjunto = firewall.adicionar('udp_port', ip=dst_ip, porta=dst_port)
+            else:
+                error("Opção inválida.")
+                return
+        except RegraInvalida as e:
+            error(f"❌ {e}")
             return
-        
-        info(f"Aplicando regra no r1: {rule_cmd}")
-        output = r1.cmd(rule_cmd)
-        if "Bad argument" in output or "iptables: " in output:
+
+        info(f"Aplicando regra no r1 (conjunto ipset {conjunto})...")
+        output = firewall.aplicar(r1)
+        if output:
             error(f"❌ Erro ao adicionar regra no r1: {output}")
         else:
-            info("✅ Regra de firewall adicionada com sucesso no r1.")
+            info(f"✅ Regra de firewall adicionada com sucesso no r1. ({firewall.resumo()})")
+
+    def r1_load_fw(caminho):
+        info("\n=== Carregar Regras de Firewall no R1 ===")
+        r1 = net.get('r1')
+        if not r1:
+            error("Gateway r1 não encontrado.")
+            return
+
+        caminho = caminho.strip() or input("Arquivo JSON com as regras (ex: firewall.json): ").strip()
+        inicio = time.perf_counter()
+        try:
+            total = firewall.carregar_arquivo(caminho)
+        except (OSError, ValueError, KeyError) as e:
+            error(f"❌ Erro ao ler '{caminho}': {e}")
+            return
+        output = firewall.aplicar(r1)
+        if output:
+            error(f"❌ Erro ao aplicar regras no r1: {output}")
+        else:
+            info(f"✅ {total} regras carregadas em {time.perf_counter() - inicio:.2f}s. ({firewall.resumo()})")
 
     def r1_clear_fw():
         info("\n=== Limpar Regras de Firewall do R1 ===")
@@ -229,17 +278,13 @@ def custom_cli(net):
         
         confirm = input("Tem certeza que deseja limpar TODAS as regras FORWARD do r1? (s/N): ").lower()
         if confirm == 's':
-            # Assegura que as regras básicas de conntrack sejam mantidas ou recriadas
-            r1.cmd('iptables -F FORWARD') # Limpa apenas a cadeia FORWARD
-            r1.cmd('iptables -D FORWARD -j LOGGING 2>/dev/null || true') # Remove a regra de logging se existir
-            r1.cmd('iptables -D LOGGING -j LOG --log-prefix "FORWARD: " --log-level 4 2>/dev/null || true')
-            r1.cmd('iptables -D LOGGING -j ACCEPT 2>/dev/null || true')
-
-            # Recria as regras essenciais de encaminhamento e logging
-            r1.cmd('iptables -A FORWARD -i r1-eth0 -o r1-eth1 -m conntrack --ctstate NEW -j ACCEPT')
-            r1.cmd('iptables -A FORWARD -i r1-eth1 -o r1-eth0 -m conntrack --ctstate ESTABLISHED,RELATED -j ACCEPT')
-            r1.cmd('iptables -A FORWARD -j LOGGING') # Adiciona a regra de logging de volta
-            info("✅ Regras FORWARD do r1 limpas e regras básicas restauradas.")
+            # Esvazia os conjuntos e recria a FORWARD com as regras básicas de conntrack e logging
+            firewall.limpar()
+            output = firewall.aplicar(r1)
+            if output:
+                error(f"❌ Erro ao limpar regras do r1: {output}")
+            else:
+                info("✅ Regras FORWARD do r1 limpas e regras básicas restauradas.")
         else:
             info("Operação cancelada.")
 
@@ -250,52 +295,144 @@ def custom_cli(net):
             error("Gateway r1 não encontrado.")
             return
         
-        output = r1.cmd('iptables -L FORWARD -v -n')
+        output = r1.cmd('iptables -L FORWARD -v -n && iptables -L FW_BLOQUEIO -v -n')
         info(f"\n--- Regras de Firewall FORWARD no r1 ---\n{output}")
+        info(f"\n--- Conjuntos ipset ---\n{r1.cmd('ipset list -terse')}")
+
+    # --- Log / Contabilidade de Tráfego no R1 ---
+    def r1_log_mode(args):
+        partes = args.split()
+        if not partes or partes[0] not in MODOS_LOG:
+            error(f"Uso: r1log <{'|'.join(MODOS_LOG)}> [amostragem]")
+            return
+        modo = partes[0]
+        amostragem = int(partes[1]) if len(partes) > 1 and partes[1].isdigit() else contabilidade['amostragem']
+        output = alternar_log(net.get('r1'), modo, amostragem)
+        if output:
+            error(f"❌ Erro ao alterar o modo de log do r1: {output}")
+            return
+        contabilidade.update(modo=modo, amostragem=amostragem)
+        if modo == 'debug':
+            info("✅ r1 em modo debug: LOG por pacote no log do kernel (prefixos 'FORWARD: ' e 'NAT: ').")
+        else:
+            info(f"✅ r1 em modo contabilidade: 1 a cada {amostragem} pacotes enviado ao NFLOG.")
+
+    def r1_accounting(args):
+        partes = args.split()
+        acao = partes[0] if partes else 'status'
+        coletor = contabilidade['coletor']
+        if acao == 'iniciar':
+            if coletor is not None:
+                error("O coletor já está em execução.")
+                return
+            if contabilidade['modo'] != 'contabil':
+                error("O r1 está em modo debug; use 'r1log contabil' antes de iniciar o coletor.")
+                return
+            caminho = partes[1] if len(partes) > 1 else 'contabil_r1.jsonl'
+            contabilidade['coletor'] = iniciar_coletor_r1(net.get('r1'), caminho,
+                                                          amostragem=contabilidade['amostragem'])
+            info(f"✅ Coletor NFLOG iniciado; resumos periódicos em '{caminho}'.")
+        elif acao == 'parar':
+            if coletor is None:
+                error("O coletor não está em execução.")
+                return
+            coletor.parar()
+            contabilidade['coletor'] = None
+            info(f"✅ Coletor parado após {coletor.resumos} resumos gravados em '{coletor.caminho}'.")
+        elif acao == 'status':
+            if coletor is None:
+                info(f"Coletor parado (modo de log: {contabilidade['modo']}).")
+                return
+            resumo = coletor.resumo()
+            info(f"\n--- Contabilidade do r1 (intervalo atual, amostragem 1/{resumo['amostragem']}) ---")
+            info(f"\nPacotes estimados: {resumo['pacotes_estimados']}  Bytes estimados: {resumo['bytes_estimados']}"
+                 f"  Fluxos: {resumo['fluxos_ativos']} (despejados: {resumo['fluxos_despejados']})")
+            for fluxo in resumo['top_fluxos'][:10]:
+                info(f"\n  {fluxo['src']}:{fluxo['sport']} -> {fluxo['dst']}:{fluxo['dport']} "
+                     f"{fluxo['proto']}  {fluxo['pacotes']} pkts  {fluxo['bytes']} bytes")
+            info("\n")
+        else:
+            error("Uso: r1contabil [iniciar [arquivo.jsonl]|parar|status]")
 
     # --- Registro de Comandos na CLI ---
     CLI.do_addflow = lambda self, args='': addflow()
     CLI.do_showflows = lambda self, args='': showflows()
     CLI.do_pingtest = lambda self, args='': run_ping_test()
     CLI.do_iperftest = lambda self, args='': run_iperf_test()
+    CLI.do_matriz = lambda self, args='': run_matrix_test(args)
     CLI.do_r1addfw = lambda self, args='': r1_add_fw_rule()
     CLI.do_r1clearfw = lambda self, args='': r1_clear_fw()
     CLI.do_r1showfw = lambda self, args='': r1_show_fw()
+    CLI.do_r1loadfw = lambda self, args='': r1_load_fw(args)
+    CLI.do_r1log = lambda self, args='': r1_log_mode(args)
+    CLI.do_r1contabil = lambda self, args='': r1_accounting(args)
+    CLI.do_perfil = lambda self, args='': link_profile(args)
+    CLI.do_varrerperfis = lambda self, args='': run_profile_sweep(args)
 
     CLI.help_addflow = lambda self: print("addflow: Adiciona um fluxo de bloqueio em um switch (SDN).")
     CLI.help_showflows = lambda self: print("showflows: Lista todos os fluxos instalados em um switch.")
     CLI.help_pingtest = lambda self: print("pingtest: Realiza teste de ping entre dois hosts.")
     CLI.help_iperftest = lambda self: print("iperftest: Realiza teste de iPerf3 entre dois hosts.")
-    CLI.help_r1addfw = lambda self: print("r1addfw: Adiciona uma regra de firewall (DROP) na cadeia FORWARD do gateway r1 (NFV).")
+    CLI.help_matriz = lambda self: print("matriz [ping] [iperf] [arquivo.csv] [banco.db]: Executa a matriz 10.0.1.0/24 x 10.0.2.0/24 em paralelo, respeitando os gargalos compartilhados.")
+    CLI.help_r1addfw = lambda self: print("r1addfw: Adiciona uma regra de firewall (DROP) aos conjuntos ipset do gateway r1 (NFV).")
     CLI.help_r1clearfw = lambda self: print("r1clearfw: Limpa todas as regras de FORWARD do iptables no r1, restaurando as básicas.")
     CLI.help_r1showfw = lambda self: print("r1showfw: Exibe as regras de firewall (FORWARD) atualmente configuradas no r1.")
+    CLI.help_r1loadfw = lambda self: print("r1loadfw <arquivo.json>: Carrega uma lista de regras [{\"tipo\": \"src_ip\", \"ip\": ...}] no r1 em uma única aplicação.")
+    CLI.help_r1log = lambda self: print("r1log <contabil|debug> [N]: Alterna entre NFLOG amostrado (1 a cada N pacotes) e LOG por pacote (debug) no r1.")
+    CLI.help_r1contabil = lambda self: print("r1contabil [iniciar [arquivo]|parar|status]: Controla o coletor de contabilidade NFLOG do r1.")
+    CLI.help_perfil = lambda self: print("perfil [nome | carregar [arquivo.json]]: Lista os perfis de enlace, aplica um perfil à rede em execução ou recarrega o arquivo.")
+    CLI.help_varrerperfis = lambda self: print("varrerperfis [ping] [iperf] [perfil ...] [base.csv] [banco.db]: Executa a matriz de testes sob cada perfil de enlace (todos, por padrão), com um CSV por perfil.")
 
-    CLI(net)
+    try:
+        CLI(net)
+    finally:
+        servidores_iperf.parar_todos()
+        if contabilidade['coletor'] is not None:
+            contabilidade['coletor'].parar()
 
 def run():
     setLogLevel('info')
     info("Limpeza de ambientes anteriores...")
-    os.system('sudo mn -c >/dev/null 2>&1')
-    os.system('sudo pkill -f ryu-manager >/dev/null 2>&1')
-    os.system('sudo pkill -f ovs-testcontroller >/dev/null 2>&1')
-    time.sleep(2)
+    cronometro = Cronometro()
+    with cronometro.fase('limpeza'):
+        os.system('sudo mn -c >/dev/null 2>&1')
+        os.system('sudo pkill -f ryu-manager >/dev/null 2>&1')
+        os.system('sudo pkill -f ovs-testcontroller >/dev/null 2>&1')
+        time.sleep(2)
     info("Limpeza concluída.")
 
     try:
-        net = Mininet(
-            topo=RobustTopo(),
-            controller=lambda name: RemoteController(name, ip='127.0.0.1', port=6653),
-            switch=OVSKernelSwitch,
-            link=TCLink,
-            autoSetMacs=True,
-            waitConnected=True,
-            cleanup=True
-        )
-
-        net.start()
+        with cronometro.fase('construção da topologia'):
+            net = Mininet(
+                topo=RobustTopo(),
+                controller=lambda name: RemoteController(name, ip='127.0.0.1', port=6653),
+                switch=OVSKernelSwitch,
+                link=TCLink,
+                autoSetMacs=True,
+                waitConnected=True,
+                cleanup=True
+            )
+        # Antes do net.start(): o modo proativo do controlador lê o inventário na conexão dos switches
+        info(f"\n📄 Inventário de hosts exportado para '{salvar_inventario(inventario_de_rede(net))}'.")
+
+        with cronometro.fase('net.start (switches)'):
+            net.start()
         info("\n🚀 Topologia ativa! Sistema SDN pronto para testes e bloqueios de tráfego.")
-        configure_nfv(net)
-        custom_cli(net)
+        with cronometro.fase('ferramentas do r1'):
+            net.get('r1').garantir_ferramentas()
+        with cronometro.fase('configuração NFV'):
+            configure_nfv(net)
+        perfis = None
+        try:
+            perfis = PerfisEnlace(net)
+            if perfis.padrao:
+                with cronometro.fase('perfil de enlace'):
+                    perfis.aplicar(perfis.padrao)
+                info(f"\n📶 {perfis.resumo()}")
+        except PerfilInvalido as e:
+            error(f"\n❌ Perfis de enlace não aplicados: {e}")
+        cronometro.relatorio()
+        custom_cli(net, perfis)
 
     except Exception as e:
         error(f'\n*** ERRO: {str(e)}\n')
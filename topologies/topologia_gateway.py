@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 from mininet.topo import Topo
 from mininet.net import Mininet
-from mininet.node import RemoteController, OVSKernelSwitch, Node
+from mininet.node import RemoteController, OVSKernelSwitch
 from mininet.link import TCLink
 from mininet.log import setLogLevel, info, error
 from mininet.cli import CLI
@@ -9,20 +9,12 @@ import time
 import subprocess
 import os
 import json
+import ipaddress
 
-class EnhancedDockerHost(Node):
-    def __init__(self, name, dimage='alpine', **kwargs):
-        super().__init__(name, **kwargs)   
-        self.dimage = dimage
-
-    def start(self):
-        super().start()
-        self.cmd(
-            '(apk update && apk add --no-cache iptables curl tcpdump conntrack-tools traceroute) || '
-            '(apt-get update && apt-get install -y iptables curl tcpdump conntrack traceroute) || '
-            f'echo "\\033[91m[⚠️  Falha]\\033[0m Não foi possível instalar pacotes no gateway \\033[93m{self.name}\\033[0m."'
-        )
-        info(f'\n🟢 Gateway \033[92m{self.name}\033[0m inicializado com pacotes essenciais instalados.')
+from gateway_nfv import Cronometro, EnhancedDockerHost, configurar_r1, relatorio_r1
+from parser_fluxos import parse_dump, resumo_tabela
+from provisionamento_hosts import EspecificacaoInvalida, comando_addhosts, provisionar_hosts
+from inventario_hosts import inventario_de_rede, salvar_inventario
 
 
 class RobustTopo(Topo):
@@ -58,39 +50,13 @@ class RobustTopo(Topo):
 def configure_nfv(net):
     r1 = net.get('r1')
 
-    r1.cmd('ip link set dev r1-eth0 up')
-    r1.cmd('ip link set dev r1-eth1 up')
-    r1.cmd('ip addr add 10.0.1.254/24 dev r1-eth0')
-    r1.cmd('ip addr add 10.0.2.254/24 dev r1-eth1')
-
-    r1.cmd('echo "net.ipv4.ip_forward=1" > /etc/sysctl.d/99-ipforward.conf')
-    r1.cmd('sysctl -p /etc/sysctl.d/99-ipforward.conf')
-
-    r1.cmd('iptables -t nat -F')
-    r1.cmd('iptables -t nat -A POSTROUTING -o r1-eth1 -j MASQUERADE')
-    r1.cmd('iptables -t nat -A POSTROUTING -o r1-eth1 -j LOG --log-prefix "NAT: "')
-
-    r1.cmd('iptables -F')
-    r1.cmd('iptables -P FORWARD DROP')
-    r1.cmd('iptables -A FORWARD -i r1-eth0 -o r1-eth1 -m conntrack --ctstate NEW -j ACCEPT')
-    r1.cmd('iptables -A FORWARD -i r1-eth1 -o r1-eth0 -m conntrack --ctstate ESTABLISHED,RELATED -j ACCEPT')
-
-    r1.cmd('iptables -N LOGGING')
-    r1.cmd('iptables -A FORWARD -j LOGGING')
-    r1.cmd('iptables -A LOGGING -j LOG --log-prefix "FORWARD: " --log-level 4')
-    r1.cmd('iptables -A LOGGING -j ACCEPT')
-
-    r1.cmd('echo 1 > /proc/sys/net/ipv4/conf/all/log_martians')
+    # Endereços, sysctl, NAT e cadeias de filtro aplicados em um único script no r1
+    erro = configurar_r1(r1)
+    if erro:
+        error(f"❌ Erro ao configurar o gateway r1: {erro}")
 
     info("\n✅ Gateway NFV '\033[92mr1\033[0m' configurado com sucesso! Rede segura e rastreável.")
-    info("\n=== \033[94mConfiguração de Rede\033[0m ===")
-    info(r1.cmd('ip addr show'))
-    info("\n=== \033[94mTabela de Roteamento\033[0m ===")
-    info(r1.cmd('ip route show'))
-    info("\n=== \033[94mRegras NAT\033[0m ===")
-    info(r1.cmd('iptables -t nat -L -v -n'))
-    info("\n=== \033[94mRegras de Firewall\033[0m ===")
-    info(r1.cmd('iptables -L -v -n'))
+    info(relatorio_r1(r1))
 
 def custom_cli(net):
     def addflow():
@@ -117,6 +83,7 @@ def custom_cli(net):
         try:
             output = subprocess.check_output(['ovs-ofctl', '-O', 'OpenFlow13', 'dump-flows', sw]).decode()
             print(f"📋 Fluxos ativos em {sw}:\n{output}")
+            print(resumo_tabela(parse_dump(output)))
         except subprocess.CalledProcessError as e:
             print("❌ Erro ao mostrar fluxos:", e)
 
@@ -132,75 +99,67 @@ def custom_cli(net):
             return
 
         try:
-            # Verifica se o host já existe
-            if net.get(host_name):
-                error(f"Host '{host_name}' já existe na rede.")
-                return
-
-            # Obtém o switch
-            target_switch = net.get(target_switch_name)
-            if not target_switch:
-                error(f"Switch '{target_switch_name}' não encontrada na rede.")
-                return
-
+            if '/' not in host_ip:
+                host_ip += '/24'
+            interface = ipaddress.ip_interface(host_ip)
             info(f"Adicionando host '{host_name}' com IP '{host_ip}' ao switch '{target_switch_name}'...")
-            
-            # Determina a rota padrão baseada no IP
-            default_route = ''
-            if host_ip.startswith('10.0.1.'):
-                default_route = 'via 10.0.1.254'
-            elif host_ip.startswith('10.0.2.'):
-                default_route = 'via 10.0.2.254'
-            
-            # Cria o host, mas ainda não o inicia no Mininet
-            new_host = net.addHost(host_name, ip=host_ip, defaultRoute=default_route)
-            
-            # Conecta o link
-            net.addLink(new_host, target_switch)
-            
-            # *** ESSA É A LINHA CRÍTICA ADICIONADA/MODIFICADA ***
-            # Inicia o novo host como um processo Mininet separado e suas interfaces
-            new_host.start() 
-            # O Mininet já cuida de 'ifconfig up' automaticamente após o start()
+
+            # Mesmo caminho do addhosts: a porta entra no OVS em execução e a
+            # rota padrão aponta para a interface do r1 na sub-rede
+            resultado = provisionar_hosts(net, 1, interface.network, target_switch_name,
+                                          nomes=[host_name], ips=[str(interface.ip)])
+            new_host = resultado.hosts[0]
 
             info(f"✅ Host '{host_name}' adicionado e conectado ao switch '{target_switch_name}' com sucesso!")
             info(f"Configuração IP de {host_name}: {new_host.cmd('ip addr show')}")
 
-        except Exception as e:
+        except (EspecificacaoInvalida, RuntimeError, ValueError) as e:
             error(f"❌ Erro ao adicionar novo host: {e}")
 
     CLI.do_addflow = lambda self, args='': addflow()
     CLI.do_showflows = lambda self, args='': showflows()
     # Mudei de 'addhost' para 'addnode' para ser mais genérico caso queira adicionar outros tipos de nós futuramente
     CLI.do_addnode = lambda self, args='': add_dynamic_host() 
+    CLI.do_addhosts = lambda self, args='': comando_addhosts(net, args)
     
     CLI.help_addflow = lambda self: print("addflow: Adiciona um fluxo de bloqueio baseado em IP/portas TCP")
     CLI.help_showflows = lambda self: print("showflows: Lista todos os fluxos instalados em um switch")
     CLI.help_addnode = lambda self: print("addnode: Adiciona um novo host dinamicamente à rede (ex: addnode)") # Ajuda para o novo comando
+    CLI.help_addhosts = lambda self: print("addhosts <quantidade> <sub-rede> <switch> [padrão] [início] [-v]: Adiciona N hosts em lote (ex: addhosts 100 10.0.1.0/24 s1 h{} 100).")
 
     CLI(net)
 
 def run():
     setLogLevel('info')
-    os.system('sudo mn -c >/dev/null 2>&1')
-    os.system('sudo pkill -f ryu-manager >/dev/null 2>&1')
-    os.system('sudo pkill -f ovs-testcontroller >/dev/null 2>&1')
-    time.sleep(2)
+    cronometro = Cronometro()
+    with cronometro.fase('limpeza'):
+        os.system('sudo mn -c >/dev/null 2>&1')
+        os.system('sudo pkill -f ryu-manager >/dev/null 2>&1')
+        os.system('sudo pkill -f ovs-testcontroller >/dev/null 2>&1')
+        time.sleep(2)
 
     try:
-        net = Mininet(
-            topo=RobustTopo(),
-            controller=lambda name: RemoteController(name, ip='127.0.0.1', port=6653),
-            switch=OVSKernelSwitch,
-            link=TCLink,
-            autoSetMacs=True,
-            waitConnected=True,
-            cleanup=True
-        )
-
-        net.start()
+        with cronometro.fase('construção da topologia'):
+            net = Mininet(
+                topo=RobustTopo(),
+                controller=lambda name: RemoteController(name, ip='127.0.0.1', port=6653),
+                switch=OVSKernelSwitch,
+                link=TCLink,
+                autoSetMacs=True,
+                waitConnected=True,
+                cleanup=True
+            )
+        # Antes do net.start(): o modo proativo do controlador lê o inventário na conexão dos switches
+        info(f"\n📄 Inventário de hosts exportado para '{salvar_inventario(inventario_de_rede(net))}'.")
+
+        with cronometro.fase('net.start (switches)'):
+            net.start()
         info("\n🚀 Topologia ativa! Sistema SDN pronto para testes e bloqueios de tráfego.")
-        configure_nfv(net)
+        with cronometro.fase('ferramentas do r1'):
+            net.get('r1').garantir_ferramentas()
+        with cronometro.fase('configuração NFV'):
+            configure_nfv(net)
+        cronometro.relatorio()
         custom_cli(net)
 
     except Exception as e:
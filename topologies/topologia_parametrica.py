@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""Gerador de topologias paramétricas para testes de escala do controlador e do r1.
+
+A ``RobustTopo`` fixa 2 switches e 13 hosts com IPs escritos à mão. Aqui a
+topologia é descrita por parâmetros:
+
+- ``sub_redes`` e ``hosts_por_sub_rede``: o plano de endereços é gerado a
+  partir de ``base`` (10.0.0.0/16 -> 10.0.1.0/24, 10.0.2.0/24, ...), com o
+  gateway no último endereço útil (.254) e uma interface ``r1-ethN`` por
+  sub-rede;
+- ``forma`` da malha de switches:
+  ``estrela``    um switch por sub-rede, todos ligados ao r1 (a RobustTopo
+                 é o caso 2 sub-redes);
+  ``linear``     ``switches_por_sub_rede`` switches em cadeia por sub-rede,
+                 com o r1 no primeiro;
+  ``leaf-spine`` ``switches_por_sub_rede`` folhas por sub-rede, todas
+                 ligadas a cada um dos ``spines``. A malha tem laços, então os
+                 switches sobem com STP (o MeuSwitch13 não trata laços).
+
+A construção usa ``MininetLote``: hosts e switches são criados em paralelo
+(cada nó espera o próprio shell subir), todos os pares veth são criados em um
+único ``ip -batch`` em vez de um ``ip link add`` por enlace, e as interfaces
+são ativadas e os hosts configurados em paralelo, um comando por nó. No fim,
+o tempo de cada fase e a memória (processo do Mininet e shells dos nós) são
+relatados.
+
+Uso:
+    sudo python3 topologia_parametrica.py --sub-redes 8 --hosts 50 --forma leaf-spine
+    sudo python3 topologia_parametrica.py --sub-redes 4 --hosts 100 --sem-cli --inventario inv.json
+    sudo python3 topologia_parametrica.py --sub-redes 4 --hosts 20 --perfil uplink-10m  # perfis_enlace.json
+"""
+import argparse
+import ipaddress
+import itertools
+import math
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from mininet.cli import CLI
+from mininet.link import Link, TCIntf, TCLink
+from mininet.log import setLogLevel, info, error
+from mininet.net import Mininet
+from mininet.node import Controller, OVSKernelSwitch, RemoteController
+from mininet.topo import Topo
+
+from gateway_nfv import FORWARD_PADRAO, Cronometro, EnhancedDockerHost, configurar_r1, relatorio_r1
+from inventario_hosts import INVENTARIO_PADRAO, salvar_inventario
+from perfis_enlace import PERFIS_PADRAO, PerfilInvalido, PerfisEnlace, comando_perfil
+
+FORMAS = ('estrela', 'linear', 'leaf-spine')
+
+# Com mais de duas sub-redes não há uma LAN/WAN única: o r1 encaminha entre todas
+FORWARD_ENTRE_SUB_REDES = [
+    '-A FORWARD -i r1-eth+ -o r1-eth+ -m conntrack --ctstate NEW,ESTABLISHED,RELATED -j ACCEPT',
+    '-A FORWARD -j LOGGING',
+]
+
+SubRede = namedtuple('SubRede', 'indice rede gateway hosts')
+HostPlano = namedtuple('HostPlano', 'nome ip mac')
+
+
+def mac_de_ip(ip):
+    """MAC administrado localmente derivado do IP (estável entre execuções)."""
+    return '02:00:' + ':'.join(f'{b:02x}' for b in ipaddress.ip_address(ip).packed)
+
+
+def plano_enderecos(sub_redes, hosts_por_sub_rede, base='10.0.0.0/16'):
+    """Divide ``base`` em ``sub_redes`` redes (a partir da segunda) com ``hosts_por_sub_rede`` hosts cada.
+
+    O prefixo é o maior possível, limitado a /24, que comporte os hosts e o
+    gateway. Os hosts são numerados globalmente (h1, h2, ...).
+    """
+    if sub_redes < 2:
+        raise ValueError("São necessárias ao menos 2 sub-redes para o r1 rotear entre elas.")
+    if hosts_por_sub_rede < 1:
+        raise ValueError("Cada sub-rede precisa de ao menos 1 host.")
+    base = ipaddress.ip_network(base)
+    # hosts + gateway + endereço de rede + broadcast
+    prefixo = min(24, 32 - math.ceil(math.log2(hosts_por_sub_rede + 3)))
+    if prefixo < base.prefixlen or 2 ** (prefixo - base.prefixlen) <= sub_redes:
+        raise ValueError(f"{base} não comporta {sub_redes} sub-redes de {hosts_por_sub_rede} hosts.")
+    redes = itertools.islice(base.subnets(new_prefix=prefixo), 1, sub_redes + 1)
+    plano, numero = [], itertools.count(1)
+    for indice, rede in enumerate(redes):
+        enderecos = rede.hosts()
+        hosts = [HostPlano(f'h{next(numero)}', str(ip), mac_de_ip(ip))
+                 for ip in itertools.islice(enderecos, hosts_por_sub_rede)]
+        plano.append(SubRede(indice, rede, str(rede.broadcast_address - 1), hosts))
+    return plano
+
+
+class TopologiaParametrica(Topo):
+    def build(self, sub_redes=2, hosts_por_sub_rede=7, forma='estrela', switches_por_sub_rede=1,
+              spines=2, base='10.0.0.0/16'):
+        if forma not in FORMAS:
+            raise ValueError(f"Forma desconhecida: {forma!r} (use {', '.join(FORMAS)})")
+        self.forma = forma
+        self.plano = plano_enderecos(sub_redes, hosts_por_sub_rede, base)
+        self.localizacao = {}
+        self.switches_gateway = []
+        numero = itertools.count(1)
+
+        def novo_switch():
+            n = next(numero)
+            # dpid explícito: o padrão do Mininet vem dos dígitos do nome
+            opcoes = {'stp': True} if forma == 'leaf-spine' else {}
+            return self.addSwitch(f's{n}', cls=OVSKernelSwitch, protocols='OpenFlow13',
+                                  dpid=f'{n:016x}', **opcoes)
+
+        folhas = []
+        por_sub_rede = 1 if forma == 'estrela' else max(1, switches_por_sub_rede)
+        for sub in self.plano:
+            switches = [novo_switch() for _ in range(por_sub_rede)]
+            if forma == 'linear':
+                for a, b in zip(switches, switches[1:]):
+                    self.addLink(a, b)
+            folhas += switches
+            # Hosts distribuídos em blocos contíguos pelos switches da sub-rede
+            for j, host in enumerate(sub.hosts):
+                switch = switches[j * por_sub_rede // len(sub.hosts)]
+                self.addHost(host.nome, ip=f'{host.ip}/{sub.rede.prefixlen}', mac=host.mac,
+                             defaultRoute=f'via {sub.gateway}')
+                self.addLink(host.nome, switch)
+                self.localizacao[host.nome] = (switch, self.port(host.nome, switch)[1])
+            self.switches_gateway.append(switches[0])
+
+        if forma == 'leaf-spine':
+            for spine in [novo_switch() for _ in range(spines)]:
+                for folha in folhas:
+                    self.addLink(folha, spine)
+
+        r1 = self.addHost('r1', cls=EnhancedDockerHost)
+        for sub, switch in zip(self.plano, self.switches_gateway):
+            self.addLink(r1, switch, intfName1=f'r1-eth{sub.indice}', addr1=mac_de_ip(sub.gateway),
+                         params1={'ip': f'{sub.gateway}/{sub.rede.prefixlen}'})
+            self.localizacao[f'r1-eth{sub.indice}'] = (switch, self.port(r1, switch)[1])
+        info(f'\n🧩 Topologia {forma}: {len(self.plano)} sub-redes, '
+             f'{sum(len(s.hosts) for s in self.plano)} hosts, {len(self.switches())} switches.')
+
+    def enderecos_r1(self):
+        return [(f'r1-eth{sub.indice}', f'{sub.gateway}/{sub.rede.prefixlen}') for sub in self.plano]
+
+    def regras_forward(self):
+        return FORWARD_PADRAO if len(self.plano) == 2 else FORWARD_ENTRE_SUB_REDES
+
+    def inventario(self):
+        """Hosts (com switch/porta de acesso), gateways e enlaces entre switches."""
+        switches = set(self.switches())
+        return {
+            'forma': self.forma,
+            'switches': {nome: self.nodeInfo(nome)['dpid'] for nome in self.switches()},
+            'sub_redes': [{'rede': str(sub.rede), 'gateway': sub.gateway, 'mac_gateway': mac_de_ip(sub.gateway),
+                           'interface': f'r1-eth{sub.indice}',
+                           'switch': self.localizacao[f'r1-eth{sub.indice}'][0],
+                           'porta': self.localizacao[f'r1-eth{sub.indice}'][1]}
+                          for sub in self.plano],
+            'hosts': [{'nome': h.nome, 'ip': h.ip, 'mac': h.mac, 'switch': self.localizacao[h.nome][0],
+                       'porta': self.localizacao[h.nome][1]}
+                      for sub in self.plano for h in sub.hosts],
+            'enlaces': [[a, pa, b, pb] for a, b in self.links(sort=True)
+                        if a in switches and b in switches for pa, pb in [self.port(a, b)]],
+        }
+
+
+def executar_ip_batch(comandos):
+    """Executa vários comandos ``ip`` em um único processo; levanta RuntimeError em falha."""
+    if not comandos:
+        return
+    resultado = subprocess.run(['ip', '-batch', '-'], input='\n'.join(comandos) + '\n',
+                               capture_output=True, text=True)
+    if resultado.returncode != 0:
+        raise RuntimeError(f"ip -batch falhou: {resultado.stderr.strip()}")
+
+
+def _em_paralelo(funcao, itens, trabalhadores):
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        return list(executor.map(funcao, itens))
+
+
+class IntfLote(TCIntf):
+    """Interface que não é ativada na criação; ``MininetLote`` ativa todas de uma vez."""
+
+    def config(self, up=None, **params):
+        return super().config(up=up, **params)
+
+
+class LinkLote(Link):
+    """Enlace cujo par veth já foi criado por ``MininetLote`` em um único ``ip -batch``."""
+
+    def __init__(self, node1, node2, **params):
+        params.setdefault('intf', IntfLote)
+        super().__init__(node1, node2, **params)
+
+    @classmethod
+    def makeIntfPair(cls, *args, **kwargs):
+        return None
+
+
+class MininetLote(Mininet):
+    """Mininet com nós criados em paralelo e enlaces criados em lote."""
+
+    def __init__(self, *args, trabalhadores=32, **kwargs):
+        self.trabalhadores = trabalhadores
+        super().__init__(*args, **kwargs)
+
+    def _parametros_host(self, params):
+        # Mesmos padrões de Mininet.addHost, calculados em sequência
+        padrao = {'ip': f'{ipaddress.ip_address(self.ipBaseNum + self.nextIP)}/{self.prefixLen}'}
+        if self.autoSetMacs:
+            padrao['mac'] = ':'.join(f'{b:02x}' for b in self.nextIP.to_bytes(6, 'big'))
+        self.nextIP += 1
+        padrao.update(params)
+        return padrao
+
+    def _parametros_switch(self, params):
+        padrao = {'listenPort': self.listenPort, 'inNamespace': self.inNamespace}
+        if not self.inNamespace and self.listenPort:
+            self.listenPort += 1
+        padrao.update(params)
+        return padrao
+
+    def buildFromTopo(self, topo=None):
+        if not self.controllers and self.controller:
+            classes = self.controller if isinstance(self.controller, list) else [self.controller]
+            for i, cls in enumerate(classes):
+                if isinstance(cls, Controller):
+                    self.addController(cls)
+                else:
+                    self.addController(f'c{i}', cls)
+
+        pedidos = []
+        for nome in topo.hosts():
+            params = dict(topo.nodeInfo(nome))
+            pedidos.append((nome, params.pop('cls', None) or self.host, self._parametros_host(params)))
+        for nome in topo.switches():
+            params = dict(topo.nodeInfo(nome))
+            cls = params.pop('cls', None) or self.switch
+            if hasattr(cls, 'batchStartup'):
+                params.setdefault('batch', True)
+            pedidos.append((nome, cls, self._parametros_switch(params)))
+        info(f'*** Criando {len(pedidos)} nós em paralelo ({self.trabalhadores} threads)\n')
+        nos = _em_paralelo(lambda p: p[1](p[0], **p[2]), pedidos, self.trabalhadores)
+        switches = set(topo.switches())
+        for no in nos:
+            (self.switches if no.name in switches else self.hosts).append(no)
+            self.nameToNode[no.name] = no
+
+        enlaces, comandos = [], []
+        for _, _, params in topo.links(sort=True, withInfo=True):
+            params = dict(params)
+            params.pop('cls', None)
+            no1, no2 = self[params.pop('node1')], self[params.pop('node2')]
+            params.setdefault('intfName1', f"{no1.name}-eth{params['port1']}")
+            params.setdefault('intfName2', f"{no2.name}-eth{params['port2']}")
+            params.setdefault('addr1', self.randMac())
+            params.setdefault('addr2', self.randMac())
+            comandos.append(f"link add name {params['intfName1']} address {params['addr1']} netns {no1.pid} "
+                            f"type veth peer name {params['intfName2']} address {params['addr2']} netns {no2.pid}")
+            enlaces.append((no1, no2, params))
+        info(f'*** Criando {len(comandos)} pares veth em um único ip -batch\n')
+        executar_ip_batch(comandos)
+        for no1, no2, params in enlaces:
+            self.links.append(LinkLote(no1, no2, **params))
+        self._ativar_interfaces()
+
+    def _ativar_interfaces(self):
+        raiz = []
+        isolados = []
+        for no in self.hosts + self.switches:
+            nomes = [i for i in no.intfNames() if i != 'lo']
+            if not no.inNamespace:
+                raiz += [f'link set {nome} up' for nome in nomes]
+            elif nomes:
+                isolados.append((no, '; '.join(f'ip link set {nome} up' for nome in nomes)))
+        executar_ip_batch(raiz)
+        _em_paralelo(lambda p: p[0].cmd(p[1]), isolados, self.trabalhadores)
+
+    def configHosts(self):
+        def configurar(host):
+            if host.defaultIntf():
+                host.configDefault()
+            else:
+                host.configDefault(ip=None, mac=None)
+        _em_paralelo(configurar, self.hosts, self.trabalhadores)
+
+
+def rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for linha in f:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def relatorio_memoria(net):
+    """Pico de RSS do processo do Mininet e RSS somado dos shells dos nós."""
+    processo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    nos = net.hosts + net.switches
+    shells = sum(rss_kb(no.pid) for no in nos)
+    linhas = ['\n=== \033[94mMemória\033[0m ===',
+              f'  {"processo Mininet (pico)":<28} {processo / 1024:7.1f} MiB',
+              f'  {f"shells de {len(nos)} nós":<28} {shells / 1024:7.1f} MiB '
+              f'({shells / max(1, len(nos)):.0f} KiB/nó)']
+    info('\n'.join(linhas) + '\n')
+    return processo, shells
+
+
+def configure_nfv(net, topo):
+    r1 = net.get('r1')
+    erro = configurar_r1(r1, forward=topo.regras_forward(), enderecos=topo.enderecos_r1())
+    if erro:
+        error(f"❌ Erro ao configurar o gateway r1: {erro}")
+    if topo.forma == 'leaf-spine':
+        # Todas as interfaces do r1 ficam no mesmo domínio L2: cada uma responde só pelo próprio IP
+        r1.cmd('sysctl -qw net.ipv4.conf.all.arp_ignore=1 net.ipv4.conf.all.arp_announce=2')
+    info(f"\n✅ Gateway NFV '\033[92mr1\033[0m' configurado com {len(topo.plano)} interfaces.")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Constrói uma topologia paramétrica com o gateway r1.")
+    ap.add_argument('--sub-redes', type=int, default=2)
+    ap.add_argument('--hosts', type=int, default=7, help="Hosts por sub-rede")
+    ap.add_argument('--forma', choices=FORMAS, default='estrela')
+    ap.add_argument('--switches-por-sub-rede', type=int, default=1)
+    ap.add_argument('--spines', type=int, default=2)
+    ap.add_argument('--base', default='10.0.0.0/16')
+    ap.add_argument('--controlador', default='127.0.0.1:6653')
+    ap.add_argument('--trabalhadores', type=int, default=32)
+    ap.add_argument('--sequencial', action='store_true',
+                    help="Usa o Mininet padrão (um nó e um enlace por vez) para comparação")
+    ap.add_argument('--inventario', default=INVENTARIO_PADRAO,
+                    help="Exporta hosts, portas e gateways em JSON (lido pelo modo proativo do controlador)")
+    ap.add_argument('--perfis', default=PERFIS_PADRAO, help="Arquivo JSON de perfis de enlace")
+    ap.add_argument('--perfil', help="Perfil de enlace aplicado após a configuração (padrão: o do arquivo)")
+    ap.add_argument('--sem-cli', action='store_true', help="Só constrói, relata e encerra")
+    args = ap.parse_args()
+
+    setLogLevel('info')
+    ip_controlador, porta_controlador = args.controlador.rsplit(':', 1)
+    cronometro = Cronometro()
+    with cronometro.fase('limpeza'):
+        os.system('sudo mn -c >/dev/null 2>&1')
+        time.sleep(1)
+
+    net = None
+    try:
+        with cronometro.fase('plano e Topo'):
+            topo = TopologiaParametrica(sub_redes=args.sub_redes, hosts_por_sub_rede=args.hosts,
+                                        forma=args.forma, switches_por_sub_rede=args.switches_por_sub_rede,
+                                        spines=args.spines, base=args.base)
+        if args.inventario:
+            salvar_inventario(topo.inventario(), args.inventario)
+            info(f"\n📄 Inventário exportado para '{args.inventario}'.")
+        opcoes = dict(topo=topo, switch=OVSKernelSwitch, autoSetMacs=False, waitConnected=True, cleanup=True,
+                      controller=lambda name: RemoteController(name, ip=ip_controlador,
+                                                               port=int(porta_controlador)))
+        with cronometro.fase('construção da topologia'):
+            if args.sequencial:
+                net = Mininet(link=TCLink, **opcoes)
+            else:
+                net = MininetLote(link=LinkLote, trabalhadores=args.trabalhadores, **opcoes)
+        with cronometro.fase('net.start (switches)'):
+            net.start()
+        if args.forma == 'leaf-spine':
+            info("\n⏳ Malha leaf-spine com STP: aguarde a convergência (~30s) antes dos testes.")
+        with cronometro.fase('ferramentas do r1'):
+            net.get('r1').garantir_ferramentas()
+        with cronometro.fase('configuração NFV'):
+            configure_nfv(net, topo)
+        perfis = PerfisEnlace(net, args.perfis)
+        perfil = args.perfil or perfis.padrao
+        if perfil:
+            with cronometro.fase('perfil de enlace'):
+                perfis.aplicar(perfil)
+            info(f"\n📶 {perfis.resumo()}")
+        cronometro.relatorio()
+        relatorio_memoria(net)
+        if not args.sem_cli:
+            info(relatorio_r1(net.get('r1')))
+            CLI.do_perfil = lambda self, args='': comando_perfil(perfis, args)
+            CLI.help_perfil = lambda self: print("perfil [nome | carregar [arquivo.json]]: Lista os perfis de enlace ou aplica um perfil à rede em execução.")
+            CLI(net)
+    except PerfilInvalido as e:
+        error(f'\n❌ {e}\n')
+        return 1
+    except Exception as e:
+        error(f'\n*** ERRO: {str(e)}\n')
+        return 1
+    finally:
+        if net is not None:
+            info("\n🔻 Rede encerrada. Limpando ambiente...")
+            net.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())